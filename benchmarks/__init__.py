@@ -0,0 +1 @@
+"""Benchmarks (not installed with the package)."""
@@ -0,0 +1,534 @@
+"""In-process simulator of the CloudFormation, S3 & SSM APIs.
+
+Requests made by botocore clients of patched boto3 sessions are answered by
+the simulator instead of AWS (the clients' own parameter validation,
+serialization & response handling still run). Stack operations complete
+after a configurable latency, producing stack events along the way, and API
+calls can be rate limited to simulate throttling.
+"""
+from __future__ import division
+
+import datetime
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+
+import boto3
+from botocore.awsrequest import AWSResponse
+
+ACCOUNT_ID = '123456789012'
+
+
+class SimulatedError(Exception):
+    """API error response."""
+
+    def __init__(self, code, message, status_code=400):
+        """Initialize error."""
+        super(SimulatedError, self).__init__(message)
+        self.code = code
+        self.message = message
+        self.status_code = status_code
+
+
+class TokenBucket(object):
+    """Token bucket rate limiter."""
+
+    def __init__(self, rate, burst=None):
+        """Initialize bucket allowing rate calls/sec."""
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = self.burst
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def consume(self):
+        """Take a token, returning False if none are available."""
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class SimulatedStack(object):
+    """A stack & its pending operation."""
+
+    def __init__(self, name, template, parameters, tags):
+        """Initialize stack."""
+        self.name = name
+        self.stack_id = "arn:aws:cloudformation:us-east-1:%s:stack/%s/%s" % (
+            ACCOUNT_ID, name, uuid.uuid4()
+        )
+        self.template = template
+        self.parameters = parameters
+        self.tags = tags
+        self.status = None
+        self.final_status = None
+        self.ready_at = 0
+        self.events = []
+        self.version = 0
+        self.created = datetime.datetime.utcnow()
+        self.last_updated = None
+
+    def start(self, operation, latency, resources):
+        """Begin a create/update/delete operation."""
+        self.status = "%s_IN_PROGRESS" % operation
+        self.final_status = "%s_COMPLETE" % operation
+        self.ready_at = time.time() + latency
+        if operation == 'UPDATE':
+            self.last_updated = datetime.datetime.utcnow()
+        self.add_event(self.name, 'AWS::CloudFormation::Stack', self.status)
+        for i in resources:
+            self.add_event(i, 'AWS::CloudFormation::WaitConditionHandle',
+                           self.status)
+
+    def add_event(self, logical_id, resource_type, status):
+        """Record a stack event."""
+        self.events.insert(0, {
+            'StackId': self.stack_id,
+            'EventId': str(uuid.uuid4()),
+            'StackName': self.name,
+            'LogicalResourceId': logical_id,
+            'ResourceType': resource_type,
+            'Timestamp': datetime.datetime.utcnow(),
+            'ResourceStatus': status
+        })
+
+    def refresh(self, resources):
+        """Complete the pending operation if its latency has elapsed."""
+        if self.final_status and time.time() >= self.ready_at:
+            for i in resources:
+                self.add_event(i, 'AWS::CloudFormation::WaitConditionHandle',
+                               self.final_status)
+            self.add_event(self.name, 'AWS::CloudFormation::Stack',
+                           self.final_status)
+            self.status = self.final_status
+            self.final_status = None
+            self.version += 1
+
+    def describe(self):
+        """Return describe_stacks representation."""
+        outputs = json.loads(self.template).get('Outputs', {})
+        description = {
+            'StackId': self.stack_id,
+            'StackName': self.name,
+            'StackStatus': self.status,
+            'CreationTime': self.created,
+            'Parameters': self.parameters,
+            'Tags': self.tags,
+            'Outputs': [{'OutputKey': key,
+                         'OutputValue': "%s-%s-%d" % (self.name, key,
+                                                      self.version)}
+                        for key in sorted(outputs)]
+        }
+        if self.last_updated:
+            description['LastUpdatedTime'] = self.last_updated
+        return description
+
+
+class CloudSimulator(object):  # pylint: disable=too-many-instance-attributes
+    """Simulated AWS backend.
+
+    Args:
+        stack_latency (float): seconds for stack operations to complete.
+        latency_jitter (float): random fraction of stack_latency added to
+            each operation.
+        api_latency (float): seconds added to every API call.
+        api_rate (Optional[float]): sustained CloudFormation API calls/sec
+            before requests are throttled (None for no throttling).
+        api_burst (Optional[int]): CloudFormation API burst capacity.
+        max_attempts (int): attempts of throttled calls before an error is
+            returned (stacker's CloudFormation client makes 10).
+        backoff_scale (float): scale of the (botocore legacy mode)
+            exponential backoff between throttled attempts.
+        events_page_size (int): stack events per describe_stack_events page.
+        change_set_latency (float): seconds for change sets to be created.
+        change_set_resource_latency (float): seconds added to the creation of
+            change sets per resource of their template.
+
+    """
+
+    def __init__(self, stack_latency=0.5, latency_jitter=0.2,  # noqa pylint: disable=too-many-arguments
+                 api_latency=0.0, api_rate=None, api_burst=None,
+                 max_attempts=10, backoff_scale=0.05, events_page_size=100,
+                 change_set_latency=0.2, change_set_resource_latency=0.0):
+        """Initialize simulator."""
+        self.stack_latency = stack_latency
+        self.latency_jitter = latency_jitter
+        self.api_latency = api_latency
+        self.throttle = TokenBucket(api_rate, api_burst) if api_rate else None
+        self.max_attempts = max_attempts
+        self.backoff_scale = backoff_scale
+        self.events_page_size = events_page_size
+        self.change_set_latency = change_set_latency
+        self.change_set_resource_latency = change_set_resource_latency
+        self.stacks = {}
+        self.change_sets = {}
+        self.objects = {}
+        self.buckets = set()
+        self.parameters = {}
+        self.calls = Counter()
+        self.throttled = Counter()
+        self.lock = threading.RLock()
+        self._original_session_init = None
+
+    # Wiring
+
+    def install(self):
+        """Answer requests of all boto3 sessions created from now on."""
+        simulator = self
+        original_init = boto3.session.Session.__init__
+        self._original_session_init = original_init
+
+        def session_init(session, *args, **kwargs):
+            original_init(session, *args, **kwargs)
+            simulator.register(session.events)
+
+        boto3.session.Session.__init__ = session_init
+
+    def uninstall(self):
+        """Stop patching new boto3 sessions."""
+        if self._original_session_init:
+            boto3.session.Session.__init__ = self._original_session_init
+            self._original_session_init = None
+
+    def register(self, events):
+        """Register handlers on a session's event system."""
+        events.register('before-parameter-build', self._capture_params)
+        events.register('before-call', self._handle_call)
+
+    def reset_counters(self):
+        """Reset API call/throttling counters."""
+        self.calls.clear()
+        self.throttled.clear()
+
+    @staticmethod
+    def _capture_params(params, context, **_kwargs):
+        context['simulator_params'] = dict(params)
+
+    def _handle_call(self, model, context, **_kwargs):
+        service = model.service_model.service_name
+        operation = model.name
+        params = context.get('simulator_params', {})
+        self.calls["%s.%s" % (service, operation)] += 1
+        status_code = 200
+        try:
+            if service == 'cloudformation':
+                self._wait_for_capacity(operation)
+            if self.api_latency:
+                time.sleep(self.api_latency)
+            handler = getattr(self, "%s_%s" % (service, operation), None)
+            if handler is None:
+                raise SimulatedError('NotImplemented',
+                                     "%s.%s is not simulated"
+                                     % (service, operation))
+            parsed = handler(**params)
+        except SimulatedError as exc:
+            status_code = exc.status_code
+            parsed = {'Error': {'Code': exc.code, 'Message': exc.message}}
+        parsed['ResponseMetadata'] = {'HTTPStatusCode': status_code,
+                                      'RequestId': str(uuid.uuid4()),
+                                      'HTTPHeaders': {},
+                                      'RetryAttempts': 0}
+        return AWSResponse(None, status_code, {}, None), parsed
+
+    def _wait_for_capacity(self, operation):
+        """Apply rate limiting, backing off like botocore's retries.
+
+        Requests are answered before reaching botocore's retry handler, so
+        its retries are simulated here.
+        """
+        if not self.throttle:
+            return
+        for attempt in range(self.max_attempts):
+            if self.throttle.consume():
+                return
+            with self.lock:
+                self.throttled["cloudformation.%s" % operation] += 1
+            time.sleep(random.random() * min(20, 2 ** attempt) *
+                       self.backoff_scale)
+        raise SimulatedError('Throttling', 'Rate exceeded')
+
+    def _get_stack(self, name):
+        if name.startswith('arn:'):
+            # arn:aws:cloudformation:<region>:<account>:stack/<name>/<id>
+            name = name.split(':', 5)[5].split('/')[1]
+        stack = self.stacks.get(name)
+        if stack:
+            stack.refresh(self._resources(stack))
+            if stack.status == 'DELETE_COMPLETE':
+                del self.stacks[name]
+                stack = None
+        if not stack:
+            raise SimulatedError('ValidationError',
+                                 "Stack with id %s does not exist" % name)
+        return stack
+
+    def _latency(self):
+        return self.stack_latency * (1 + random.random() *
+                                     self.latency_jitter)
+
+    @staticmethod
+    def _resources(stack):
+        return sorted(json.loads(stack.template).get('Resources', {}))
+
+    def _template_body(self, TemplateBody=None, TemplateURL=None):  # noqa pylint: disable=invalid-name
+        if TemplateBody:
+            return TemplateBody
+        bucket, key = TemplateURL.split('://', 1)[1].split('/', 2)[1:]
+        if (bucket, key) not in self.objects:
+            raise SimulatedError('ValidationError',
+                                 'TemplateURL must reference a valid S3 '
+                                 'object to which you have access.')
+        return self.objects[(bucket, key)].decode()
+
+    # CloudFormation
+
+    def cloudformation_DescribeStacks(self, StackName=None, **_kwargs):  # noqa pylint: disable=invalid-name
+        """Describe a stack."""
+        with self.lock:
+            if StackName:
+                return {'Stacks': [self._get_stack(StackName).describe()]}
+            return {'Stacks': [self._get_stack(i).describe()
+                               for i in list(self.stacks)]}
+
+    def cloudformation_CreateStack(self, StackName, TemplateBody=None,  # noqa pylint: disable=invalid-name,too-many-arguments
+                                   TemplateURL=None, Parameters=None,
+                                   Tags=None, **_kwargs):
+        """Create a stack."""
+        with self.lock:
+            if StackName in self.stacks:
+                raise SimulatedError('AlreadyExistsException',
+                                     "Stack [%s] already exists" % StackName)
+            stack = SimulatedStack(StackName,
+                                   self._template_body(TemplateBody,
+                                                       TemplateURL),
+                                   Parameters or [], Tags or [])
+            stack.start('CREATE', self._latency(), self._resources(stack))
+            self.stacks[StackName] = stack
+            return {'StackId': stack.stack_id}
+
+    def cloudformation_UpdateStack(self, StackName, TemplateBody=None,  # noqa pylint: disable=invalid-name,too-many-arguments
+                                   TemplateURL=None, Parameters=None,
+                                   Tags=None, **_kwargs):
+        """Update a stack."""
+        with self.lock:
+            stack = self._get_stack(StackName)
+            if stack.final_status:
+                raise SimulatedError('ValidationError',
+                                     "Stack:%s is in %s state and can not "
+                                     "be updated." % (stack.stack_id,
+                                                      stack.status))
+            template = self._template_body(TemplateBody, TemplateURL)
+            if template == stack.template and (
+                    (Parameters or []) == stack.parameters):
+                raise SimulatedError('ValidationError',
+                                     'No updates are to be performed.')
+            stack.template = template
+            stack.parameters = Parameters or []
+            stack.tags = Tags or []
+            stack.start('UPDATE', self._latency(), self._resources(stack))
+            return {'StackId': stack.stack_id}
+
+    def cloudformation_DeleteStack(self, StackName, **_kwargs):  # noqa pylint: disable=invalid-name
+        """Delete a stack."""
+        with self.lock:
+            try:
+                stack = self._get_stack(StackName)
+            except SimulatedError:
+                return {}
+            if stack.status != 'DELETE_IN_PROGRESS':
+                stack.start('DELETE', self._latency(), self._resources(stack))
+            return {}
+
+    def cloudformation_DescribeStackEvents(self, StackName,  # noqa pylint: disable=invalid-name
+                                           NextToken=None, **_kwargs):
+        """Return a page of stack events (newest first)."""
+        with self.lock:
+            events = self._get_stack(StackName).events
+            start = int(NextToken or 0)
+            response = {'StackEvents':
+                        events[start:start + self.events_page_size]}
+            if start + self.events_page_size < len(events):
+                response['NextToken'] = str(start + self.events_page_size)
+            return response
+
+    def cloudformation_GetTemplate(self, StackName, **_kwargs):  # noqa pylint: disable=invalid-name
+        """Return a stack's template."""
+        with self.lock:
+            return {'TemplateBody': self._get_stack(StackName).template}
+
+    def cloudformation_SetStackPolicy(self, StackName, **_kwargs):  # noqa pylint: disable=invalid-name
+        """Set a stack's policy."""
+        with self.lock:
+            self._get_stack(StackName)
+            return {}
+
+    def cloudformation_CreateChangeSet(self, StackName, ChangeSetName,  # noqa pylint: disable=invalid-name,too-many-arguments
+                                       TemplateBody=None, TemplateURL=None,
+                                       Parameters=None, Tags=None,
+                                       ChangeSetType='UPDATE', **_kwargs):
+        """Create a change set (completing after change_set_latency)."""
+        with self.lock:
+            if ChangeSetType == 'CREATE':
+                old_resources = {}
+                stack_id = None
+            else:
+                stack = self._get_stack(StackName)
+                old_resources = json.loads(stack.template).get('Resources',
+                                                               {})
+                stack_id = stack.stack_id
+            template = self._template_body(TemplateBody, TemplateURL)
+            resources = json.loads(template).get('Resources', {})
+            changes = []
+            for logical_id in sorted(set(old_resources) | set(resources)):
+                if logical_id not in old_resources:
+                    action = 'Add'
+                elif logical_id not in resources:
+                    action = 'Remove'
+                elif resources[logical_id] != old_resources[logical_id]:
+                    action = 'Modify'
+                else:
+                    continue
+                changes.append({'Type': 'Resource', 'ResourceChange': {
+                    'Action': action,
+                    'LogicalResourceId': logical_id,
+                    'ResourceType': (resources.get(logical_id) or
+                                     old_resources[logical_id])['Type'],
+                    'Replacement': 'False'
+                }})
+            change_set_id = (
+                "arn:aws:cloudformation:us-east-1:%s:changeSet/%s/%s" % (
+                    ACCOUNT_ID, ChangeSetName, uuid.uuid4()
+                )
+            )
+            unchanged = stack_id and template == stack.template and (
+                (Parameters or []) == stack.parameters)
+            self.change_sets[change_set_id] = {
+                'StackName': StackName,
+                'StackId': stack_id,
+                'Type': ChangeSetType,
+                'Template': template,
+                'Parameters': Parameters or [],
+                'Tags': Tags or [],
+                'Changes': changes,
+                'Unchanged': unchanged,
+                'ReadyAt': time.time() + self.change_set_latency + len(
+                    resources
+                ) * self.change_set_resource_latency
+            }
+            return {'Id': change_set_id, 'StackId': stack_id}
+
+    def _get_change_set(self, ChangeSetName):  # noqa pylint: disable=invalid-name
+        if ChangeSetName not in self.change_sets:
+            raise SimulatedError('ChangeSetNotFound',
+                                 "ChangeSet [%s] does not exist"
+                                 % ChangeSetName, 404)
+        return self.change_sets[ChangeSetName]
+
+    def cloudformation_DescribeChangeSet(self, ChangeSetName, **_kwargs):  # noqa pylint: disable=invalid-name
+        """Describe a change set."""
+        with self.lock:
+            change_set = self._get_change_set(ChangeSetName)
+            response = {'ChangeSetId': ChangeSetName,
+                        'StackName': change_set['StackName'],
+                        'Status': 'CREATE_IN_PROGRESS',
+                        'ExecutionStatus': 'UNAVAILABLE',
+                        'Changes': []}
+            if time.time() < change_set['ReadyAt']:
+                return response
+            if change_set['Unchanged']:
+                response.update({
+                    'Status': 'FAILED',
+                    'StatusReason': "The submitted information didn't "
+                                    "contain changes. Submit different "
+                                    "information to create a change set."
+                })
+            else:
+                response.update({'Status': 'CREATE_COMPLETE',
+                                 'ExecutionStatus': 'AVAILABLE',
+                                 'Changes': change_set['Changes']})
+            return response
+
+    def cloudformation_ExecuteChangeSet(self, ChangeSetName, **_kwargs):  # noqa pylint: disable=invalid-name
+        """Execute a change set."""
+        with self.lock:
+            change_set = self._get_change_set(ChangeSetName)
+            if time.time() < change_set['ReadyAt'] or change_set['Unchanged']:
+                raise SimulatedError('InvalidChangeSetStatus',
+                                     "ChangeSet [%s] cannot be executed in "
+                                     "its current status" % ChangeSetName)
+            del self.change_sets[ChangeSetName]
+            if change_set['Type'] == 'CREATE':
+                stack = SimulatedStack(change_set['StackName'],
+                                       change_set['Template'],
+                                       change_set['Parameters'],
+                                       change_set['Tags'])
+                stack.start('CREATE', self._latency(), self._resources(stack))
+                self.stacks[stack.name] = stack
+            else:
+                stack = self._get_stack(change_set['StackName'])
+                stack.template = change_set['Template']
+                stack.parameters = change_set['Parameters']
+                stack.tags = change_set['Tags']
+                stack.start('UPDATE', self._latency(), self._resources(stack))
+            return {}
+
+    def cloudformation_DeleteChangeSet(self, ChangeSetName, **_kwargs):  # noqa pylint: disable=invalid-name
+        """Delete a change set."""
+        with self.lock:
+            self._get_change_set(ChangeSetName)
+            del self.change_sets[ChangeSetName]
+            return {}
+
+    # S3
+
+    def s3_HeadBucket(self, Bucket, **_kwargs):  # noqa pylint: disable=invalid-name
+        """Check bucket exists."""
+        if Bucket not in self.buckets:
+            raise SimulatedError('404', 'Not Found', 404)
+        return {}
+
+    def s3_CreateBucket(self, Bucket, **_kwargs):  # noqa pylint: disable=invalid-name
+        """Create bucket."""
+        self.buckets.add(Bucket)
+        return {'Location': '/' + Bucket}
+
+    def s3_HeadObject(self, Bucket, Key, **_kwargs):  # noqa pylint: disable=invalid-name
+        """Check object exists."""
+        if (Bucket, Key) not in self.objects:
+            raise SimulatedError('404', 'Not Found', 404)
+        return {'ContentLength': len(self.objects[(Bucket, Key)])}
+
+    def s3_PutObject(self, Bucket, Key, Body=b'', **_kwargs):  # noqa pylint: disable=invalid-name
+        """Store object."""
+        if Bucket not in self.buckets:
+            raise SimulatedError('NoSuchBucket', 'Bucket does not exist', 404)
+        if hasattr(Body, 'read'):
+            Body = Body.read()
+        self.objects[(Bucket, Key)] = (Body.encode()
+                                       if not isinstance(Body, bytes)
+                                       else Body)
+        return {'ETag': '"%s"' % uuid.uuid4().hex}
+
+    # SSM
+
+    def ssm_GetParameters(self, Names, **_kwargs):  # noqa pylint: disable=invalid-name
+        """Return parameters."""
+        return {'Parameters': [{'Name': i, 'Type': 'SecureString',
+                                'Value': self.parameters[i]}
+                               for i in Names if i in self.parameters],
+                'InvalidParameters': [i for i in Names
+                                      if i not in self.parameters]}
+
+    def ssm_PutParameter(self, Name, Value, **_kwargs):  # noqa pylint: disable=invalid-name
+        """Store parameter."""
+        self.parameters[Name] = Value
+        return {'Version': 1}
@@ -0,0 +1,269 @@
+"""Benchmark stacker orchestration against the CloudFormation simulator.
+
+Each scenario (action, stack count & dependency shape) runs in its own
+process, reporting wall time, API calls & peak RSS, e.g.::
+
+    python -m benchmarks.stacker_orchestration --stacks 10 100 1000
+
+Stack operation latencies are scaled down (see --stack-latency &
+--poll-time) so large graphs complete quickly while keeping the ratio of
+polling to stack latency realistic.
+"""
+from __future__ import division, print_function
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import threading
+import time
+
+from runway.util import get_embedded_lib_path
+
+sys.path.insert(0, get_embedded_lib_path())
+
+from troposphere import Output, Ref  # noqa pylint: disable=wrong-import-position
+from troposphere.cloudformation import WaitConditionHandle  # noqa pylint: disable=wrong-import-position
+import yaml  # noqa pylint: disable=wrong-import-position
+
+from stacker.actions import build, destroy, diff  # noqa pylint: disable=wrong-import-position
+from stacker.blueprints.base import Blueprint  # noqa pylint: disable=wrong-import-position
+from stacker.config import render_parse_load  # noqa pylint: disable=wrong-import-position
+from stacker.context import Context  # noqa pylint: disable=wrong-import-position
+from stacker.providers.aws.default import ProviderBuilder  # noqa pylint: disable=wrong-import-position
+
+from .cfn_simulator import CloudSimulator, TokenBucket  # noqa pylint: disable=wrong-import-position
+
+ACTIONS = ['build', 'update', 'diff', 'destroy']
+SHAPES = ['chain', 'wide', 'layered']
+NAMESPACE = 'bench'
+REGION = 'us-east-1'
+STACKER_BUCKET = 'bench-stacker-bucket'
+# Dummy credentials, so botocore never looks further (e.g. at IMDS)
+SIMULATOR_ENV_VARS = {'AWS_ACCESS_KEY_ID': 'AKIASIMULATOR',
+                      'AWS_SECRET_ACCESS_KEY': 'simulator',
+                      'AWS_DEFAULT_REGION': REGION}
+
+
+class BenchmarkBlueprint(Blueprint):
+    """Stack of WaitConditionHandles, depending on other stacks' outputs."""
+
+    VARIABLES = {
+        'Dependencies': {'type': str,
+                         'default': '',
+                         'description': 'Outputs of the stacks this stack '
+                                        'depends on'},
+        'ResourceCount': {'type': int,
+                          'default': 5,
+                          'description': 'Number of resources'},
+        'Revision': {'type': str,
+                     'default': '1',
+                     'description': 'Changed to force a stack update'}
+    }
+
+    def create_template(self):
+        """Create template (without Parameters)."""
+        variables = self.get_variables()
+        template = self.template
+        for i in range(variables['ResourceCount']):
+            template.add_resource(WaitConditionHandle(
+                'Handle%d' % i,
+                Metadata={'Dependencies': variables['Dependencies'],
+                          'Revision': variables['Revision']}
+            ))
+        template.add_output(Output('Id', Value=Ref('Handle0')))
+
+
+def get_dependencies(count, shape, seed=0):
+    """Return list of the indexes of the stacks each stack depends on.
+
+    chain: each stack depends on the previous one
+    wide: every stack depends on the first one
+    layered: ~sqrt(count) layers, with each stack depending on 1-3 random
+        stacks of earlier layers
+    """
+    if shape == 'chain':
+        return [[i - 1] if i else [] for i in range(count)]
+    if shape == 'wide':
+        return [[0] if i else [] for i in range(count)]
+    rand = random.Random(seed)
+    width = max(1, int(round(count ** 0.5)))
+    dependencies = []
+    for i in range(count):
+        earlier = i - (i % width)
+        dependencies.append(
+            sorted(rand.sample(range(earlier), min(earlier,
+                                                   rand.randint(1, 3))))
+        )
+    return dependencies
+
+
+def generate_config(count, shape, revision='1', resources=5):
+    """Return stacker config YAML for a benchmark scenario."""
+    stacks = []
+    for i, deps in enumerate(get_dependencies(count, shape)):
+        stacks.append({
+            'name': 'stack%d' % i,
+            'class_path': 'benchmarks.stacker_orchestration.'
+                          'BenchmarkBlueprint',
+            'variables': {
+                'Dependencies': ','.join('${output stack%d::Id}' % dep
+                                         for dep in deps),
+                'ResourceCount': resources,
+                'Revision': revision
+            }
+        })
+    return yaml.safe_dump({'namespace': NAMESPACE,
+                           'stacker_bucket': STACKER_BUCKET,
+                           'stacks': stacks})
+
+
+def run_action(action, raw_config, concurrency=0):
+    """Run a stacker action, as the stacker CLI would."""
+    context = Context(environment={},
+                      config=render_parse_load(raw_config, environment={}))
+    provider_builder = ProviderBuilder(region=REGION)
+    cancel = threading.Event()
+    if action == 'diff':
+        diff.Action(context, provider_builder=provider_builder,
+                    cancel=cancel).execute(concurrency=concurrency)
+    elif action == 'destroy':
+        destroy.Action(context, provider_builder=provider_builder,
+                       cancel=cancel).execute(force=True,
+                                              concurrency=concurrency)
+    else:
+        build.Action(context, provider_builder=provider_builder,
+                     cancel=cancel).execute(concurrency=concurrency)
+
+
+def get_peak_rss_mb():
+    """Return peak resident set size of this process in MB."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on linux, bytes on macOS
+    return maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_scenario(scenario, results):
+    """Run a benchmark scenario (in a child process)."""
+    os.environ.update(SIMULATOR_ENV_VARS)
+    # Polling interval of the build/destroy actions (30s by default)
+    build.STACK_POLL_TIME = scenario['poll_time']
+    destroy.STACK_POLL_TIME = scenario['poll_time']
+    simulator = CloudSimulator(stack_latency=0)
+    simulator.install()
+    result = dict(scenario)
+    result.update({'seconds': None, 'api_calls': None, 'calls': {},
+                   'throttled': None, 'peak_rss_mb': None,
+                   'rss_growth_mb': None, 'error': None})
+    try:
+        config = generate_config(scenario['stacks'], scenario['shape'],
+                                 resources=scenario['resources'])
+        # Other actions need the stacks to exist already
+        if scenario['action'] != 'build':
+            run_action('build', config, scenario['concurrency'])
+        if scenario['action'] == 'update':
+            config = generate_config(scenario['stacks'], scenario['shape'],
+                                     revision='2',
+                                     resources=scenario['resources'])
+        simulator.stack_latency = scenario['stack_latency']
+        if scenario['api_rate']:
+            simulator.throttle = TokenBucket(scenario['api_rate'],
+                                             scenario['api_burst'])
+        simulator.reset_counters()
+        rss_before = get_peak_rss_mb()
+
+        start = time.time()
+        try:
+            run_action(scenario['action'], config, scenario['concurrency'])
+        finally:
+            result.update({
+                'seconds': round(time.time() - start, 3),
+                'api_calls': sum(simulator.calls.values()),
+                'calls': dict(simulator.calls),
+                'throttled': sum(simulator.throttled.values()),
+                'peak_rss_mb': round(get_peak_rss_mb(), 1),
+                'rss_growth_mb': round(get_peak_rss_mb() - rss_before, 1)
+            })
+    except SystemExit as exc:
+        result['error'] = "exited with %s" % exc.code
+    except Exception as exc:  # pylint: disable=broad-except
+        result['error'] = repr(exc)
+    finally:
+        results.put(result)
+
+
+RESULTS_ROW = "%-8s %6s %-8s %9s %9s %9s %9s  %s"
+
+
+def print_result(result):
+    """Print results table row."""
+    print(RESULTS_ROW % (result['action'], result['stacks'], result['shape'],
+                         result['seconds'], result['api_calls'],
+                         result['throttled'], result['peak_rss_mb'],
+                         result['error'] or ''))
+    sys.stdout.flush()
+
+
+def main(args=None):
+    """Run benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--stacks', type=int, nargs='+', default=[10, 100],
+                        help='stack counts (default: 10 100)')
+    parser.add_argument('--shapes', nargs='+', choices=SHAPES,
+                        default=['layered'],
+                        help='dependency graph shapes (default: layered)')
+    parser.add_argument('--actions', nargs='+', choices=ACTIONS,
+                        default=ACTIONS, help='stacker actions to run')
+    parser.add_argument('--resources', type=int, default=5,
+                        help='resources (stack events) per stack')
+    parser.add_argument('--concurrency', type=int, default=0,
+                        help='stacker concurrency (default: unlimited)')
+    parser.add_argument('--stack-latency', type=float, default=1.0,
+                        help='seconds for stack operations to complete')
+    parser.add_argument('--poll-time', type=float, default=0.25,
+                        help='stacker stack polling interval in seconds')
+    parser.add_argument('--api-rate', type=float,
+                        help='CloudFormation API calls/sec before '
+                             'throttling (default: unlimited)')
+    parser.add_argument('--api-burst', type=int,
+                        help='CloudFormation API burst capacity')
+    parser.add_argument('--json', metavar='PATH',
+                        help='also write results to a JSON file')
+    options = parser.parse_args(args)
+    logging.basicConfig(level=logging.CRITICAL)
+
+    print(RESULTS_ROW % ('action', 'stacks', 'shape', 'seconds',
+                         'api calls', 'throttled', 'peak MB', 'error'))
+    results = []
+    for count in options.stacks:
+        for shape in options.shapes:
+            for action in options.actions:
+                scenario = {'action': action,
+                            'stacks': count,
+                            'shape': shape,
+                            'resources': options.resources,
+                            'concurrency': options.concurrency,
+                            'stack_latency': options.stack_latency,
+                            'poll_time': options.poll_time,
+                            'api_rate': options.api_rate,
+                            'api_burst': options.api_burst}
+                queue = multiprocessing.Queue()
+                process = multiprocessing.Process(target=run_scenario,
+                                                  args=(scenario, queue))
+                process.start()
+                result = queue.get()
+                process.join()
+                results.append(result)
+                print_result(result)
+    if options.json:
+        with open(options.json, 'w') as stream:
+            json.dump(results, stream, indent=2, sort_keys=True)
+    return 1 if any(i['error'] for i in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""Per-call AWS API metrics, collected via botocore event handlers.
+
+Setting ``RUNWAY_API_METRICS`` (to ``true``) logs a summary of the AWS API
+calls (counts, latencies, retries & throttling per service/operation, and
+the busiest stacks) at the end of each Runway/stacker action. Setting
+``RUNWAY_API_METRICS_FILE`` to a path appends each action's metrics to it as
+a line of JSON.
+"""
+from __future__ import division
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Tuple  # noqa pylint: disable=unused-import
+
+from .util import strtobool
+
+LOGGER = logging.getLogger('runway')
+API_METRICS_ENV_VAR = 'RUNWAY_API_METRICS'
+API_METRICS_FILE_ENV_VAR = 'RUNWAY_API_METRICS_FILE'
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+# Error codes botocore retries as throttling
+THROTTLING_ERROR_CODES = frozenset([
+    'Throttling', 'ThrottlingException', 'ThrottledException',
+    'RequestThrottledException', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'RequestLimitExceeded',
+    'BandwidthLimitExceeded', 'LimitExceededException', 'RequestThrottled',
+    'SlowDown', 'EC2ThrottledException'
+])
+SUMMARY_TOP_STACKS = 10
+
+
+def get_metrics_file():
+    """Return absolute path of the metrics file (or None if not exporting)."""
+    path = os.environ.get(API_METRICS_FILE_ENV_VAR)
+    if path and not os.path.isabs(path):
+        # Modules change directory; keep writing to the same file
+        path = os.path.abspath(path)
+        os.environ[API_METRICS_FILE_ENV_VAR] = path
+    return path
+
+
+def is_enabled():
+    """Return true if API metrics should be collected."""
+    return bool(os.environ.get(API_METRICS_FILE_ENV_VAR)) or strtobool(
+        os.environ.get(API_METRICS_ENV_VAR, 'false')
+    )
+
+
+def get_stack_name(params):
+    """Return name of the stack an API call is for (or None)."""
+    stack = params.get('StackName')
+    if stack and stack.startswith('arn:'):
+        # arn:aws:cloudformation:<region>:<account>:stack/<name>/<id>
+        stack = stack.split(':', 5)[-1].split('/')[1]
+    return stack
+
+
+class OperationMetrics(object):  # pylint: disable=too-few-public-methods
+    """Aggregated metrics of an API operation."""
+
+    def __init__(self):
+        """Initialize metrics."""
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttles = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add_call(self, latency_ms, retries, error):
+        """Record a call."""
+        self.calls += 1
+        self.retries += retries
+        if error:
+            self.errors += 1
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS_MS,
+                                          latency_ms)] += 1
+
+    def get_percentile_ms(self, percentile):
+        """Return (upper bound of the bucket of) a latency percentile."""
+        target = sum(self.histogram) * percentile / 100
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.histogram):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return self.max_ms
+
+    def to_dict(self):
+        """Return JSON serializable metrics."""
+        labels = ["<=%d" % i for i in LATENCY_BUCKETS_MS] + [
+            ">%d" % LATENCY_BUCKETS_MS[-1]
+        ]
+        return {'calls': self.calls,
+                'errors': self.errors,
+                'retries': self.retries,
+                'throttles': self.throttles,
+                'total_ms': round(self.total_ms, 1),
+                'max_ms': round(self.max_ms, 1),
+                'latency_histogram_ms': dict(
+                    (label, count)
+                    for label, count in zip(labels, self.histogram) if count
+                )}
+
+
+class ApiMetrics(object):
+    """Collector of the API calls of the sessions registered with it."""
+
+    def __init__(self):
+        """Initialize collector."""
+        self.lock = threading.Lock()
+        self.started = time.time()
+        # keyed by (service, operation, stack name or None)
+        self.operations = {}  # type: Dict[Tuple[str, str, str], OperationMetrics]  # noqa
+
+    def register(self, events):
+        """Register handlers on a session/client's event system."""
+        events.register('before-parameter-build', self._before_call,
+                        unique_id='runway-api-metrics-before')
+        # First, as the retry handler's response ends the event's emission
+        events.register_first('needs-retry', self._needs_retry,
+                              unique_id='runway-api-metrics-retry')
+        events.register('after-call', self._after_call,
+                        unique_id='runway-api-metrics-after')
+        events.register('after-call-error', self._after_call_error,
+                        unique_id='runway-api-metrics-error')
+
+    def reset(self):
+        """Discard collected metrics."""
+        with self.lock:
+            self.operations = {}
+            self.started = time.time()
+
+    def _get(self, model, stack):
+        key = (model.service_model.service_name, model.name, stack)
+        if key not in self.operations:
+            self.operations[key] = OperationMetrics()
+        return self.operations[key]
+
+    @staticmethod
+    def _before_call(params, model, context, **_kwargs):
+        # The request context is passed to the later events of the call
+        context['runway_api_metrics'] = (time.time(), model,
+                                         get_stack_name(params))
+
+    def _needs_retry(self, response, operation, request_dict, **_kwargs):
+        if not response:
+            return
+        code = response[1].get('Error', {}).get('Code')
+        if code in THROTTLING_ERROR_CODES:
+            _start, _model, stack = request_dict.get('context', {}).get(
+                'runway_api_metrics', (None, None, None)
+            )
+            with self.lock:
+                self._get(operation, stack).throttles += 1
+
+    def _record(self, context, retries, error):
+        if 'runway_api_metrics' not in context:
+            return
+        started, model, stack = context['runway_api_metrics']
+        with self.lock:
+            self._get(model, stack).add_call((time.time() - started) * 1000,
+                                             retries, error)
+
+    def _after_call(self, http_response, parsed, context, **_kwargs):
+        self._record(context,
+                     parsed.get('ResponseMetadata', {}).get('RetryAttempts',
+                                                            0),
+                     http_response.status_code >= 300)
+
+    def _after_call_error(self, context, **_kwargs):
+        self._record(context, 0, True)
+
+    def get_operation_totals(self):
+        """Return metrics of each service/operation (across stacks)."""
+        totals = {}
+        with self.lock:
+            for (service, operation, _stack), metrics in self.operations.items():  # noqa
+                total = totals.setdefault((service, operation),
+                                          OperationMetrics())
+                total.calls += metrics.calls
+                total.errors += metrics.errors
+                total.retries += metrics.retries
+                total.throttles += metrics.throttles
+                total.total_ms += metrics.total_ms
+                total.max_ms = max(total.max_ms, metrics.max_ms)
+                total.histogram = [a + b for a, b in zip(total.histogram,
+                                                         metrics.histogram)]
+        return totals
+
+    def get_stack_calls(self):
+        """Return number of calls made for each stack."""
+        stacks = {}
+        with self.lock:
+            for (_service, _operation, stack), metrics in self.operations.items():  # noqa
+                if stack:
+                    stacks[stack] = stacks.get(stack, 0) + metrics.calls
+        return stacks
+
+    def to_dict(self, action):
+        """Return JSON serializable metrics."""
+        stacks = {}
+        with self.lock:
+            for (service, operation, stack), metrics in self.operations.items():  # noqa
+                if stack:
+                    stacks.setdefault(stack, {})[
+                        "%s.%s" % (service, operation)
+                    ] = metrics.to_dict()
+        return {'action': action,
+                'pid': os.getpid(),
+                'started': self.started,
+                'seconds': round(time.time() - self.started, 3),
+                'operations': dict(
+                    ("%s.%s" % key, metrics.to_dict())
+                    for key, metrics in sorted(
+                        self.get_operation_totals().items()
+                    )
+                ),
+                'stacks': stacks}
+
+    def log_summary(self, action):
+        """Log summary of the calls made."""
+        totals = self.get_operation_totals()
+        if not totals:
+            return
+        LOGGER.info("AWS API calls (%s): %d calls, %d retries, "
+                    "%d throttled",
+                    action,
+                    sum(i.calls for i in totals.values()),
+                    sum(i.retries for i in totals.values()),
+                    sum(i.throttles for i in totals.values()))
+        row = "  %-40s %7s %7s %7s %9s %8s %8s %8s"
+        LOGGER.info(row, 'operation', 'calls', 'errors', 'retries',
+                    'throttled', 'avg ms', 'p90 ms', 'max ms')
+        for (service, operation), metrics in sorted(
+                totals.items(), key=lambda i: -i[1].calls):
+            LOGGER.info(row,
+                        "%s.%s" % (service, operation),
+                        metrics.calls,
+                        metrics.errors,
+                        metrics.retries,
+                        metrics.throttles,
+                        "%.0f" % (metrics.total_ms / max(metrics.calls, 1)),
+                        "<=%s" % metrics.get_percentile_ms(90),
+                        "%.0f" % metrics.max_ms)
+        stacks = sorted(self.get_stack_calls().items(),
+                        key=lambda i: (-i[1], i[0]))
+        if stacks:
+            LOGGER.info("  Most API calls by stack: %s",
+                        ", ".join("%s (%d)" % i
+                                  for i in stacks[:SUMMARY_TOP_STACKS]))
+
+    def report(self, action):
+        """Log summary & export metrics of an action (if enabled)."""
+        if strtobool(os.environ.get(API_METRICS_ENV_VAR, 'false')):
+            self.log_summary(action)
+        path = get_metrics_file()
+        if path and self.operations:
+            with open(path, 'a') as stream:
+                stream.write(json.dumps(self.to_dict(action)) + '\n')
+
+
+METRICS = ApiMetrics()
+
+
+def register_session(session):
+    """Collect metrics of a boto3/botocore session's calls (if enabled)."""
+    if is_enabled():
+        METRICS.register(session.events if hasattr(session, 'events')
+                         else session.get_component('event_emitter'))
+    return session
+
+
+def start():
+    """Start collecting metrics of an action (if enabled).
+
+    Calls made via boto3's default session are included, and the metrics
+    file path is made absolute for child processes started afterwards.
+    """
+    if is_enabled():
+        import boto3
+        get_metrics_file()
+        register_session(boto3._get_default_session())  # noqa pylint: disable=protected-access
+
+
+def report(action):
+    """Log summary & export metrics of the calls made during an action."""
+    if is_enabled():
+        METRICS.report(action)
+        METRICS.reset()
@@ -10,12 +10,15 @@ Usage:
   runway gitclean
   runway gen-sample (cfn|sls-tsc|sls|tf|stacker|cdk-tsc|cdk-py|cdk-csharp)
   runway whichenv
+  runway daemon [--socket=<path>] [--idle-timeout=<seconds>]
   runway -h | --help
   runway --version
 
 Options:
   -h --help                         Show this screen.
   --version                         Show version.
+  --socket=<path>                   Daemon socket path.
+  --idle-timeout=<seconds>          Seconds before an idle daemon exits.
 
 Help:
   * Set the DEPLOY_ENVIRONMENT environment variable to set/override the
@@ -24,16 +27,20 @@ Help:
     falling back to name of the parent folder of the module.
   * All deploy commands (e.g. sls deploy, tf apply) will be run interactively
     unless the CI environment variable is set.
+  * When the RUNWAY_DAEMON_SOCKET environment variable is set to the socket
+    of a running `runway daemon`, commands are run by the (warm) daemon.
 
 """
 
 
 import logging
 import os
+import sys
 
 from docopt import docopt
 
 from . import __version__ as version
+from .daemon import forward_to_daemon
 
 from .commands.command_loader import find_command_class
 
@@ -50,6 +57,10 @@ def fix_hyphen_commands(raw_cli_arguments):
 
 def main():
     """Provide main CLI entrypoint."""
+    daemon_exit_code = forward_to_daemon(sys.argv[1:])
+    if daemon_exit_code is not None:
+        sys.exit(daemon_exit_code)
+
     if os.environ.get('DEBUG'):
         logging.basicConfig(level=logging.DEBUG)
     else:
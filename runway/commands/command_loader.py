@@ -4,14 +4,32 @@ import importlib
 
 from inspect import getmembers, isclass
 
-ALL_COMMANDS_MODULE = importlib.import_module("runway.commands")
+# Modules of each command; only the selected command's module is imported,
+# keeping the CLI fast to start (e.g. `runway whichenv` doesn't load boto3)
+COMMAND_MODULES = {
+    'daemon': 'runway.commands.runway.daemon',
+    'gen_sample': 'runway.commands.runway.gen_sample',
+    'gitclean': 'runway.commands.runway.gitclean',
+    'init': 'runway.commands.runway.init',
+    'preflight': 'runway.commands.runway.preflight',
+    'test': 'runway.commands.runway.test',
+    'whichenv': 'runway.commands.runway.whichenv',
+    'deploy': 'runway.commands.modules.deploy',
+    'destroy': 'runway.commands.modules.destroy',
+    'dismantle': 'runway.commands.modules.dismantle',
+    'plan': 'runway.commands.modules.plan',
+    'takeoff': 'runway.commands.modules.takeoff',
+    'taxi': 'runway.commands.modules.taxi'
+}
 
 
 def find_command_class(possible_command_names):
     """Try to find a class for one of the given command names."""
     for command_name in possible_command_names:
-        if hasattr(ALL_COMMANDS_MODULE, command_name):
-            command_module = getattr(ALL_COMMANDS_MODULE, command_name)
+        if command_name in COMMAND_MODULES:
+            command_module = importlib.import_module(
+                COMMAND_MODULES[command_name]
+            )
             command_class_hierarchy = getmembers(command_module, isclass)
             command_class_tuple = list(filter(_not_base_class, command_class_hierarchy))[0]
             return command_class_tuple[1]
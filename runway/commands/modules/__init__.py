@@ -1,10 +1 @@
-"""Import classes."""
-
-# pylint: disable = wildcard-import
-
-from .deploy    import *  # noqa
-from .destroy   import *  # noqa
-from .dismantle import *  # noqa
-from .plan      import *  # noqa
-from .takeoff   import *  # noqa
-from .taxi      import *  # noqa
+"""Module (deployment) commands."""
@@ -1,15 +1,12 @@
 """runway env module."""
 from __future__ import print_function
 
-# pylint trips up on this in virtualenv
-# https://github.com/PyCQA/pylint/issues/73
-from distutils.util import strtobool  # noqa pylint: disable=no-name-in-module,import-error
-
 import copy
 import glob
 import logging
 import os
 import sys
+from multiprocessing.pool import ThreadPool
 
 from builtins import input
 
@@ -19,9 +16,20 @@ import yaml
 
 from .runway_command import RunwayCommand, get_env, get_deployment_env_vars
 from ..context import Context
-from ..util import change_dir, load_object_from_string, merge_dicts
+from ..fingerprint import (
+    calculate_module_fingerprint, get_fingerprint_config,
+    get_fingerprint_name, get_fingerprint_store
+)
+from .. import api_metrics, tracing
+from ..identity import (
+    cache_identity, get_account_aliases, get_account_id, get_caller_identity
+)
+from ..util import (
+    change_dir, load_object_from_string, merge_dicts, strtobool
+)
 
 LOGGER = logging.getLogger('runway')
+PREFLIGHT_CONCURRENCY = 10
 
 
 def assume_role(role_arn, session_name=None, duration_seconds=None,
@@ -43,9 +51,18 @@ def assume_role(role_arn, session_name=None, duration_seconds=None,
     sts_client = boto3.client('sts', region_name=region, **boto_args)
     LOGGER.info("Assuming role %s...", role_arn)
     response = sts_client.assume_role(**assume_role_opts)
-    return {'AWS_ACCESS_KEY_ID': response['Credentials']['AccessKeyId'],
-            'AWS_SECRET_ACCESS_KEY': response['Credentials']['SecretAccessKey'],  # noqa
-            'AWS_SESSION_TOKEN': response['Credentials']['SessionToken']}
+    credentials = {
+        'AWS_ACCESS_KEY_ID': response['Credentials']['AccessKeyId'],
+        'AWS_SECRET_ACCESS_KEY': response['Credentials']['SecretAccessKey'],
+        'AWS_SESSION_TOKEN': response['Credentials']['SessionToken']
+    }
+    # The assumed role ARN includes the account id, saving a later
+    # get_caller_identity call when validating the account
+    cache_identity(merge_dicts(env_vars or {}, credentials),
+                   {'Account': response['AssumedRoleUser']['Arn'].split(':')[4],
+                    'Arn': response['AssumedRoleUser']['Arn'],
+                    'UserId': response['AssumedRoleUser']['AssumedRoleId']})
+    return credentials
 
 
 def determine_module_class(path, class_path):
@@ -108,23 +125,32 @@ def post_deploy_assume_role(assume_role_config, context):
             context.restore_existing_iam_env_vars()
 
 
+def get_assume_role_arn(assume_role_config, env_name):
+    """Return (role ARN, duration) to assume for an environment.
+
+    The ARN is empty if no role is configured for the environment.
+    """
+    if not isinstance(assume_role_config, dict):
+        return (assume_role_config, None)
+    if assume_role_config.get('arn'):
+        return (assume_role_config['arn'], assume_role_config.get('duration'))
+    if assume_role_config.get(env_name):
+        if isinstance(assume_role_config[env_name], dict):
+            return (assume_role_config[env_name]['arn'],
+                    assume_role_config[env_name].get('duration'))
+        return (assume_role_config[env_name], None)
+    return ('', None)
+
+
 def pre_deploy_assume_role(assume_role_config, context):
     """Assume role (prior to deployment)."""
     if isinstance(assume_role_config, dict):
-        assume_role_arn = ''
         if assume_role_config.get('post_deploy_env_revert'):
             context.save_existing_iam_env_vars()
-        if assume_role_config.get('arn'):
-            assume_role_arn = assume_role_config['arn']
-            assume_role_duration = assume_role_config.get('duration')
-        elif assume_role_config.get(context.env_name):
-            if isinstance(assume_role_config[context.env_name], dict):
-                assume_role_arn = assume_role_config[context.env_name]['arn']  # noqa
-                assume_role_duration = assume_role_config[context.env_name].get('duration')  # noqa pylint: disable=line-too-long
-            else:
-                assume_role_arn = assume_role_config[context.env_name]
-                assume_role_duration = None
-        else:
+        assume_role_arn, assume_role_duration = get_assume_role_arn(
+            assume_role_config, context.env_name
+        )
+        if not assume_role_arn:
             LOGGER.info('Skipping assume-role; no role found for '
                         'environment %s...',
                         context.env_name)
@@ -149,71 +175,65 @@ def pre_deploy_assume_role(assume_role_config, context):
         )
 
 
-def validate_account_alias(iam_client, account_alias):
-    """Exit if list_account_aliases doesn't include account_alias."""
-    # Super overkill here using pagination when an account can only
-    # have a single alias, but at least this implementation should be
-    # future-proof
-    current_account_aliases = []
-    paginator = iam_client.get_paginator('list_account_aliases')
-    response_iterator = paginator.paginate()
-    for page in response_iterator:
-        current_account_aliases.extend(page.get('AccountAliases', []))
-    if account_alias in current_account_aliases:
-        LOGGER.info('Verified current AWS account alias matches required '
-                    'alias %s.',
-                    account_alias)
+def get_required_account(deployment, env_name):
+    """Return account id & alias required by a deployment (or None)."""
+    if isinstance(deployment.get('account-id'), (int, six.string_types)):
+        account_id = str(deployment['account-id'])
+    elif deployment.get('account-id', {}).get(env_name):
+        account_id = str(deployment['account-id'][env_name])
     else:
-        LOGGER.error('Current AWS account aliases "%s" do not match '
-                     'required account alias %s in Runway config.',
-                     ','.join(current_account_aliases),
-                     account_alias)
-        sys.exit(1)
+        account_id = None
+    if isinstance(deployment.get('account-alias'), six.string_types):
+        account_alias = deployment['account-alias']
+    elif deployment.get('account-alias', {}).get(env_name):
+        account_alias = deployment['account-alias'][env_name]
+    else:
+        account_alias = None
+    return (account_id, account_alias)
+
 
+def get_account_credential_errors(deployment, env_name, env_vars):
+    """Return errors from checking deployment account against credentials.
 
-def validate_account_id(sts_client, account_id):
-    """Exit if get_caller_identity doesn't match account_id."""
-    resp = sts_client.get_caller_identity()
-    if 'Account' in resp:
-        if resp['Account'] == account_id:
+    Identities & aliases are cached for the run, so each set of
+    credentials (and account) is only looked up once.
+    """
+    errors = []
+    (account_id, account_alias) = get_required_account(deployment, env_name)
+    if account_id:
+        current_account_id = get_caller_identity(env_vars).get('Account')
+        if not current_account_id:
+            errors.append('Error checking current account ID')
+        elif current_account_id == account_id:
             LOGGER.info('Verified current AWS account matches required '
                         'account id %s.',
                         account_id)
         else:
-            LOGGER.error('Current AWS account %s does not match '
-                         'required account %s in Runway config.',
-                         resp['Account'],
-                         account_id)
-            sys.exit(1)
-    else:
-        LOGGER.error('Error checking current account ID')
-        sys.exit(1)
+            errors.append('Current AWS account %s does not match '
+                          'required account %s in Runway config.'
+                          % (current_account_id, account_id))
+    if account_alias:
+        current_account_aliases = get_account_aliases(env_vars)
+        if account_alias in current_account_aliases:
+            LOGGER.info('Verified current AWS account alias matches required '
+                        'alias %s.',
+                        account_alias)
+        else:
+            errors.append('Current AWS account aliases "%s" do not match '
+                          'required account alias %s in Runway config.'
+                          % (','.join(current_account_aliases), account_alias))
+    return errors
 
 
 def validate_account_credentials(deployment, context):
     """Exit if requested deployment account doesn't match credentials."""
-    boto_args = {'region_name': context.env_vars['AWS_DEFAULT_REGION']}
-    for i in ['aws_access_key_id', 'aws_secret_access_key',
-              'aws_session_token']:
-        if context.env_vars.get(i.upper()):
-            boto_args[i] = context.env_vars[i.upper()]
-    if isinstance(deployment.get('account-id'), (int, six.string_types)):
-        account_id = str(deployment['account-id'])
-    elif deployment.get('account-id', {}).get(context.env_name):
-        account_id = str(deployment['account-id'][context.env_name])
-    else:
-        account_id = None
-    if account_id:
-        validate_account_id(boto3.client('sts', **boto_args), account_id)
-    if isinstance(deployment.get('account-alias'), six.string_types):
-        account_alias = deployment['account-alias']
-    elif deployment.get('account-alias', {}).get(context.env_name):
-        account_alias = deployment['account-alias'][context.env_name]
-    else:
-        account_alias = None
-    if account_alias:
-        validate_account_alias(boto3.client('iam', **boto_args),
-                               account_alias)
+    errors = get_account_credential_errors(deployment,
+                                           context.env_name,
+                                           context.env_vars)
+    for i in errors:
+        LOGGER.error(i)
+    if errors:
+        sys.exit(1)
 
 
 def echo_detected_environment(env_name, env_vars):
@@ -240,8 +260,22 @@ def echo_detected_environment(env_name, env_vars):
 class ModulesCommand(RunwayCommand):
     """Env deployment class."""
 
-    def run(self, deployments=None, command='plan'):  # noqa pylint: disable=too-many-branches,too-many-statements
+    def __init__(self, cli_arguments, env_root=None, runway_config_dir=None):
+        """Initialize base class."""
+        super(ModulesCommand, self).__init__(cli_arguments, env_root,
+                                             runway_config_dir)
+        # modules skipped due to matching fingerprints, for the run summary
+        self.unchanged_modules = []
+
+    def run(self, deployments=None, command='plan'):
         """Execute apps/code command."""
+        api_metrics.start()
+        try:
+            self._run_deployments(deployments, command)
+        finally:
+            api_metrics.report("runway %s" % command)
+
+    def _run_deployments(self, deployments, command):  # noqa pylint: disable=too-many-branches,too-many-statements
         if deployments is None:
             deployments = self.runway_config['deployments']
         context = Context(env_name=get_env(self.env_root,
@@ -283,55 +317,120 @@ class ModulesCommand(RunwayCommand):
                 )
 
         LOGGER.info("Found %d deployment(s)", len(deployments_to_run))
+        self.preflight_account_validation(deployments_to_run, context)
         for i, deployment in enumerate(deployments_to_run):
-            LOGGER.info("")
-            LOGGER.info("")
-            LOGGER.info("======= Processing deployment '%s' ===========================",
-                        deployment.get('name'))
-
-            if deployment.get('regions'):
-                if deployment.get('env_vars'):
-                    deployment_env_vars = get_deployment_env_vars(context.env_name,
-                                                                  deployment['env_vars'],
-                                                                  self.env_root)
-                    if deployment_env_vars:
-                        LOGGER.info("OS environment variable overrides being "
-                                    "applied this deployment: %s",
-                                    str(deployment_env_vars))
-                    context.env_vars = merge_dicts(context.env_vars, deployment_env_vars)
-
+            with tracing.span("deployment %s" % deployment.get('name'),
+                              'deployment'):
                 LOGGER.info("")
-                LOGGER.info("Attempting to deploy '%s' to region(s): %s",
-                            context.env_name,
-                            ", ".join(deployment['regions']))
+                LOGGER.info("")
+                LOGGER.info("======= Processing deployment '%s' ===========================",
+                            deployment.get('name'))
+
+                if deployment.get('regions'):
+                    if deployment.get('env_vars'):
+                        deployment_env_vars = get_deployment_env_vars(context.env_name,
+                                                                      deployment['env_vars'],
+                                                                      self.env_root)
+                        if deployment_env_vars:
+                            LOGGER.info("OS environment variable overrides being "
+                                        "applied this deployment: %s",
+                                        str(deployment_env_vars))
+                        context.env_vars = merge_dicts(context.env_vars, deployment_env_vars)
 
-                for region in deployment['regions']:
                     LOGGER.info("")
-                    LOGGER.info("======= Processing region %s ================"
-                                "===========", region)
-
-                    context.env_region = region
-                    context.env_vars = merge_dicts(
-                        context.env_vars,
-                        {'AWS_DEFAULT_REGION': context.env_region,
-                         'AWS_REGION': context.env_region}
-                    )
+                    LOGGER.info("Attempting to deploy '%s' to region(s): %s",
+                                context.env_name,
+                                ", ".join(deployment['regions']))
+
+                    for region in deployment['regions']:
+                        with tracing.span("region %s" % region, 'region'):
+                            LOGGER.info("")
+                            LOGGER.info("======= Processing region %s ================"
+                                        "===========", region)
+
+                            context.env_region = region
+                            context.env_vars = merge_dicts(
+                                context.env_vars,
+                                {'AWS_DEFAULT_REGION': context.env_region,
+                                 'AWS_REGION': context.env_region}
+                            )
+                            if deployment.get('assume-role'):
+                                pre_deploy_assume_role(deployment['assume-role'], context)
+                            if deployment.get('account-id') or (deployment.get('account-alias')):
+                                validate_account_credentials(deployment, context)
+
+                            modules = deployment.get('modules', [])
+                            if deployment.get('current_dir'):
+                                modules.append('.' + os.sep)
+                            for module in modules:
+                                self._deploy_module(module, deployment, context, command)
+
                     if deployment.get('assume-role'):
-                        pre_deploy_assume_role(deployment['assume-role'], context)
-                    if deployment.get('account-id') or (deployment.get('account-alias')):
-                        validate_account_credentials(deployment, context)
-
-                    modules = deployment.get('modules', [])
-                    if deployment.get('current_dir'):
-                        modules.append('.' + os.sep)
-                    for module in modules:
-                        self._deploy_module(module, deployment, context, command)
-
-                if deployment.get('assume-role'):
-                    post_deploy_assume_role(deployment['assume-role'], context)
-            else:
-                LOGGER.error('No region configured for any deployment')
-                sys.exit(1)
+                        post_deploy_assume_role(deployment['assume-role'], context)
+                else:
+                    LOGGER.error('No region configured for any deployment')
+                    sys.exit(1)
+
+        if self.unchanged_modules:
+            LOGGER.info("")
+            LOGGER.info("Skipped %d unchanged module(s): %s",
+                        len(self.unchanged_modules),
+                        ", ".join(self.unchanged_modules))
+
+    def preflight_account_validation(self, deployments, context):
+        """Validate deployment accounts up front, before any module runs.
+
+        Deployments are checked concurrently with the credentials they will
+        be run with. Credentials obtained via assume-role can't be checked
+        ahead of time, so those deployments (and, when their credentials
+        aren't reverted afterwards, the deployments following them) are
+        validated when processed as usual.
+        """
+        checks = []
+        env_vars = context.env_vars
+        for deployment in deployments:
+            # As when run, deployment env vars remain set for the
+            # deployments following them (even if credentials are reverted)
+            if deployment.get('regions') and deployment.get('env_vars'):
+                env_vars = merge_dicts(env_vars, get_deployment_env_vars(
+                    context.env_name, deployment['env_vars'], self.env_root
+                ), deep_merge=False)
+            if deployment.get('assume-role'):
+                if isinstance(deployment['assume-role'], dict) and (
+                        deployment['assume-role'].get(
+                            'post_deploy_env_revert')):
+                    continue
+                break
+            if deployment.get('regions') and (
+                    deployment.get('account-id') or (
+                        deployment.get('account-alias'))):
+                checks.append((deployment, merge_dicts(
+                    env_vars,
+                    {'AWS_DEFAULT_REGION': deployment['regions'][0],
+                     'AWS_REGION': deployment['regions'][0]},
+                    deep_merge=False
+                )))
+        if not checks:
+            return
+        LOGGER.info("Validating account(s) of %d deployment(s)...",
+                    len(checks))
+        pool = ThreadPool(min(len(checks), PREFLIGHT_CONCURRENCY))
+        try:
+            results = pool.map(
+                lambda check: get_account_credential_errors(
+                    check[0], context.env_name, check[1]
+                ),
+                checks
+            )
+        finally:
+            pool.terminate()
+        failed = False
+        for (deployment, _env_vars), errors in zip(checks, results):
+            for i in errors:
+                LOGGER.error("Deployment '%s': %s", deployment.get('name'), i)
+                failed = True
+        if failed:
+            sys.exit(1)
 
     def _deploy_module(self, module, deployment, context, command):
         module_opts = {}
@@ -349,6 +448,9 @@ class ModulesCommand(RunwayCommand):
         module_opts = load_module_opts_from_file(module_root, module_opts)
         if deployment.get('skip-npm-ci'):
             module_opts['skip_npm_ci'] = True
+        if deployment.get('skip_unchanged') and (
+                'skip_unchanged' not in module_opts):
+            module_opts['skip_unchanged'] = deployment['skip_unchanged']
 
         LOGGER.info("")
         LOGGER.info("---- Processing module '%s' for '%s' in %s --------------",
@@ -356,7 +458,8 @@ class ModulesCommand(RunwayCommand):
                     context.env_name,
                     context.env_region)
         LOGGER.info("Module options: %s", module_opts)
-        with change_dir(module_root):
+        with tracing.span("module %s" % module['path'], 'module',
+                          command=command), change_dir(module_root):
             # dynamically load the particular module's class, 'get' the method
             # associated with the command, and call the method
             module_class = determine_module_class(module_root,
@@ -367,13 +470,68 @@ class ModulesCommand(RunwayCommand):
                 options=module_opts
             )
             if hasattr(module_instance, command):
-                command_method = getattr(module_instance, command)
-                command_method()
+                fingerprint_config = get_fingerprint_config(module_opts)
+                if fingerprint_config and command in ['deploy', 'destroy']:
+                    self._run_fingerprinted_module_command(
+                        module_instance, command, module['path'], deployment,
+                        context, fingerprint_config
+                    )
+                else:
+                    command_method = getattr(module_instance, command)
+                    command_method()
             else:
                 LOGGER.error("'%s' is missing method '%s'",
                              module_instance, command)
                 sys.exit(1)
 
+    def _run_fingerprinted_module_command(self, module_instance, command,  # noqa pylint: disable=too-many-arguments
+                                          module_path, deployment, context,
+                                          fingerprint_config):
+        """Run module command, skipping deploys of unchanged modules."""
+        store = get_fingerprint_store(fingerprint_config['store'],
+                                      module_instance.path,
+                                      context.env_vars)
+        name = get_fingerprint_name(module_path,
+                                    context.env_name,
+                                    context.env_region,
+                                    get_account_id(context.env_vars))
+        if command == 'destroy':
+            module_instance.destroy()
+            store.delete(name)
+            return
+
+        # Only the current environment's options are relevant
+        module_opts = dict(module_instance.options)
+        module_opts['environments'] = module_opts.get(
+            'environments', {}
+        ).get(context.env_name)
+        env_var_config = deployment.get('env_vars', {})
+        fingerprint = calculate_module_fingerprint(
+            module_instance.path,
+            module_opts,
+            context.env_vars,
+            list(env_var_config.get('*', {})) + list(
+                env_var_config.get(context.env_name, {})
+            ) + ['AWS_PROFILE', 'DEPLOY_ENVIRONMENT'],
+            fingerprint_config,
+            get_assume_role_arn(deployment.get('assume-role'),
+                                context.env_name)[0] or None
+        )
+        if store.get(name) == fingerprint:
+            LOGGER.info("Skipping deploy of module '%s'; it is unchanged "
+                        "since its last deployment to %s in %s "
+                        "(fingerprint %s)",
+                        module_path,
+                        context.env_name,
+                        context.env_region,
+                        fingerprint)
+            self.unchanged_modules.append(
+                "%s (%s)" % (module_path, context.env_region)
+            )
+            return
+        module_instance.deploy()
+        store.put(name, fingerprint)
+
     @staticmethod
     def reverse_deployments(deployments=None):
         """Reverse deployments and the modules/regions in them."""
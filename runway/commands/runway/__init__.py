@@ -1,10 +1 @@
-"""Import classes."""
-
-# pylint: disable = wildcard-import
-
-from .gen_sample    import *  # noqa
-from .gitclean      import *  # noqa
-from .init          import *  # noqa
-from .preflight     import *  # noqa
-from .test          import *  # noqa
-from .whichenv      import *  # noqa
+"""Runway commands."""
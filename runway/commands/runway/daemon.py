@@ -0,0 +1,26 @@
+"""The daemon command."""
+import logging
+import sys
+
+from ..runway_command import RunwayCommand
+from ...daemon import (
+    DEFAULT_IDLE_TIMEOUT, get_default_socket_path, is_supported, serve
+)
+
+LOGGER = logging.getLogger('runway')
+
+
+class Daemon(RunwayCommand):
+    """Extend RunwayCommand with execute to run the daemon."""
+
+    def execute(self):
+        """Run warm daemon for other runway invocations."""
+        if not is_supported():
+            LOGGER.error('runway daemon requires Python 3 on a platform '
+                         'supporting Unix sockets')
+            sys.exit(1)
+        serve(
+            self._cli_arguments.get('--socket') or get_default_socket_path(),
+            int(self._cli_arguments.get('--idle-timeout') or
+                DEFAULT_IDLE_TIMEOUT)
+        )
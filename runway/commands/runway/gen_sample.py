@@ -1,5 +1,4 @@
 """The gen-sample command."""
-from distutils.version import LooseVersion  # noqa pylint: disable=import-error,no-name-in-module
 import json
 import logging
 import os
@@ -8,9 +7,6 @@ import shutil
 from subprocess import check_output
 import sys
 
-from botocore.vendored import requests
-import cfn_flip
-
 from ..runway_command import RunwayCommand
 
 LOGGER = logging.getLogger('runway')
@@ -178,6 +174,7 @@ def generate_sample_cdk_py_module(env_root, module_dir=None):
 
 def generate_sample_cfn_module(env_root, module_dir=None):
     """Generate skeleton CloudFormation sample module."""
+    import cfn_flip  # deferred to keep CLI startup fast
     if module_dir is None:
         module_dir = os.path.join(env_root, 'sampleapp.cfn')
     generate_sample_module(module_dir)
@@ -267,6 +264,9 @@ def generate_sample_tf_module(env_root, module_dir=None):
             os.path.join(module_dir, '.terraform-version'),
         )
     else:  # running directly from git
+        # deferred to keep CLI startup fast
+        from distutils.version import LooseVersion  # noqa pylint: disable=import-error,no-name-in-module
+        from botocore.vendored import requests
         tf_releases = json.loads(
             requests.get('https://releases.hashicorp.com/index.json').text
         )['terraform']
@@ -4,10 +4,10 @@ import logging
 import os
 import shutil
 
-from distutils.util import strtobool  # noqa pylint: disable=no-name-in-module,import-error
 from subprocess import check_call, check_output
 
 from ..runway_command import RunwayCommand
+from ...util import strtobool
 
 LOGGER = logging.getLogger('runway')
 
@@ -154,6 +154,47 @@ def get_env_from_directory(directory_name):
     return directory_name
 
 
+def find_git_dir(path):
+    """Return git directory of the repo containing path (or None).
+
+    Handles ``.git`` files (e.g. in worktrees & submodules), which point to
+    the actual git directory with a ``gitdir:`` line.
+    """
+    path = os.path.abspath(path)
+    while True:
+        dot_git = os.path.join(path, '.git')
+        if os.path.isdir(dot_git):
+            return dot_git
+        if os.path.isfile(dot_git):
+            with open(dot_git, 'r') as stream:
+                contents = stream.read().strip()
+            if contents.startswith('gitdir:'):
+                return os.path.normpath(os.path.join(
+                    path, contents[len('gitdir:'):].strip()
+                ))
+            return dot_git
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def get_git_branch(git_dir):
+    """Return current branch name from a git directory's HEAD.
+
+    Returns None for anything other than a checked out branch (e.g. a
+    detached HEAD), leaving it to GitPython to handle.
+    """
+    head_file = os.path.join(git_dir, 'HEAD')
+    if not os.path.isfile(head_file):
+        return None
+    with open(head_file, 'r') as stream:
+        head = stream.read().strip()
+    if head.startswith('ref: refs/heads/'):
+        return head[len('ref: refs/heads/'):]
+    return None
+
+
 def get_env(path, ignore_git_branch=False):
     """Determine environment name."""
     if 'DEPLOY_ENVIRONMENT' in os.environ:
@@ -164,20 +205,30 @@ def get_env(path, ignore_git_branch=False):
                     '("ignore_git_branch" is set to true in the runway '
                     'config)')
     else:
-        # These are not located with the top imports because they throw an
-        # error if git isn't installed
-        from git import Repo as GitRepo
-        from git.exc import InvalidGitRepositoryError
-
-        try:
-            b_name = GitRepo(
-                path,
-                search_parent_directories=True
-            ).active_branch.name
+        # Read the branch directly in the common cases, avoiding the slow
+        # import of GitPython
+        git_dir = None if 'GIT_DIR' in os.environ else find_git_dir(path)
+        b_name = get_git_branch(git_dir) if git_dir else None
+        if b_name:
             LOGGER.info('Deriving environment name from git branch %s...',
                         b_name)
             return get_env_from_branch(b_name)
-        except InvalidGitRepositoryError:
-            pass
+        if git_dir or 'GIT_DIR' in os.environ:
+            # These are not located with the top imports because they throw
+            # an error if git isn't installed
+            from git import Repo as GitRepo
+            from git.exc import InvalidGitRepositoryError
+
+            try:
+                b_name = GitRepo(
+                    path,
+                    search_parent_directories=True
+                ).active_branch.name
+                LOGGER.info('Deriving environment name from git branch '
+                            '%s...',
+                            b_name)
+                return get_env_from_branch(b_name)
+            except InvalidGitRepositoryError:
+                pass
     LOGGER.info('Deriving environment name from directory %s...', path)
     return get_env_from_directory(os.path.basename(path))
@@ -0,0 +1,338 @@
+"""Warm Runway daemon & client.
+
+The daemon pre-imports Runway's dependencies and then forks a child process
+per request, so each invocation starts warm but runs fully isolated (with
+the client's environment, working directory & stdio file descriptors).
+The client only needs the standard library, keeping it fast to start.
+"""
+from __future__ import print_function
+
+import array
+import errno
+import importlib
+import json
+import logging
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+import time
+
+from . import __version__ as version
+
+LOGGER = logging.getLogger('runway')
+DAEMON_SOCKET_ENV_VAR = 'RUNWAY_DAEMON_SOCKET'
+DEFAULT_IDLE_TIMEOUT = 3600
+# Imported before forking request handlers
+PRELOAD_MODULES = [
+    'boto3', 'botocore.session', 'yaml', 'troposphere', 'awacs',
+    'runway.commands.modules_command', 'runway.commands.runway.test',
+    'runway.module.cdk', 'runway.module.cloudformation',
+    'runway.module.serverless', 'runway.module.staticsite',
+    'runway.module.terraform'
+]
+# Service models loaded before forking request handlers
+PRELOAD_SERVICES = ['cloudformation', 'iam', 's3', 'ssm', 'sts']
+# Set in request handling processes, which must not forward to a daemon
+IN_DAEMON = False
+
+
+def is_supported():
+    """Return true if the daemon can run on this platform/python."""
+    return hasattr(socket, 'AF_UNIX') and hasattr(socket.socket, 'sendmsg')
+
+
+def get_default_socket_path():
+    """Return per-user daemon socket path."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, 'runway-daemon.sock')
+    return os.path.join('/tmp', "runway-%d" % os.getuid(), 'daemon.sock')
+
+
+def check_socket_dir(socket_dir):
+    """Return why a socket directory isn't private (or None if it is).
+
+    The client sends its environment (including AWS credentials) over the
+    socket, so it must be in a directory only the current user can use.
+    """
+    try:
+        dir_stat = os.lstat(socket_dir)
+    except OSError as exc:
+        return "%s can't be read (%s)" % (socket_dir, exc.strerror)
+    if stat.S_ISLNK(dir_stat.st_mode):
+        return "%s is a symlink" % socket_dir
+    if not stat.S_ISDIR(dir_stat.st_mode):
+        return "%s isn't a directory" % socket_dir
+    if dir_stat.st_uid != os.getuid():
+        return "%s isn't owned by the current user" % socket_dir
+    if stat.S_IMODE(dir_stat.st_mode) != 0o700:
+        return "%s has mode %o (instead of 700)" % (
+            socket_dir, stat.S_IMODE(dir_stat.st_mode)
+        )
+    return None
+
+
+def get_peer_uid(conn):
+    """Return uid of the process at the other end of a socket.
+
+    Returns None where the platform doesn't provide peer credentials (only
+    the socket directory's permissions restrict access there).
+    """
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                            struct.calcsize('3i'))
+    _pid, uid, _gid = struct.unpack('3i', creds)
+    return uid
+
+
+def is_trusted_peer(conn):
+    """Return true unless the socket's peer is another user's process."""
+    uid = get_peer_uid(conn)
+    return uid is None or uid == os.getuid()
+
+
+def read_message(conn):
+    """Read a newline-terminated JSON message (or None on EOF)."""
+    data = b''
+    while not data.endswith(b'\n'):
+        chunk = conn.recv(1)
+        if not chunk:
+            return None
+        data += chunk
+    return json.loads(data.decode())
+
+
+def send_message(conn, message):
+    """Send a newline-terminated JSON message."""
+    conn.sendall((json.dumps(message) + '\n').encode())
+
+
+def preload():
+    """Import modules & service models shared by all requests."""
+    for i in PRELOAD_MODULES:
+        try:
+            importlib.import_module(i)
+        except ImportError as exc:
+            LOGGER.debug("Not preloading %s: %s", i, exc)
+    try:
+        import botocore.session
+    except ImportError:
+        return
+    # The loader caches parsed models on the instance; it is shared with
+    # the sessions created by each request (see warm_boto3)
+    loader = botocore.session.get_session().get_component('data_loader')
+    for i in PRELOAD_SERVICES:
+        loader.load_service_model(i, 'service-2')
+        loader.load_service_model(i, 'paginators-1')
+    loader.load_data('endpoints')
+    return loader
+
+
+def warm_boto3(loader):
+    """Set up the request's default boto3 session with the warm loader.
+
+    A new session is created, so credentials are resolved from the
+    request's environment.
+    """
+    if loader is None:
+        return
+    import boto3
+    import botocore.session
+    session = botocore.session.get_session()
+    session.register_component('data_loader', loader)
+    boto3.DEFAULT_SESSION = boto3.session.Session(botocore_session=session)
+
+
+def receive_request(conn):
+    """Return client request & its stdio file descriptors."""
+    fds = array.array('i')
+    msg, ancdata, _flags, _addr = conn.recvmsg(
+        65536, socket.CMSG_LEN(3 * fds.itemsize)
+    )
+    for level, msg_type, data in ancdata:
+        if level == socket.SOL_SOCKET and msg_type == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+    while msg and not msg.endswith(b'\n'):
+        chunk = conn.recv(65536)
+        if not chunk:
+            return (None, list(fds))
+        msg += chunk
+    return (json.loads(msg.decode()) if msg else None, list(fds))
+
+
+def run_cli():
+    """Run the Runway CLI, returning its exit code."""
+    from .cli import main  # pylint: disable=cyclic-import
+    try:
+        main()
+    except SystemExit as exc:
+        if exc.code is None:
+            return 0
+        if isinstance(exc.code, int):
+            return exc.code
+        print(exc.code, file=sys.stderr)
+        return 1
+    except Exception:  # pylint: disable=broad-except
+        import traceback
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def handle_request(conn, loader):
+    """Run a Runway command for a client (in a forked process)."""
+    global IN_DAEMON  # pylint: disable=global-statement
+    IN_DAEMON = True
+    conn.setblocking(True)
+    request, fds = receive_request(conn)
+    if not request or request.get('version') != version or len(fds) != 3:
+        send_message(conn, {'error': "daemon is running runway %s" % version})
+        return 1
+    send_message(conn, {'pid': os.getpid()})
+
+    # Isolate the request: the client's stdio, environment & directory
+    for target, source in enumerate(fds):
+        os.dup2(source, target)
+        os.close(source)
+    os.environ.clear()
+    os.environ.update(request['env'])
+    os.chdir(request['cwd'])
+    sys.argv = ['runway'] + request['argv']
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    warm_boto3(loader)
+
+    exit_code = run_cli()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        send_message(conn, {'exit_code': exit_code})
+    except socket.error:
+        pass
+    return exit_code
+
+
+def serve(socket_path, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """Run the daemon until it has been idle for idle_timeout seconds."""
+    socket_dir = os.path.dirname(os.path.abspath(socket_path))
+    if not os.path.lexists(socket_dir):
+        os.makedirs(socket_dir, 0o700)
+    problem = check_socket_dir(socket_dir)
+    if problem:
+        LOGGER.error("Not starting runway daemon: %s; the socket must be in "
+                     "a directory private to the current user", problem)
+        sys.exit(1)
+    if os.path.exists(socket_path):
+        if forward_request(socket_path, [], probe=True):
+            LOGGER.error("A runway daemon is already listening on %s",
+                         socket_path)
+            sys.exit(1)
+        os.remove(socket_path)
+    loader = preload()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    server.settimeout(min(idle_timeout, 60))
+    # Request processes are reaped automatically
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    LOGGER.info("Runway daemon listening; use it by setting "
+                "%s=%s", DAEMON_SOCKET_ENV_VAR, socket_path)
+    last_request = time.time()
+    try:
+        while time.time() - last_request < idle_timeout:
+            try:
+                conn, _addr = server.accept()
+            except socket.timeout:
+                continue
+            last_request = time.time()
+            if not is_trusted_peer(conn):
+                LOGGER.warning("Ignoring request from another user's process")
+                conn.close()
+                continue
+            if os.fork() == 0:
+                server.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                exit_code = 1
+                try:
+                    exit_code = handle_request(conn, loader)
+                finally:
+                    os._exit(exit_code)  # pylint: disable=protected-access
+            conn.close()
+        LOGGER.info("Runway daemon idle for %ds; exiting", idle_timeout)
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def forward_request(socket_path, argv, probe=False):  # noqa pylint: disable=too-many-return-statements
+    """Run a Runway command via the daemon, returning its exit code.
+
+    Returns None if the daemon isn't available (or is running a different
+    Runway version), in which case the command should be run directly.
+    """
+    problem = check_socket_dir(os.path.dirname(os.path.abspath(socket_path)))
+    if problem:
+        if not probe:
+            LOGGER.warning("Not using runway daemon: %s", problem)
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except socket.error:
+        client.close()
+        return None
+    if not is_trusted_peer(client):
+        LOGGER.warning("Not using runway daemon: %s is served by another "
+                       "user's process", socket_path)
+        client.close()
+        return None
+    if probe:
+        client.close()
+        return True
+    try:
+        client.sendmsg(
+            [(json.dumps({'argv': argv,
+                          'env': dict(os.environ),
+                          'cwd': os.getcwd(),
+                          'version': version}) + '\n').encode()],
+            [(socket.SOL_SOCKET, socket.SCM_RIGHTS,
+              array.array('i', [sys.stdin.fileno(),
+                                sys.stdout.fileno(),
+                                sys.stderr.fileno()]))]
+        )
+        response = read_message(client)
+        if not response or 'pid' not in response:
+            return None
+        try:
+            result = read_message(client)
+        except KeyboardInterrupt:
+            # Pass the interrupt on to the request process, and wait for
+            # it to finish
+            os.kill(response['pid'], signal.SIGINT)
+            result = read_message(client)
+        return result['exit_code'] if result else 1
+    except socket.error as exc:
+        if exc.errno == errno.EPIPE:
+            return None
+        raise
+    finally:
+        client.close()
+
+
+def forward_to_daemon(argv):
+    """Forward command to the daemon, if configured (or return None)."""
+    socket_path = os.environ.get(DAEMON_SOCKET_ENV_VAR)
+    if IN_DAEMON or not socket_path or not is_supported() or (
+            argv[:1] == ['daemon']):
+        return None
+    return forward_request(socket_path, argv)
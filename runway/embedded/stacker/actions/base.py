@@ -9,6 +9,7 @@ import threading
 
 from ..dag import walk, ThreadedWalker, UnlimitedSemaphore
 from ..plan import Step, build_plan, build_graph
+from .. import api_metrics, tracing
 
 import botocore.exceptions
 from stacker.session_cache import get_session
@@ -201,13 +202,21 @@ class BaseAction(object):
         return template_url
 
     def execute(self, *args, **kwargs):
+        action = self.__class__.__module__.rsplit('.', 1)[-1]
+        api_metrics.start()
         try:
-            self.pre_run(*args, **kwargs)
-            self.run(*args, **kwargs)
-            self.post_run(*args, **kwargs)
+            with tracing.span("stacker %s" % action, 'stacker'):
+                with tracing.span('pre_run', 'stacker'):
+                    self.pre_run(*args, **kwargs)
+                with tracing.span('run', 'stacker'):
+                    self.run(*args, **kwargs)
+                with tracing.span('post_run', 'stacker'):
+                    self.post_run(*args, **kwargs)
         except PlanFailed as e:
             logger.error(str(e))
             sys.exit(1)
+        finally:
+            api_metrics.report("stacker %s" % action)
 
     def pre_run(self, *args, **kwargs):
         pass
@@ -2,12 +2,14 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 import logging
+import threading
 
 from .base import BaseAction, plan, build_walker
 from .base import STACK_POLL_TIME
 
 from ..providers.base import Template
 from .. import util
+from ..journal import Journal, get_fingerprint
 from ..exceptions import (
     MissingParameterException,
     StackDidNotChange,
@@ -19,6 +21,7 @@ from ..status import (
     NotSubmittedStatus,
     NotUpdatedStatus,
     DidNotChangeStatus,
+    ResumedStatus,
     SubmittedStatus,
     CompleteStatus,
     FailedStatus,
@@ -217,8 +220,19 @@ class Action(BaseAction):
         - Submitting either a build or update of the given stack to the
             :class:`stacker.provider.base.Provider`.
 
+    When a journal is given, stacks are recorded in it as they complete, and
+    (when resuming) stacks completed by the previous build that haven't
+    changed since are treated as done.
+
     """
 
+    def __init__(self, *args, **kwargs):
+        super(Action, self).__init__(*args, **kwargs)
+        self.journal = None
+        # Stacks of each provider, from a single describe (when resuming)
+        self._provider_stacks = {}
+        self._provider_stacks_lock = threading.Lock()
+
     def build_parameters(self, stack, provider_stack=None):
         """Builds the CloudFormation Parameters for our stack.
 
@@ -267,6 +281,12 @@ class Action(BaseAction):
 
         provider = self.build_provider(stack)
 
+        if (self.journal and old_status is PENDING and
+                self.journal.is_resumable(stack.fqn)):
+            status = self._resume_stack(stack, provider)
+            if status:
+                return status
+
         try:
             provider_stack = provider.get_stack(stack.fqn)
         except StackDoesNotExist:
@@ -318,6 +338,8 @@ class Action(BaseAction):
             elif provider.is_stack_completed(provider_stack):
                 stack.set_outputs(
                     provider.get_output_dict(provider_stack))
+                if self.journal:
+                    self.journal.complete(stack.fqn, provider_stack)
                 return CompleteStatus(old_status.reason)
             else:
                 return old_status
@@ -331,6 +353,10 @@ class Action(BaseAction):
         tags = build_stack_tags(stack)
         parameters = self.build_parameters(stack, provider_stack)
         force_change_set = stack.blueprint.requires_change_set
+        if self.journal:
+            self.journal.submit(stack.fqn, stack.blueprint.version,
+                                get_fingerprint(parameters, tags,
+                                                stack.stack_policy))
 
         if recreate:
             logger.debug("Re-creating stack: %s", stack.fqn)
@@ -370,8 +396,45 @@ class Action(BaseAction):
             return SkippedStatus(reason="canceled execution")
         except StackDidNotChange:
             stack.set_outputs(provider.get_output_dict(provider_stack))
+            if self.journal:
+                self.journal.complete(stack.fqn, provider_stack)
             return DidNotChangeStatus()
 
+    def _get_provider_stacks(self, provider):
+        """Returns the stacks of a provider, described once for all steps."""
+        with self._provider_stacks_lock:
+            if provider not in self._provider_stacks:
+                self._provider_stacks[provider] = dict(
+                    (i["StackName"], i) for i in provider.get_stacks()
+                )
+            return self._provider_stacks[provider]
+
+    def _resume_stack(self, stack, provider):
+        """Returns the status of a stack completed by the build being resumed,
+        if neither the stack nor its CloudFormation stack has changed since.
+
+        The stack is still resolved & rendered, to compare its template and
+        parameters with the journal, but its outputs come from the describe
+        of all the provider's stacks instead of a call per stack.
+
+        """
+        provider_stack = self._get_provider_stacks(provider).get(stack.fqn)
+        if not provider_stack or not provider.is_stack_completed(
+                provider_stack) or provider.is_stack_failed(provider_stack):
+            return None
+
+        stack.resolve(self.context, self.provider)
+        parameters = self.build_parameters(stack, provider_stack)
+        fingerprint = get_fingerprint(parameters, build_stack_tags(stack),
+                                      stack.stack_policy)
+        if not self.journal.is_unchanged(stack.fqn, stack.blueprint.version,
+                                         fingerprint, provider_stack):
+            logger.debug("Stack %s changed since the build being resumed",
+                         stack.fqn)
+            return None
+        stack.set_outputs(provider.get_output_dict(provider_stack))
+        return ResumedStatus()
+
     def _template(self, blueprint):
         """Generates a suitable template based on whether or not an S3 bucket
         is set.
@@ -381,7 +444,9 @@ class Action(BaseAction):
         If not bucket is set, then the template will be inlined.
         """
         if self.bucket_name:
-            return Template(url=self.s3_stack_push(blueprint))
+            # The body is kept for inspection (e.g. counting resources)
+            return Template(url=self.s3_stack_push(blueprint),
+                            body=blueprint.rendered)
         else:
             return Template(body=blueprint.rendered)
 
@@ -412,12 +477,18 @@ class Action(BaseAction):
             outline
         )
 
-    def run(self, concurrency=0, outline=False,
-            tail=False, dump=False, *args, **kwargs):
+    def run(self, concurrency=0, outline=False,  # noqa pylint: disable=too-many-arguments
+            tail=False, dump=False, journal=None, resume=False, *args,
+            **kwargs):
         """Kicks off the build/update of the stacks in the stack_definitions.
 
         This is the main entry point for the Builder.
 
+        Args:
+            journal (str): Path of the journal recording completed stacks,
+                which is removed once the build succeeds.
+            resume (bool): Resume the build recorded in the journal.
+
         """
         plan = self._generate_plan(tail=tail)
         if not plan.keys():
@@ -426,7 +497,11 @@ class Action(BaseAction):
             plan.outline(logging.DEBUG)
             logger.debug("Launching stacks: %s", ", ".join(plan.keys()))
             walker = build_walker(concurrency)
+            if journal:
+                self.journal = Journal(journal, resume=resume)
             plan.execute(walker)
+            if self.journal:
+                self.journal.remove()
         else:
             if outline:
                 plan.outline()
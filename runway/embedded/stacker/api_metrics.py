@@ -0,0 +1,16 @@
+"""AWS API metrics, collected via Runway's api_metrics (when run by Runway)."""
+from __future__ import absolute_import
+
+try:
+    from runway.api_metrics import register_session, report, start
+except ImportError:
+    def start():
+        pass
+
+    def register_session(session):
+        return session
+
+    def report(action):
+        pass
+
+__all__ = ['register_session', 'report', 'start']
@@ -26,6 +26,7 @@ from ..exceptions import (
     VariableTypeRequired,
     InvalidUserdataPlaceholder
 )
+from .. import tracing
 from .variables.types import (
     CFNType,
     TroposphereType,
@@ -468,12 +469,14 @@ class Blueprint(object):
 
     def render_template(self):
         """Render the Blueprint to a CloudFormation template"""
-        self.import_mappings()
-        self.create_template()
-        if self.description:
-            self.set_template_description(self.description)
-        self.setup_parameters()
-        rendered = self.template.to_json(indent=self.context.template_indent)
+        with tracing.span("render %s" % self.name, 'blueprint'):
+            self.import_mappings()
+            self.create_template()
+            if self.description:
+                self.set_template_description(self.description)
+            self.setup_parameters()
+            rendered = self.template.to_json(
+                indent=self.context.template_indent)
         version = hashlib.md5(rendered.encode()).hexdigest()[:8]
         return (version, rendered)
 
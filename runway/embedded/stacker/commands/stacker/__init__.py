@@ -39,6 +39,8 @@ class Stacker(BaseCommand):
             replacements_only=options.replacements_only,
             recreate_failed=options.recreate_failed,
             service_role=self.config.service_role,
+            change_set_review=default.ChangeSetReview()
+            if options.interactive and options.batch_review else None,
         )
 
         options.context = Context(
@@ -181,6 +181,11 @@ class BaseCommand(object):
             "--replacements-only", action="store_true",
             help="If interactive mode is enabled, stacker will only prompt to "
                  "authorize replacements.")
+        parser.add_argument(
+            "--batch-review", action="store_true",
+            help="If interactive mode is enabled, stacker will create the "
+                 "change sets of all stacks ready to be updated concurrently, "
+                 "and prompt to authorize them together.")
         parser.add_argument(
             "--recreate-failed", action="store_true",
             help="Destroy and re-create stacks that are stuck in a failed "
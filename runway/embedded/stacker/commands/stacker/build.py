@@ -11,6 +11,7 @@ from __future__ import absolute_import
 
 from .base import BaseCommand, cancel
 from ...actions import build
+from ...journal import get_journal_path
 
 
 class Build(BaseCommand):
@@ -46,6 +47,14 @@ class Build(BaseCommand):
         parser.add_argument("-d", "--dump", action="store", type=str,
                             help="Dump the rendered Cloudformation templates "
                                  "to a directory")
+        parser.add_argument("--resume", action="store_true",
+                            help="Resume a failed build: stacks it completed "
+                                 "are not submitted again, if they haven't "
+                                 "changed since.")
+        parser.add_argument("--journal", action="store", type=str,
+                            help="The file recording the stacks completed "
+                                 "by the build, for resuming it if it fails. "
+                                 "Defaults to a file in .stacker/journal.")
 
     def run(self, options, **kwargs):
         super(Build, self).run(options, **kwargs)
@@ -55,7 +64,20 @@ class Build(BaseCommand):
         action.execute(concurrency=options.max_parallel,
                        outline=options.outline,
                        tail=options.tail,
-                       dump=options.dump)
+                       dump=options.dump,
+                       journal=self.get_journal_path(options),
+                       resume=options.resume)
+
+    @staticmethod
+    def get_journal_path(options):
+        """Returns the journal path of the build (None for stdin configs)."""
+        if options.journal:
+            return options.journal
+        if options.config.name == "<stdin>":
+            return None
+        return get_journal_path(options.config.name,
+                                options.context.namespace,
+                                options.region)
 
     def get_context_kwargs(self, options, **kwargs):
         return {"stack_names": options.targets, "force_stacks": options.force}
@@ -0,0 +1,165 @@
+"""Journal of the stacks completed by a build, used to resume failed builds.
+
+Each completed stack is recorded with the version of its template and a
+fingerprint of its parameters, tags & stack policy, along with the time the
+stack was last updated in CloudFormation. When resuming, stacks whose
+template, parameters and CloudFormation stack are unchanged are treated as
+done without submitting them again.
+"""
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DIR = os.path.join(".stacker", "journal")
+
+
+def get_journal_path(config_path, namespace, region):
+    """Returns the default journal path of a config file.
+
+    Args:
+        config_path (str): Path of the stacker config file.
+        namespace (str): The namespace of the stacks.
+        region (str): The region of the stacks.
+
+    Returns:
+        str: Path of the journal (relative to the current directory).
+
+    """
+    name = os.path.splitext(os.path.basename(config_path))[0]
+    return os.path.join(JOURNAL_DIR, "%s-%s-%s.json" % (
+        name, namespace or "default", region or "default"))
+
+
+def get_fingerprint(parameters, tags, stack_policy):
+    """Returns a fingerprint of the inputs of a stack (besides its template).
+
+    Args:
+        parameters (list): The CloudFormation parameters of the stack.
+        tags (list): The tags of the stack.
+        stack_policy (str): The stack policy of the stack (if any).
+
+    Returns:
+        str: The fingerprint.
+
+    """
+    data = json.dumps([parameters, tags, stack_policy], sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+def get_last_updated(provider_stack):
+    """Returns when a CloudFormation stack was last created or updated."""
+    return str(provider_stack.get("LastUpdatedTime") or
+               provider_stack.get("CreationTime"))
+
+
+class Journal(object):
+    """Records the stacks completed by a build.
+
+    Args:
+        path (str): Path of the journal file.
+        resume (bool): Load the entries of the previous (failed) build. If
+            False, the previous build's journal is discarded.
+
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.steps = {}
+        # Template version & fingerprint of the stacks submitted but not yet
+        # completed
+        self.submitted = {}
+        if resume:
+            self.steps = self.load()
+            logger.info("Resuming build: %d stacks were completed previously",
+                        len(self.steps))
+        else:
+            self.remove()
+        # Entries of the build being resumed
+        self.previous = dict(self.steps)
+
+    def load(self):
+        """Returns the entries of the journal file (if any)."""
+        try:
+            with open(self.path) as stream:
+                return json.load(stream).get("steps", {})
+        except (IOError, OSError):
+            return {}
+        except ValueError:
+            logger.warning("Ignoring invalid build journal %s", self.path)
+            return {}
+
+    def save(self):
+        """Writes the journal file, replacing it atomically."""
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+        with open(tmp_path, "w") as stream:
+            json.dump({"steps": self.steps}, stream, indent=2,
+                      sort_keys=True)
+        if os.name == "nt" and os.path.exists(self.path):
+            os.remove(self.path)
+        os.rename(tmp_path, self.path)
+
+    def remove(self):
+        """Removes the journal file (e.g. once a build has succeeded)."""
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def submit(self, fqn, template_version, fingerprint):
+        """Records the inputs of a stack being submitted to CloudFormation."""
+        with self.lock:
+            self.submitted[fqn] = {"template_version": template_version,
+                                   "fingerprint": fingerprint}
+
+    def complete(self, fqn, provider_stack):
+        """Records the completion of a submitted stack."""
+        with self.lock:
+            entry = self.submitted.pop(fqn, None)
+            if not entry:
+                return
+            entry.update({"last_updated": get_last_updated(provider_stack),
+                          "completed": time.time()})
+            self.steps[fqn] = entry
+            self.save()
+
+    def is_resumable(self, fqn):
+        """Returns True if the stack was completed by the build resumed."""
+        return fqn in self.previous
+
+    def is_unchanged(self, fqn, template_version, fingerprint,
+                     provider_stack):
+        """Tests if a stack is unchanged since the build being resumed.
+
+        Args:
+            fqn (str): The fully qualified name of the stack.
+            template_version (str): The version of the stack's template.
+            fingerprint (str): The fingerprint of the stack's parameters,
+                tags & stack policy (see :func:`get_fingerprint`).
+            provider_stack (dict): The CloudFormation stack.
+
+        Returns:
+            bool: True if the stack's template & fingerprint match the
+                journal, and the CloudFormation stack hasn't been updated
+                since.
+
+        """
+        entry = self.previous.get(fqn)
+        return bool(entry) and (
+            entry.get("template_version") == template_version and
+            entry.get("fingerprint") == fingerprint and
+            entry.get("last_updated") == get_last_updated(provider_stack)
+        )
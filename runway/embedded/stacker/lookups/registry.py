@@ -8,6 +8,7 @@ import warnings
 from past.builtins import basestring
 
 from ..exceptions import UnknownLookupType, FailedVariableLookup
+from .. import tracing
 from ..util import load_object_from_string
 
 from .handlers import output
@@ -87,11 +88,13 @@ def resolve_lookups(variable, context, provider):
         except KeyError:
             raise UnknownLookupType(lookup)
         try:
-            resolved_lookups[lookup] = handler(
-                value=lookup.input,
-                context=context,
-                provider=provider,
-            )
+            with tracing.span("%s %s" % (lookup.type, lookup.input),
+                              'lookup', variable=variable.name):
+                resolved_lookups[lookup] = handler(
+                    value=lookup.input,
+                    context=context,
+                    provider=provider,
+                )
         except Exception as e:
             raise FailedVariableLookup(variable.name, lookup, e)
     return resolved_lookups
@@ -9,6 +9,7 @@ import uuid
 import threading
 
 from .util import stack_template_key_name
+from . import tracing
 from .exceptions import (
     GraphError,
     PlanFailed,
@@ -58,6 +59,11 @@ class Step(object):
         self.last_updated = time.time()
         self.fn = fn
         self.watch_func = watch_func
+        # Steps run in their own threads; their spans belong to the span
+        # the plan was created in
+        self.trace_parent = tracing.get_current_span_id()
+        # Start of the current status' span (once the step is running)
+        self.status_started = None
 
     def __repr__(self):
         return "<stacker.plan.Step:%s>" % (self.stack.name,)
@@ -80,8 +86,11 @@ class Step(object):
             watcher.start()
 
         try:
-            while not self.done:
-                self._run_once()
+            with tracing.span(self.stack.name, 'stack',
+                              parent_id=self.trace_parent):
+                self.status_started = time.time()
+                while not self.done:
+                    self._run_once()
         finally:
             if watcher:
                 stop_watcher.set()
@@ -149,8 +158,15 @@ class Step(object):
         if status is not self.status:
             logger.debug("Setting %s state to %s.", self.stack.name,
                          status.name)
+            if self.status_started and tracing.is_enabled():
+                # Time spent in each status is a phase of the stack's span
+                tracing.add_span(self.status.name, self.status_started,
+                                 time.time(), 'stack-status',
+                                 {'stack': self.stack.name,
+                                  'reason': self.status.reason})
             self.status = status
             self.last_updated = time.time()
+            self.status_started = self.last_updated
             if self.stack.logging:
                 log_step(self)
 
@@ -3,17 +3,17 @@ from __future__ import division
 from __future__ import absolute_import
 from future import standard_library
 standard_library.install_aliases()
-from builtins import range
 from builtins import object
 import json
 import yaml
 import logging
+import random
 import time
 import urllib.parse
 import sys
 
 # thread safe, memoized, provider builder.
-from threading import Lock
+from threading import Condition, Lock
 
 import botocore.exceptions
 from botocore.config import Config
@@ -21,6 +21,7 @@ from botocore.config import Config
 from ..base import BaseProvider
 from ... import exceptions
 from ...ui import ui
+from ...util import parse_cloudformation_template
 from stacker.session_cache import get_session
 
 from ...actions.diff import (
@@ -57,6 +58,19 @@ MAX_TAIL_RETRIES = 15
 TAIL_RETRY_SLEEP = 1
 GET_EVENTS_SLEEP = 1
 DEFAULT_CAPABILITIES = ["CAPABILITY_NAMED_IAM", ]
+# Change sets are polled with jittered exponential backoff (between
+# CHANGE_SET_POLL_MIN_SLEEP & CHANGE_SET_POLL_MAX_SLEEP seconds) for up to
+# CHANGE_SET_WAIT_BASE seconds, plus CHANGE_SET_WAIT_PER_RESOURCE seconds per
+# resource of the template (at most CHANGE_SET_WAIT_MAX seconds).
+CHANGE_SET_POLL_MIN_SLEEP = 1
+CHANGE_SET_POLL_MAX_SLEEP = 5
+CHANGE_SET_WAIT_BASE = 75
+CHANGE_SET_WAIT_PER_RESOURCE = 1
+CHANGE_SET_WAIT_MAX = 1800
+# describe_change_set calls per second, shared by all change set waits
+CHANGE_SET_POLL_RATE = 10
+# Seconds without new change sets before a batch of them is reviewed
+CHANGE_SET_REVIEW_SETTLE_TIME = 1
 
 
 def get_cloudformation_client(session):
@@ -253,50 +267,294 @@ def summarize_params_diff(params_diff):
     return summary
 
 
-def wait_till_change_set_complete(cfn_client, change_set_id, try_count=25,
-                                  sleep_time=.5, max_sleep=3):
+class ChangeSetReview(object):
+    """Batches the approval of change sets created concurrently.
+
+    In interactive mode, each stack's change set is created in the stack's
+    own thread. Rather than prompting for each in turn, change sets are
+    queued until none are still being created (and none have been queued
+    for a moment), then reviewed together, with a single prompt. Approved
+    change sets are then executed by their threads in parallel.
+
+    Args:
+        settle_time (float): Seconds without new change sets before a batch
+            is reviewed.
+
+    """
+
+    def __init__(self, settle_time=CHANGE_SET_REVIEW_SETTLE_TIME):
+        self.settle_time = settle_time
+        self.condition = Condition()
+        # Stacks whose change sets are being created
+        self.creating = set()
+        self.queued = []
+        self.decisions = {}
+        self.reviewing = False
+        self.last_change = time.time()
+
+    def begin(self, fqn):
+        """Records that a stack's change set is being created."""
+        with self.condition:
+            self.creating.add(fqn)
+            self.last_change = time.time()
+
+    def end(self, fqn):
+        """Records that a stack's change set doesn't need approval."""
+        with self.condition:
+            if fqn in self.creating:
+                self.creating.discard(fqn)
+                self.condition.notify_all()
+
+    def approve(self, fqn, action, changes, full_changeset, params_diff,
+                replacements_only=False):
+        """Queues a change set for review, returning once it's approved.
+
+        Args:
+            fqn (str): fully qualified name of the stack
+            action (str): action to include in the summary (changes or
+                replacements)
+            changes (list): The changes to summarize.
+            full_changeset (list): All the changes of the change set.
+            params_diff (list): The differences between the stack's current
+                & new parameters.
+            replacements_only (bool): Whether only replacements are
+                summarized.
+
+        Raises:
+            CancelExecution: The change set wasn't approved.
+
+        """
+        with self.condition:
+            self.creating.discard(fqn)
+            self.queued.append({"fqn": fqn,
+                                "action": action,
+                                "changes": changes,
+                                "full_changeset": full_changeset,
+                                "params_diff": params_diff,
+                                "replacements_only": replacements_only})
+            self.last_change = time.time()
+            self.condition.notify_all()
+            while fqn not in self.decisions:
+                wait_time = self.settle_time
+                if not self.reviewing and not self.creating:
+                    wait_time = self.last_change + self.settle_time - \
+                        time.time()
+                    if wait_time <= 0:
+                        self._review_queued()
+                        continue
+                self.condition.wait(wait_time)
+            approved = self.decisions.pop(fqn)
+        if not approved:
+            raise exceptions.CancelExecution
+
+    def _review_queued(self):
+        """Reviews the queued change sets (called with the condition held).
+
+        The condition is released while prompting, so other stacks can queue
+        their change sets for the next batch.
+        """
+        batch, self.queued = self.queued, []
+        self.reviewing = True
+        decisions = dict((i["fqn"], False) for i in batch)
+        self.condition.release()
+        try:
+            ui.lock()
+            try:
+                decisions.update(self.review(batch))
+            finally:
+                ui.unlock()
+        finally:
+            self.condition.acquire()
+            self.reviewing = False
+            self.decisions.update(decisions)
+            self.last_change = time.time()
+            self.condition.notify_all()
+
+    @staticmethod
+    def review(batch):
+        """Prompts for approval of a batch of change sets.
+
+        Args:
+            batch (list): The queued change sets (see :meth:`approve`).
+
+        Returns:
+            dict: Whether each stack's change set was approved.
+
+        """
+        for request in batch:
+            output_summary(request["fqn"], request["action"],
+                           request["changes"], request["params_diff"],
+                           replacements_only=request["replacements_only"])
+        summary = []
+        for request in batch:
+            replacements = requires_replacement(request["full_changeset"])
+            summary.append("- %s: %d changes%s%s" % (
+                request["fqn"],
+                len(request["full_changeset"]),
+                ", %d REPLACEMENTS" % len(replacements)
+                if replacements else "",
+                ", parameters modified" if request["params_diff"] else ""
+            ))
+        logger.info("%d change sets to review:\n%s", len(batch),
+                    "\n".join(summary))
+
+        while True:
+            approve = ui.ask("Execute all of the above change sets? "
+                             "[y/n/v/s] (v: verbose, s: select each) ")
+            approve = approve.lower()
+            if approve == "v":
+                for request in batch:
+                    if request["params_diff"]:
+                        logger.info(
+                            "%s full changeset:\n\n%s\n%s",
+                            request["fqn"],
+                            format_params_diff(request["params_diff"]),
+                            yaml.safe_dump(request["full_changeset"]),
+                        )
+                    else:
+                        logger.info(
+                            "%s full changeset:\n%s",
+                            request["fqn"],
+                            yaml.safe_dump(request["full_changeset"]),
+                        )
+            elif approve == "s":
+                decisions = {}
+                for request in batch:
+                    output_summary(
+                        request["fqn"], request["action"],
+                        request["changes"], request["params_diff"],
+                        replacements_only=request["replacements_only"])
+                    try:
+                        ask_for_approval(
+                            full_changeset=request["full_changeset"],
+                            params_diff=request["params_diff"],
+                            include_verbose=True,
+                        )
+                        decisions[request["fqn"]] = True
+                    except exceptions.CancelExecution:
+                        decisions[request["fqn"]] = False
+                return decisions
+            else:
+                return dict((i["fqn"], approve == "y") for i in batch)
+
+
+class RateLimiter(object):
+    """Token bucket limiting the rate of calls, shared between threads.
+
+    Args:
+        rate (float): Sustained calls per second.
+        burst (int, optional): Calls that can be made at once (defaults to
+            rate).
+
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.time()
+        self.lock = Lock()
+
+    def acquire(self):
+        """Blocks until a call may be made."""
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Negative tokens are calls already waiting, so threads are
+            # served in turn
+            self.tokens -= 1
+            wait_time = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait_time:
+            time.sleep(wait_time)
+
+
+# Shared by the change set waits of all threads/providers
+CHANGE_SET_POLL_LIMITER = RateLimiter(CHANGE_SET_POLL_RATE)
+
+
+def get_change_set_wait_timeout(template):
+    """Return the seconds to wait for a template's change set to be created.
+
+    Args:
+        template (:class:`stacker.providers.base.Template`): The template of
+            the change set.
+
+    Returns:
+        float: CHANGE_SET_WAIT_BASE seconds, plus CHANGE_SET_WAIT_PER_RESOURCE
+            seconds per resource of the template (up to CHANGE_SET_WAIT_MAX).
+
+    """
+    resources = 0
+    if template.body:
+        try:
+            resources = len(
+                parse_cloudformation_template(template.body).get(
+                    "Resources") or {}
+            )
+        except Exception:  # pylint: disable=broad-except
+            logger.debug("Unable to count the resources of the template",
+                         exc_info=True)
+    return min(CHANGE_SET_WAIT_MAX,
+               CHANGE_SET_WAIT_BASE + resources * CHANGE_SET_WAIT_PER_RESOURCE)
+
+
+def wait_till_change_set_complete(cfn_client, change_set_id, timeout=None,
+                                  sleep_time=CHANGE_SET_POLL_MIN_SLEEP,
+                                  max_sleep=CHANGE_SET_POLL_MAX_SLEEP,
+                                  rate_limiter=CHANGE_SET_POLL_LIMITER):
     """ Checks state of a changeset, returning when it is in a complete state.
 
     Since changesets can take a little bit of time to get into a complete
-    state, we need to poll it until it does so. This will try to get the
-    state `try_count` times, waiting `sleep_time` * 2 seconds between each try
-    up to the `max_sleep` number of seconds. If, after that time, the changeset
-    is not in a complete state it fails. These default settings will wait a
-    little over one minute.
+    state, we need to poll it until it does so. The time between polls
+    doubles from `sleep_time` up to `max_sleep` seconds, with random jitter
+    so concurrent waits don't poll in lockstep, and polls of all threads are
+    limited by a shared rate limiter. If the changeset is not in a complete
+    state after `timeout` seconds it fails.
 
     Args:
         cfn_client (:class:`botocore.client.CloudFormation`): Used to query
             cloudformation.
         change_set_id (str): The unique changeset id to wait for.
-        try_count (int): Number of times to try the call.
-        sleep_time (int): Time to sleep between attempts.
-        max_sleep (int): Max time to sleep during backoff
+        timeout (float): Seconds to wait (see
+            :func:`get_change_set_wait_timeout`); defaults to
+            CHANGE_SET_WAIT_BASE.
+        sleep_time (float): Initial time to sleep between attempts.
+        max_sleep (float): Max time to sleep during backoff
+        rate_limiter (:class:`RateLimiter`): Limiter of describe_change_set
+            calls (None for no limit).
 
     Return:
         dict: The response from cloudformation for the describe_change_set
             call.
     """
-    complete = False
-    response = None
-    for i in range(try_count):
+    deadline = time.time() + (timeout or CHANGE_SET_WAIT_BASE)
+    while True:
+        # Change sets are never complete right away, so sleep first;
+        # exponential backoff with max, sleeping between half & all of it
+        # (the last poll is made right at the deadline)
+        remaining = deadline - time.time()
+        if sleep_time >= remaining:
+            time.sleep(max(remaining, 0))
+        else:
+            time.sleep(sleep_time / 2 + random.uniform(0, sleep_time / 2))
+        sleep_time = min(sleep_time * 2, max_sleep)
+        if rate_limiter:
+            rate_limiter.acquire()
         response = cfn_client.describe_change_set(
             ChangeSetName=change_set_id,
         )
-        complete = response["Status"] in ("FAILED", "CREATE_COMPLETE")
-        if complete:
-            break
+        if response["Status"] in ("FAILED", "CREATE_COMPLETE"):
+            return response
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise exceptions.ChangesetDidNotStabilize(change_set_id)
         if sleep_time == max_sleep:
             logger.debug(
-                "Still waiting on changeset for another %s seconds",
-                sleep_time
+                "Still waiting on changeset for up to %d seconds",
+                remaining
             )
-        time.sleep(sleep_time)
-
-        # exponential backoff with max
-        sleep_time = min(sleep_time * 2, max_sleep)
-    if not complete:
-        raise exceptions.ChangesetDidNotStabilize(change_set_id)
-    return response
 
 
 def create_change_set(cfn_client, fqn, template, parameters, tags,
@@ -325,7 +583,8 @@ def create_change_set(cfn_client, fqn, template, parameters, tags,
             raise
     change_set_id = response["Id"]
     response = wait_till_change_set_complete(
-        cfn_client, change_set_id
+        cfn_client, change_set_id,
+        timeout=get_change_set_wait_timeout(template)
     )
     status = response["Status"]
     if status == "FAILED":
@@ -548,7 +807,7 @@ class Provider(BaseProvider):
 
     def __init__(self, session, region=None, interactive=False,
                  replacements_only=False, recreate_failed=False,
-                 service_role=None, **kwargs):
+                 service_role=None, change_set_review=None, **kwargs):
         self._outputs = {}
         self.region = region
         self.cloudformation = get_cloudformation_client(session)
@@ -557,6 +816,8 @@ class Provider(BaseProvider):
         self.replacements_only = interactive and replacements_only
         self.recreate_failed = interactive or recreate_failed
         self.service_role = service_role
+        # Batches approvals in interactive mode (shared between providers)
+        self.change_set_review = change_set_review
 
     def get_stack(self, stack_name, **kwargs):
         try:
@@ -567,6 +828,12 @@ class Provider(BaseProvider):
                 raise
             raise exceptions.StackDoesNotExist(stack_name)
 
+    def get_stacks(self, **kwargs):
+        """Returns all stacks (except deleted ones) of the region."""
+        paginator = self.cloudformation.get_paginator("describe_stacks")
+        return [stack for page in paginator.paginate()
+                for stack in page["Stacks"]]
+
     def get_stack_status(self, stack, **kwargs):
         return stack['StackStatus']
 
@@ -908,39 +1175,51 @@ class Provider(BaseProvider):
                 that should be applied to the Cloudformation stack.
         """
         logger.debug("Using interactive provider mode for %s.", fqn)
-        changes, change_set_id = create_change_set(
-            self.cloudformation, fqn, template, parameters, tags,
-            'UPDATE', service_role=self.service_role, **kwargs
-        )
-        old_parameters_as_dict = self.params_as_dict(old_parameters)
-        new_parameters_as_dict = self.params_as_dict(
-            [x
-             if 'ParameterValue' in x
-             else {'ParameterKey': x['ParameterKey'],
-                   'ParameterValue': old_parameters_as_dict[x['ParameterKey']]}
-             for x in parameters]
-        )
-        params_diff = diff_parameters(
-            old_parameters_as_dict,
-            new_parameters_as_dict)
-
-        action = "replacements" if self.replacements_only else "changes"
-        full_changeset = changes
-        if self.replacements_only:
-            changes = requires_replacement(changes)
-
-        if changes or params_diff:
-            ui.lock()
-            try:
-                output_summary(fqn, action, changes, params_diff,
+        review = self.change_set_review
+        if review:
+            review.begin(fqn)
+        try:
+            changes, change_set_id = create_change_set(
+                self.cloudformation, fqn, template, parameters, tags,
+                'UPDATE', service_role=self.service_role, **kwargs
+            )
+            old_parameters_as_dict = self.params_as_dict(old_parameters)
+            new_parameters_as_dict = self.params_as_dict(
+                [x
+                 if 'ParameterValue' in x
+                 else {'ParameterKey': x['ParameterKey'],
+                       'ParameterValue': old_parameters_as_dict[
+                           x['ParameterKey']]}
+                 for x in parameters]
+            )
+            params_diff = diff_parameters(
+                old_parameters_as_dict,
+                new_parameters_as_dict)
+
+            action = "replacements" if self.replacements_only else "changes"
+            full_changeset = changes
+            if self.replacements_only:
+                changes = requires_replacement(changes)
+
+            if (changes or params_diff) and review:
+                review.approve(fqn, action, changes, full_changeset,
+                               params_diff,
                                replacements_only=self.replacements_only)
-                ask_for_approval(
-                    full_changeset=full_changeset,
-                    params_diff=params_diff,
-                    include_verbose=True,
-                )
-            finally:
-                ui.unlock()
+            elif changes or params_diff:
+                ui.lock()
+                try:
+                    output_summary(fqn, action, changes, params_diff,
+                                   replacements_only=self.replacements_only)
+                    ask_for_approval(
+                        full_changeset=full_changeset,
+                        params_diff=params_diff,
+                        include_verbose=True,
+                    )
+                finally:
+                    ui.unlock()
+        finally:
+            if review:
+                review.end(fqn)
 
         self.deal_with_changeset_stack_policy(fqn, stack_policy)
 
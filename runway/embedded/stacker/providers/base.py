@@ -19,6 +19,10 @@ class BaseProvider(object):
         # pylint: disable=unused-argument
         not_implemented("get_stack")
 
+    def get_stacks(self, *args, **kwargs):
+        # pylint: disable=unused-argument
+        not_implemented("get_stacks")
+
     def create_stack(self, *args, **kwargs):
         # pylint: disable=unused-argument
         not_implemented("create_stack")
@@ -3,6 +3,7 @@ from __future__ import division
 from __future__ import absolute_import
 import boto3
 import logging
+from . import api_metrics
 from .ui import ui
 
 
@@ -41,4 +42,4 @@ def get_session(region, profile=None):
     provider = c.get_provider('assume-role')
     provider.cache = credential_cache
     provider._prompter = ui.getpass
-    return session
+    return api_metrics.register_session(session)
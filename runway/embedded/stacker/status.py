@@ -72,6 +72,10 @@ class DidNotChangeStatus(SkippedStatus):
     reason = "nochange"
 
 
+class ResumedStatus(SkippedStatus):
+    reason = "completed before resuming"
+
+
 class StackDoesNotExist(SkippedStatus):
     reason = "does not exist in cloudformation"
 
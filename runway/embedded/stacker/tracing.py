@@ -0,0 +1,23 @@
+"""Timing spans, recorded via Runway's tracing (when run by Runway)."""
+from __future__ import absolute_import
+from contextlib import contextmanager
+
+try:
+    from runway.tracing import (
+        add_span, get_current_span_id, is_enabled, span
+    )
+except ImportError:
+    def is_enabled():
+        return False
+
+    def get_current_span_id():
+        return None
+
+    def add_span(*args, **kwargs):
+        pass
+
+    @contextmanager
+    def span(*args, **kwargs):
+        yield
+
+__all__ = ['add_span', 'get_current_span_id', 'is_enabled', 'span']
@@ -27,6 +27,7 @@ from yaml.constructor import ConstructorError
 from yaml.nodes import MappingNode
 
 from .awscli_yamlhelper import yaml_parse
+from . import tracing
 from stacker.session_cache import get_session
 
 logger = logging.getLogger(__name__)
@@ -381,7 +382,9 @@ def handle_hooks(stage, hooks, provider, context):
                 raise
             continue
         try:
-            result = method(context=context, provider=provider, **kwargs)
+            with tracing.span(hook.path, 'hook', stage=stage):
+                result = method(context=context, provider=provider,
+                                **kwargs)
         except Exception:
             logger.exception("Method %s threw an exception:", hook.path)
             if required:
@@ -504,7 +507,13 @@ def ensure_s3_bucket(s3_client, bucket_name, bucket_region):
                 create_args["CreateBucketConfiguration"] = {
                     "LocationConstraint": location_constraint
                 }
-            s3_client.create_bucket(**create_args)
+            try:
+                s3_client.create_bucket(**create_args)
+            except botocore.exceptions.ClientError as create_error:
+                # Created concurrently (e.g. by another stacker process)
+                if create_error.response['Error']['Code'] != \
+                        "BucketAlreadyOwnedByYou":
+                    raise
         elif e.response['Error']['Message'] == "Forbidden":
             logger.exception("Access denied for bucket %s.  Did " +
                              "you remember to use a globally unique name?",
@@ -11,6 +11,7 @@ from string import Template
 from .exceptions import InvalidLookupCombination, UnresolvedVariable, \
     UnknownLookupType, FailedVariableLookup, FailedLookup, \
     UnresolvedVariableValue, InvalidLookupConcatenation
+from . import tracing
 from .lookups.registry import LOOKUP_HANDLERS
 
 
@@ -374,19 +375,22 @@ class VariableValueLookup(VariableValue):
     def resolve(self, context, provider):
         self.lookup_data.resolve(context, provider)
         try:
-            if type(self.handler) == type:
-                # Hander is a new-style handler
-                result = self.handler.handle(
-                    value=self.lookup_data.value(),
-                    context=context,
-                    provider=provider
-                )
-            else:
-                result = self.handler(
-                    value=self.lookup_data.value(),
-                    context=context,
-                    provider=provider
-                )
+            with tracing.span("%s %s" % (self.lookup_name.value(),
+                                         self.lookup_data.value()),
+                              'lookup'):
+                if type(self.handler) == type:
+                    # Hander is a new-style handler
+                    result = self.handler.handle(
+                        value=self.lookup_data.value(),
+                        context=context,
+                        provider=provider
+                    )
+                else:
+                    result = self.handler(
+                        value=self.lookup_data.value(),
+                        context=context,
+                        provider=provider
+                    )
             self._resolve(result)
         except Exception as e:
             raise FailedLookup(self, e)
@@ -0,0 +1,207 @@
+"""Module fingerprints, used to skip deploying unchanged modules."""
+
+import hashlib
+import json
+import logging
+import os
+import re
+
+import boto3
+from botocore.exceptions import ClientError
+
+from . import __version__ as version
+from .hooks.staticsite.util import get_hash_of_files
+from .util import RUNWAY_CACHE_DIR
+
+LOGGER = logging.getLogger('runway')
+
+# Build/tool state directories that change without the module changing
+DEFAULT_EXCLUSIONS = ['.git/', '.serverless/', '.terraform/', 'cdk.out/',
+                      'node_modules/']
+
+
+def get_boto_args(env_vars):
+    """Return boto3 client args for the credentials in env_vars."""
+    boto_args = {'region_name': env_vars.get('AWS_DEFAULT_REGION')}
+    for i in ['aws_access_key_id', 'aws_secret_access_key',
+              'aws_session_token']:
+        if env_vars.get(i.upper()):
+            boto_args[i] = env_vars[i.upper()]
+    return boto_args
+
+
+def get_fingerprint_config(module_opts):
+    """Return normalized skip_unchanged config (or None if disabled)."""
+    config = module_opts.get('skip_unchanged')
+    if not config:
+        return None
+    if not isinstance(config, dict):
+        config = {}
+    return {'store': config.get('store', 'local'),
+            'directories': config.get('directories', []),
+            'exclusions': config.get('exclusions', []),
+            'env_vars': config.get('env_vars', [])}
+
+
+def calculate_module_fingerprint(module_root, module_opts, env_vars,  # noqa pylint: disable=too-many-arguments
+                                 env_var_names, config, assume_role_arn=None):
+    """Return fingerprint of a module's files, options & env vars.
+
+    Args:
+        module_root (str): module directory.
+        module_opts (dict): resolved module options.
+        env_vars (dict): environment variables the module will run with.
+        env_var_names (list[str]): names of the environment variables
+            relevant to the module (e.g. those set by the deployment).
+        config (dict): normalized ``skip_unchanged`` config.
+        assume_role_arn (Optional[str]): role assumed for the deployment.
+
+    """
+    exclusions = DEFAULT_EXCLUSIONS + config['exclusions']
+    files_hash = get_hash_of_files(
+        root_path=module_root,
+        directories=[{'path': './', 'exclusions': exclusions}] + [
+            {'path': i, 'exclusions': exclusions}
+            for i in config['directories']
+        ],
+        hash_format='per_file'
+    )
+    fingerprint = hashlib.sha256()
+    fingerprint.update(json.dumps(
+        {'files': files_hash,
+         'options': module_opts,
+         'env_vars': dict((i, env_vars.get(i)) for i in sorted(
+             set(env_var_names) | set(config['env_vars'])
+         )),
+         'assume_role_arn': assume_role_arn,
+         'runway_version': version},
+        sort_keys=True,
+        default=str
+    ).encode())
+    return fingerprint.hexdigest()
+
+
+class LocalFingerprintStore(object):
+    """Fingerprints stored in the module's .runway_cache directory."""
+
+    def __init__(self, module_root):
+        """Initialize store."""
+        self.cache_dir = os.path.join(module_root, RUNWAY_CACHE_DIR,
+                                      'fingerprints')
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name.replace('/', '-'))
+
+    def get(self, name):
+        """Return stored fingerprint (or None)."""
+        if os.path.isfile(self._path(name)):
+            with open(self._path(name), 'r') as stream:
+                return stream.read().strip()
+        return None
+
+    def put(self, name, fingerprint):
+        """Store fingerprint."""
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        with open(self._path(name), 'w') as stream:
+            stream.write(fingerprint)
+
+    def delete(self, name):
+        """Remove stored fingerprint."""
+        if os.path.isfile(self._path(name)):
+            os.remove(self._path(name))
+
+
+class S3FingerprintStore(object):
+    """Fingerprints stored as objects under an S3 bucket & prefix."""
+
+    def __init__(self, url, env_vars):
+        """Initialize store from an s3://bucket/prefix URL."""
+        self.bucket, _, self.prefix = url[len('s3://'):].partition('/')
+        self.s3_client = boto3.client('s3', **get_boto_args(env_vars))
+
+    def _key(self, name):
+        return '/'.join(i for i in [self.prefix.strip('/'), name] if i)
+
+    def get(self, name):
+        """Return stored fingerprint (or None)."""
+        try:
+            return self.s3_client.get_object(
+                Bucket=self.bucket,
+                Key=self._key(name)
+            )['Body'].read().decode().strip()
+        except ClientError as exc:
+            if exc.response['Error']['Code'] in ['404', 'NoSuchKey']:
+                return None
+            raise
+
+    def put(self, name, fingerprint):
+        """Store fingerprint."""
+        self.s3_client.put_object(Bucket=self.bucket,
+                                  Key=self._key(name),
+                                  Body=fingerprint.encode())
+
+    def delete(self, name):
+        """Remove stored fingerprint."""
+        self.s3_client.delete_object(Bucket=self.bucket, Key=self._key(name))
+
+
+class SsmFingerprintStore(object):
+    """Fingerprints stored as SSM parameters under a path."""
+
+    def __init__(self, path, env_vars):
+        """Initialize store from an ssm:/path value."""
+        self.path = '/' + path[len('ssm:'):].strip('/')
+        self.ssm_client = boto3.client('ssm', **get_boto_args(env_vars))
+
+    def _name(self, name):
+        return "%s/%s" % (self.path.rstrip('/'), name)
+
+    def get(self, name):
+        """Return stored fingerprint (or None)."""
+        try:
+            return self.ssm_client.get_parameter(
+                Name=self._name(name)
+            )['Parameter']['Value']
+        except self.ssm_client.exceptions.ParameterNotFound:
+            return None
+
+    def put(self, name, fingerprint):
+        """Store fingerprint."""
+        self.ssm_client.put_parameter(
+            Name=self._name(name),
+            Description='Fingerprint of last Runway deployment of module',
+            Value=fingerprint,
+            Type='String',
+            Overwrite=True
+        )
+
+    def delete(self, name):
+        """Remove stored fingerprint."""
+        try:
+            self.ssm_client.delete_parameter(Name=self._name(name))
+        except self.ssm_client.exceptions.ParameterNotFound:
+            pass
+
+
+def get_fingerprint_store(store, module_root, env_vars):
+    """Return fingerprint store for the configured location."""
+    if store == 'local':
+        return LocalFingerprintStore(module_root)
+    if store.startswith('s3://'):
+        return S3FingerprintStore(store, env_vars)
+    if store.startswith('ssm:'):
+        return SsmFingerprintStore(store, env_vars)
+    raise ValueError("Invalid skip_unchanged store \"%s\" (must be local, "
+                     "s3://bucket/prefix, or ssm:/path)" % store)
+
+
+def get_fingerprint_name(module_path, env_name, env_region, account_id):
+    """Return store name for a module's fingerprint in an account/env/region.
+
+    Deployments of a module to different accounts (e.g. via different
+    credentials or assumed roles) are fingerprinted separately.
+    """
+    module_name = re.sub(r'[^a-zA-Z0-9_.-]', '_',
+                         module_path.strip('./\\') or 'current_dir')
+    return "%s/%s/%s/%s" % (module_name, env_name, env_region, account_id)
@@ -1,6 +1,11 @@
 """Stacker hook for cleaning up resources prior to CFN stack deletion."""
 
 import logging
+import random
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
 
 from botocore.exceptions import ClientError
 
@@ -11,6 +16,198 @@ from stacker.session_cache import get_session
 
 LOGGER = logging.getLogger(__name__)
 
+DEFAULT_CONCURRENCY = 10
+DEFAULT_PREFIX_DEPTH = 2
+DELETE_MAX_ATTEMPTS = 8
+PROGRESS_INTERVAL_SECONDS = 10
+RETRYABLE_ERROR_CODES = ['InternalError', 'RequestLimitExceeded',
+                         'ServiceUnavailable', 'SlowDown', 'Throttling',
+                         'ThrottlingException']
+
+
+class BucketPurger(object):  # pylint: disable=too-many-instance-attributes
+    """Delete all object versions in a bucket.
+
+    Versions are listed concurrently under the bucket's key prefixes (found
+    by delimiter listings ``prefix_depth`` levels deep), and each page of
+    versions is deleted as its own ``delete_objects`` batch in a separate
+    pool, retrying throttled requests with jittered exponential backoff.
+
+    If ``lifecycle_fallback_threshold`` versions have been deleted and more
+    remain, deletion stops and a lifecycle configuration expiring every
+    object is applied to the bucket instead.
+    """
+
+    def __init__(self, s3_client, bucket_name,  # pylint: disable=too-many-arguments
+                 concurrency=DEFAULT_CONCURRENCY,
+                 prefix_depth=DEFAULT_PREFIX_DEPTH,
+                 lifecycle_fallback_threshold=None):
+        """Initialize purger."""
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.concurrency = concurrency
+        self.prefix_depth = prefix_depth
+        self.lifecycle_fallback_threshold = lifecycle_fallback_threshold
+        self.deleted = 0
+        self.stopped = False
+        self._errors = []
+        self._lock = threading.Lock()
+        # bound the number of listed-but-undeleted pages held in memory
+        self._batch_slots = threading.BoundedSemaphore(concurrency * 2)
+        self._delete_pool = ThreadPool(concurrency)
+        self._start_time = None
+        self._last_progress = None
+
+    def _delete_batch(self, objects):
+        """Delete a batch of object versions, retrying throttled requests."""
+        try:
+            for attempt in range(DELETE_MAX_ATTEMPTS):
+                if self.stopped:
+                    return
+                try:
+                    response = self.s3_client.delete_objects(
+                        Bucket=self.bucket_name,
+                        Delete={'Objects': objects, 'Quiet': True}
+                    )
+                except ClientError as exc:
+                    if exc.response['Error']['Code'] not in RETRYABLE_ERROR_CODES:  # noqa pylint: disable=line-too-long
+                        raise
+                    response = {'Errors': objects}
+                errors = response.get('Errors', [])
+                retryable = [{'Key': i['Key'], 'VersionId': i['VersionId']}
+                             for i in errors
+                             if i.get('Code', 'SlowDown') in RETRYABLE_ERROR_CODES]  # noqa pylint: disable=line-too-long
+                if len(retryable) != len(errors):
+                    raise RuntimeError(
+                        "Unable to delete objects from bucket %s: %s" % (
+                            self.bucket_name,
+                            ', '.join("%s (%s)" % (i['Key'], i['Message'])
+                                      for i in errors if i.get('Code') not in RETRYABLE_ERROR_CODES)  # noqa pylint: disable=line-too-long
+                        )
+                    )
+                self._record_deleted(len(objects) - len(retryable))
+                if not retryable:
+                    return
+                objects = retryable
+                time.sleep(random.uniform(0, min(20, 0.5 * 2 ** attempt)))
+            raise RuntimeError("Deleting objects from bucket %s was "
+                               "throttled %d times; giving up"
+                               % (self.bucket_name, DELETE_MAX_ATTEMPTS))
+        except Exception as exc:  # pylint: disable=broad-except
+            with self._lock:
+                self._errors.append(exc)
+                self.stopped = True
+        finally:
+            self._batch_slots.release()
+
+    def _record_deleted(self, count):
+        """Update deletion count, logging progress periodically."""
+        with self._lock:
+            self.deleted += count
+            now = time.time()
+            if now - self._last_progress >= PROGRESS_INTERVAL_SECONDS:
+                self._last_progress = now
+                LOGGER.info("%s: deleted %d object versions (%d/s)...",
+                            self.bucket_name,
+                            self.deleted,
+                            self.deleted / (now - self._start_time))
+            if self.lifecycle_fallback_threshold is not None and (
+                    self.deleted >= self.lifecycle_fallback_threshold):
+                self.stopped = True
+
+    def _queue_page(self, page):
+        """Queue deletion of the versions & delete markers in a page."""
+        objects = [{'Key': i['Key'], 'VersionId': i['VersionId']}
+                   for i in page.get('Versions', []) + page.get('DeleteMarkers', [])]  # noqa pylint: disable=line-too-long
+        if objects:
+            self._batch_slots.acquire()
+            self._delete_pool.apply_async(self._delete_batch, (objects,))
+
+    def _purge_prefix(self, prefix_and_delimiter):
+        """Queue deletion of versions under a prefix; return subprefixes."""
+        prefix, delimiter = prefix_and_delimiter
+        paginate_args = {'Bucket': self.bucket_name, 'Prefix': prefix}
+        if delimiter:
+            paginate_args['Delimiter'] = delimiter
+        subprefixes = []
+        paginator = self.s3_client.get_paginator('list_object_versions')
+        for page in paginator.paginate(**paginate_args):
+            if self.stopped:
+                break
+            self._queue_page(page)
+            subprefixes.extend(i['Prefix']
+                               for i in page.get('CommonPrefixes', []))
+        return subprefixes
+
+    def purge(self):
+        """Delete all object versions; return False if any remain."""
+        self._start_time = self._last_progress = time.time()
+        list_pool = ThreadPool(self.concurrency)
+        try:
+            prefixes = ['']
+            for _depth in range(self.prefix_depth):
+                if not prefixes or self.stopped:
+                    break
+                prefixes = [
+                    i for subprefixes in list_pool.map(
+                        self._purge_prefix,
+                        [(prefix, '/') for prefix in prefixes]
+                    ) for i in subprefixes
+                ]
+            if prefixes and not self.stopped:
+                list_pool.map(self._purge_prefix,
+                              [(prefix, None) for prefix in prefixes])
+        finally:
+            list_pool.close()
+            self._delete_pool.close()
+            self._delete_pool.join()
+        if self._errors:
+            raise self._errors[0]
+        LOGGER.info("%s: deleted %d object versions in %d seconds",
+                    self.bucket_name,
+                    self.deleted,
+                    time.time() - self._start_time)
+        if self.stopped and self.versions_remain():
+            self.apply_expiration_lifecycle()
+            return False
+        return True
+
+    def versions_remain(self):
+        """Return True if the bucket contains any object versions."""
+        response = self.s3_client.list_object_versions(
+            Bucket=self.bucket_name,
+            MaxKeys=1
+        )
+        return bool(response.get('Versions') or
+                    response.get('DeleteMarkers'))
+
+    def apply_expiration_lifecycle(self):
+        """Configure the bucket to expire all of its objects."""
+        LOGGER.warning("%s: more than %d object versions found; applying a "
+                       "lifecycle configuration expiring all objects "
+                       "instead of deleting the rest. S3 will empty the "
+                       "bucket over the next day or two, after which the "
+                       "destroy can be re-run.",
+                       self.bucket_name,
+                       self.lifecycle_fallback_threshold)
+        self.s3_client.put_bucket_lifecycle_configuration(
+            Bucket=self.bucket_name,
+            LifecycleConfiguration={'Rules': [
+                {'ID': 'runway-purge-bucket',
+                 'Filter': {'Prefix': ''},
+                 'Status': 'Enabled',
+                 'Expiration': {'Days': 1},
+                 'NoncurrentVersionExpiration': {'NoncurrentDays': 1},
+                 'AbortIncompleteMultipartUpload': {
+                     'DaysAfterInitiation': 1
+                 }},
+                {'ID': 'runway-purge-bucket-delete-markers',
+                 'Filter': {'Prefix': ''},
+                 'Status': 'Enabled',
+                 'Expiration': {'ExpiredObjectDeleteMarker': True}}
+            ]}
+        )
+
 
 def purge_bucket(context, provider, **kwargs):
     """Delete objects in bucket."""
@@ -59,6 +256,12 @@ def purge_bucket(context, provider, **kwargs):
             return True
         raise
 
-    bucket = s3_resource.Bucket(bucket_name)
-    bucket.object_versions.delete()
-    return True
+    return BucketPurger(
+        s3_resource.meta.client,
+        bucket_name,
+        concurrency=kwargs.get('concurrency', DEFAULT_CONCURRENCY),
+        prefix_depth=kwargs.get('prefix_depth', DEFAULT_PREFIX_DEPTH),
+        lifecycle_fallback_threshold=kwargs.get(
+            'lifecycle_fallback_threshold'
+        )
+    ).purge()
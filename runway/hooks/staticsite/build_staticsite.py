@@ -1,10 +1,15 @@
 """Stacker hook for building static website."""
 
+import io
 import logging
 import os
+import sys
+import tarfile
 import tempfile
 import zipfile
 
+from multiprocessing.pool import ThreadPool
+
 from boto3.s3.transfer import S3Transfer
 import boto3
 
@@ -17,6 +22,11 @@ from ...util import change_dir, run_commands
 
 LOGGER = logging.getLogger(__name__)
 
+ARCHIVE_FORMATS = ['zip', 'tar.gz']
+MULTIPART_PART_SIZE = 8 * 1024 * 1024  # S3 minimum (non-final) part is 5MB
+MULTIPART_MAX_CONCURRENCY = 4
+READ_BLOCK_SIZE = 8 * 1024 * 1024
+
 
 def does_s3_object_exist(bucket_name, key, session=None):
     """Determine if object exists on s3."""
@@ -34,47 +44,277 @@ def does_s3_object_exist(bucket_name, key, session=None):
     return True
 
 
+class S3MultipartUploadStream(object):  # pylint: disable=too-many-instance-attributes
+    """Write-only file object streaming its contents to an S3 object.
+
+    Data is buffered into parts which are uploaded (concurrently) as each
+    fills, so archives never need to be written to local disk. The upload
+    is aborted if the stream is exited due to an exception.
+    """
+
+    def __init__(self, s3_client, bucket, key,
+                 part_size=MULTIPART_PART_SIZE,
+                 max_concurrency=MULTIPART_MAX_CONCURRENCY):
+        """Initialize multipart upload."""
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.upload_id = s3_client.create_multipart_upload(
+            Bucket=bucket,
+            Key=key
+        )['UploadId']
+        self._buffer = bytearray()
+        self._position = 0
+        self._pending_parts = []
+        self._parts = []
+        self._pool = ThreadPool(max_concurrency)
+
+    def __enter__(self):
+        """Enter context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Complete upload, or abort it on error."""
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _upload_part(self, part_number, body):
+        """Upload a single part; return its completion info."""
+        response = self.s3_client.upload_part(Bucket=self.bucket,
+                                              Key=self.key,
+                                              UploadId=self.upload_id,
+                                              PartNumber=part_number,
+                                              Body=body)
+        return {'ETag': response['ETag'], 'PartNumber': part_number}
+
+    def _queue_part(self, body):
+        """Upload part in the background, bounding memory use."""
+        if len(self._pending_parts) >= self.max_concurrency:
+            self._parts.append(self._pending_parts.pop(0).get())
+        part_number = len(self._parts) + len(self._pending_parts) + 1
+        self._pending_parts.append(
+            self._pool.apply_async(self._upload_part,
+                                   (part_number, bytes(body)))
+        )
+
+    def write(self, data):
+        """Buffer data, uploading parts as they fill."""
+        self._buffer.extend(data)
+        self._position += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._queue_part(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def tell(self):
+        """Return number of bytes written."""
+        return self._position
+
+    def flush(self):
+        """Do nothing; parts are only uploaded once full."""
+
+    def close(self):
+        """Upload the remaining data and complete the upload."""
+        try:
+            if self._buffer or not (self._parts or self._pending_parts):
+                self._queue_part(self._buffer)
+                self._buffer = bytearray()
+            self._parts.extend(i.get() for i in self._pending_parts)
+            self._pending_parts = []
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': self._parts}
+            )
+        except Exception:  # pylint: disable=broad-except
+            self.abort()
+            raise
+        finally:
+            self._pool.close()
+
+    def abort(self):
+        """Abort the upload, discarding any uploaded parts."""
+        self._pool.close()
+        self._pool.join()
+        self.s3_client.abort_multipart_upload(Bucket=self.bucket,
+                                              Key=self.key,
+                                              UploadId=self.upload_id)
+
+
+class S3ObjectReader(io.RawIOBase):  # pylint: disable=too-many-instance-attributes
+    """Seekable read-only file object backed by ranged S3 GETs.
+
+    Ranges are fetched in blocks, so sequentially reading a zip archive's
+    entries downloads it once without writing it to local disk.
+    """
+
+    def __init__(self, s3_client, bucket, key, block_size=READ_BLOCK_SIZE):
+        """Initialize reader."""
+        super(S3ObjectReader, self).__init__()
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.block_size = block_size
+        self.size = s3_client.head_object(Bucket=bucket,
+                                          Key=key)['ContentLength']
+        self._position = 0
+        self._block_start = 0
+        self._block = b''
+
+    def readable(self):
+        """Return True; object is readable."""
+        return True
+
+    def seekable(self):
+        """Return True; object is seekable."""
+        return True
+
+    def tell(self):
+        """Return current position."""
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """Change current position."""
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._position = max(0, offset)
+        return self._position
+
+    def _fetch_block(self, start):
+        """Download block beginning at start."""
+        end = min(start + self.block_size, self.size) - 1
+        self._block = self.s3_client.get_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Range="bytes=%d-%d" % (start, end)
+        )['Body'].read()
+        self._block_start = start
+
+    def read(self, size=-1):
+        """Read up to size bytes from the current position."""
+        if size is None or size < 0:
+            size = self.size - self._position
+        size = min(size, self.size - self._position)
+        chunks = []
+        while size > 0:
+            offset = self._position - self._block_start
+            if not 0 <= offset < len(self._block):
+                self._fetch_block(self._position)
+                offset = 0
+            chunk = self._block[offset:offset + size]
+            chunks.append(chunk)
+            self._position += len(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def readinto(self, buffer):
+        """Read bytes into a pre-allocated buffer."""
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def get_archive_extension(archive_format):
+    """Return file extension for the archive format."""
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError("Invalid archive format \"%s\" (must be one of %s)"
+                         % (archive_format, ', '.join(ARCHIVE_FORMATS)))
+    return '.' + archive_format
+
+
+def strip_archive_extension(key):
+    """Return archive key without its extension (of any archive format)."""
+    for i in ARCHIVE_FORMATS:
+        if key.endswith(get_archive_extension(i)):
+            return key[:-len(get_archive_extension(i))]
+    return key
+
+
+def ensure_tar_member_is_safe(member, output_dir):
+    """Raise an error if a tar member would extract outside output_dir."""
+    target = os.path.realpath(os.path.join(output_dir, member.name))
+    if not (member.isfile() or member.isdir()) or not target.startswith(
+            os.path.realpath(output_dir) + os.sep):
+        raise ValueError("Refusing to extract unsafe archive member %s"
+                         % member.name)
+
+
 def download_and_extract_to_mkdtemp(bucket, key, session=None):
-    """Download zip archive and extract it to temporary directory."""
+    """Download site archive and extract it to temporary directory.
+
+    tar.gz archives are extracted as they download; zip archives are read
+    via ranged requests since their index is at the end of the file.
+    """
     if session:
         s3_client = session.client('s3')
     else:
         s3_client = boto3.client('s3')
-    transfer = S3Transfer(s3_client)
-
-    filedes, temp_file = tempfile.mkstemp()
-    os.close(filedes)
-    transfer.download_file(bucket, key, temp_file)
 
     output_dir = tempfile.mkdtemp()
-    zip_ref = zipfile.ZipFile(temp_file, 'r')
-    zip_ref.extractall(output_dir)
-    zip_ref.close()
-    os.remove(temp_file)
+    if key.endswith(get_archive_extension('tar.gz')):
+        body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+        with tarfile.open(fileobj=body, mode='r|gz') as tar_ref:
+            for member in tar_ref:
+                ensure_tar_member_is_safe(member, output_dir)
+                tar_ref.extract(member, output_dir)
+    else:
+        with zipfile.ZipFile(S3ObjectReader(s3_client, bucket, key),
+                             'r') as zip_ref:
+            zip_ref.extractall(output_dir)
     return output_dir
 
 
-def zip_and_upload(app_dir, bucket, key, session=None):
-    """Zip built static site and upload to S3."""
+def write_archive(app_dir, fileobj, archive_format):
+    """Write archive of the app directory to a (possibly unseekable) stream."""
+    with change_dir(app_dir):
+        if archive_format == 'tar.gz':
+            # Symlinks are archived as their targets' contents (as in zip
+            # archives), since only files & directories are extracted
+            with tarfile.open(fileobj=fileobj, mode='w|gz',
+                              dereference=True) as filehandle:
+                for dirname, _subdirs, files in os.walk('./'):
+                    if dirname != './':
+                        filehandle.add(dirname, arcname=dirname[2:],
+                                       recursive=False)
+                    for filename in files:
+                        filepath = os.path.join(dirname, filename)
+                        filehandle.add(filepath, arcname=filepath[2:])
+        else:
+            with zipfile.ZipFile(fileobj, 'w',
+                                 zipfile.ZIP_DEFLATED) as filehandle:
+                for dirname, _subdirs, files in os.walk('./'):
+                    if dirname != './':
+                        filehandle.write(dirname)
+                    for filename in files:
+                        filehandle.write(os.path.join(dirname, filename))
+
+
+def zip_and_upload(app_dir, bucket, key, session=None, archive_format='zip'):
+    """Archive built static site and stream it to S3."""
     if session:
         s3_client = session.client('s3')
     else:
         s3_client = boto3.client('s3')
-    transfer = S3Transfer(s3_client)
 
-    filedes, temp_file = tempfile.mkstemp()
-    os.close(filedes)
     LOGGER.info("staticsite: archiving app at %s to s3://%s/%s",
                 app_dir, bucket, key)
-    with zipfile.ZipFile(temp_file, 'w', zipfile.ZIP_DEFLATED) as filehandle:
-        with change_dir(app_dir):
-            for dirname, _subdirs, files in os.walk('./'):
-                if dirname != './':
-                    filehandle.write(dirname)
-                for filename in files:
-                    filehandle.write(os.path.join(dirname, filename))
-    transfer.upload_file(temp_file, bucket, key)
-    os.remove(temp_file)
+    if archive_format == 'zip' and sys.version_info < (3, 5):
+        # Older zipfile modules can't write to unseekable streams
+        filedes, temp_file = tempfile.mkstemp()
+        os.close(filedes)
+        write_archive(app_dir, temp_file, archive_format)
+        S3Transfer(s3_client).upload_file(temp_file, bucket, key)
+        os.remove(temp_file)
+    else:
+        with S3MultipartUploadStream(s3_client, bucket, key) as stream:
+            write_archive(app_dir, stream, archive_format)
 
 
 def build(context, provider, **kwargs):  # pylint: disable=unused-argument
@@ -102,15 +342,20 @@ def build(context, provider, **kwargs):  # pylint: disable=unused-argument
     if options.get('pre_build_steps'):
         run_commands(options['pre_build_steps'], options['path'])
 
+    source_hashing = options.get('source_hashing', {})
     context_dict['hash'] = get_hash_of_files(
         root_path=options['path'],
-        directories=options.get('source_hashing', {}).get('directories')
+        directories=source_hashing.get('directories'),
+        hash_format=source_hashing.get('format'),
+        digest=source_hashing.get('digest'),
+        workers=source_hashing.get('workers'),
+        cache=source_hashing.get('cache', True)
     )
 
     # Now determine if the current staticsite has already been deployed
-    if options.get('source_hashing', {}).get('enabled', True):
-        context_dict['hash_tracking_parameter'] = options.get(
-            'source_hashing', {}).get('parameter', default_param_name)
+    if source_hashing.get('enabled', True):
+        context_dict['hash_tracking_parameter'] = source_hashing.get(
+            'parameter', default_param_name)
 
         ssm_client = session.client('ssm')
 
@@ -124,12 +369,19 @@ def build(context, provider, **kwargs):  # pylint: disable=unused-argument
         context_dict['hash_tracking_disabled'] = True
         old_parameter_value = None
 
+    archive_format = options.get('archive_format', 'zip')
+    archive_extension = get_archive_extension(archive_format)
     context_dict['current_archive_filename'] = (
-        context_dict['artifact_key_prefix'] + context_dict['hash'] + '.zip'
+        context_dict['artifact_key_prefix'] + context_dict['hash'] +
+        archive_extension
     )
     if old_parameter_value:
+        # The previous archive may have been uploaded in another format, so
+        # this is only compared without its extension (see
+        # get_archives_to_prune)
         context_dict['old_archive_filename'] = (
-            context_dict['artifact_key_prefix'] + old_parameter_value + '.zip'
+            context_dict['artifact_key_prefix'] + old_parameter_value +
+            archive_extension
         )
 
     if old_parameter_value == context_dict['hash']:
@@ -151,7 +403,8 @@ def build(context, provider, **kwargs):  # pylint: disable=unused-argument
             LOGGER.info('staticsite: executing build commands')
             run_commands(options['build_steps'], options['path'])
         zip_and_upload(build_output, context_dict['artifact_bucket_name'],
-                       context_dict['current_archive_filename'], session)
+                       context_dict['current_archive_filename'], session,
+                       archive_format)
         context_dict['app_directory'] = build_output
 
     context_dict['deploy_is_current'] = False
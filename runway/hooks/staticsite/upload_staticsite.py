@@ -1,5 +1,6 @@
 """Stacker hook for syncing static website to S3 bucket."""
 
+import hashlib
 import logging
 import os
 import time
@@ -7,12 +8,21 @@ import time
 from operator import itemgetter
 
 from awscli.clidriver import create_clidriver
+from six.moves.urllib.parse import quote
 
 from stacker.lookups.handlers.output import OutputLookup
 from stacker.session_cache import get_session
 
+from .build_staticsite import strip_archive_extension
+
 LOGGER = logging.getLogger(__name__)
 
+# CloudFront allows 3000 paths (15 of them wildcards) to be in progress
+# at any one time for a distribution
+CF_MAX_INVALIDATION_PATHS = 3000
+CF_MAX_WILDCARD_PATHS = 15
+DEFAULT_MAX_INVALIDATION_PATHS = 300
+
 
 def aws_cli(*cmd):
     """Invoke aws command."""
@@ -35,16 +45,109 @@ def aws_cli(*cmd):
         os.environ.update(old_env)
 
 
+def get_local_files(app_directory):
+    """Return dict of S3 keys to local file paths for the site directory."""
+    local_files = {}
+    for root, _dirs, files in os.walk(app_directory, followlinks=True):
+        for filename in files:
+            filepath = os.path.join(root, filename)
+            key = os.path.relpath(filepath, app_directory).replace(os.sep, '/')
+            local_files[key] = filepath
+    return local_files
+
+
+def get_file_md5(filepath):
+    """Return hex md5 digest of a file (matching a single-part S3 ETag)."""
+    file_hash = hashlib.md5()
+    with open(filepath, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_changed_keys(s3_client, bucket_name, app_directory):
+    """Return keys that a sync of the site directory will add/update/delete.
+
+    Objects are compared by size and (for single-part uploads) ETag.
+    Objects uploaded via multipart have no comparable ETag, so they are
+    treated as changed whenever they're present locally.
+    """
+    remote_objects = {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name):
+        for i in page.get('Contents', []):
+            remote_objects[i['Key']] = i
+    local_files = get_local_files(app_directory)
+
+    changed_keys = set(remote_objects) - set(local_files)  # deletions
+    for key, filepath in local_files.items():
+        remote_object = remote_objects.get(key)
+        if remote_object is None or (
+                remote_object['Size'] != os.path.getsize(filepath)):
+            changed_keys.add(key)
+            continue
+        etag = remote_object.get('ETag', '').strip('"')
+        if '-' in etag or etag != get_file_md5(filepath):
+            changed_keys.add(key)
+    return sorted(changed_keys)
+
+
+def get_invalidation_paths(keys, max_paths=DEFAULT_MAX_INVALIDATION_PATHS):
+    """Return CloudFront invalidation paths for the given S3 keys.
+
+    Directory index documents also invalidate their directory path (with
+    & without a trailing slash, as both are served the document). When
+    there are more than ``max_paths`` paths, the directories containing the
+    most paths are collapsed into wildcards until the list fits; if it still
+    doesn't (or too many wildcards would be needed), ``/*`` is returned.
+    """
+    max_paths = min(max_paths, CF_MAX_INVALIDATION_PATHS)
+    paths = set()
+    for key in keys:
+        path = '/' + quote(key)
+        paths.add(path)
+        if path.split('/')[-1] == 'index.html':
+            paths.add(path[:-len('index.html')])
+            if path != '/index.html':
+                paths.add(path[:-len('/index.html')])
+
+    while len(paths) > max_paths:
+        directory_counts = {}
+        for path in paths:
+            parts = path.split('/')[1:-1]
+            for i in range(1, len(parts) + 1):
+                directory = '/' + '/'.join(parts[:i])
+                directory_counts[directory] = directory_counts.get(
+                    directory, 0
+                ) + 1
+        if not directory_counts or max(directory_counts.values()) < 2:
+            return ['/*']
+        # Collapse the directory saving the most paths (deepest on ties)
+        directory = max(directory_counts,
+                        key=lambda x: (directory_counts[x], x.count('/')))
+        paths = set(i for i in paths if not i.startswith(directory + '/'))
+        paths.add(directory + '/*')
+
+    if len([i for i in paths if i.endswith('*')]) > CF_MAX_WILDCARD_PATHS:
+        return ['/*']
+    return sorted(paths)
+
+
 def get_archives_to_prune(archives, hook_data):
-    """Return list of keys to delete."""
+    """Return list of keys to delete.
+
+    The current & previous archives are retained in any archive format, as
+    the format may have changed since the previous archive was uploaded.
+    """
     files_to_skip = []
     for i in ['current_archive_filename', 'old_archive_filename']:
         if hook_data.get(i):
-            files_to_skip.append(hook_data[i])
+            files_to_skip.append(strip_archive_extension(hook_data[i]))
     archives.sort(key=itemgetter('LastModified'),
                   reverse=False)  # sort from oldest to newest
     # Drop all but last 15 files
-    return [i['Key'] for i in archives[:-15] if i['Key'] not in files_to_skip]
+    return [i['Key'] for i in archives[:-15]
+            if strip_archive_extension(i['Key']) not in files_to_skip]
 
 
 def sync(context, provider, **kwargs):  # pylint: disable=too-many-locals
@@ -69,6 +172,20 @@ def sync(context, provider, **kwargs):  # pylint: disable=too-many-locals
             context=context
         )
 
+        invalidation_options = kwargs.get('cf_invalidation', {})
+        if invalidation_options.get('targeted', True):
+            invalidation_paths = get_invalidation_paths(
+                get_changed_keys(
+                    session.client('s3'),
+                    bucket_name,
+                    context.hook_data['staticsite']['app_directory']
+                ),
+                invalidation_options.get('max_paths',
+                                         DEFAULT_MAX_INVALIDATION_PATHS)
+            )
+        else:
+            invalidation_paths = ['/*']
+
         # Using the awscli for s3 syncing is incredibly suboptimal, but on
         # balance it's probably the most stable/efficient option for syncing
         # the files until https://github.com/boto/boto3/issues/358 is resolved
@@ -78,12 +195,25 @@ def sync(context, provider, **kwargs):  # pylint: disable=too-many-locals
                  "s3://%s/" % bucket_name,
                  '--delete'])
 
-        cf_client = session.client('cloudfront')
-        cf_client.create_invalidation(
-            DistributionId=distribution_id,
-            InvalidationBatch={'Paths': {'Quantity': 1, 'Items': ['/*']},
-                               'CallerReference': str(time.time())}
-        )
+        if invalidation_paths:
+            LOGGER.info("staticsite: invalidating %d path(s) on CF "
+                        "distribution %s",
+                        len(invalidation_paths),
+                        distribution_id)
+            LOGGER.debug("staticsite: invalidation paths: %s",
+                         ', '.join(invalidation_paths))
+            cf_client = session.client('cloudfront')
+            cf_client.create_invalidation(
+                DistributionId=distribution_id,
+                InvalidationBatch={
+                    'Paths': {'Quantity': len(invalidation_paths),
+                              'Items': invalidation_paths},
+                    'CallerReference': str(time.time())
+                }
+            )
+        else:
+            LOGGER.info("staticsite: no changed objects; skipping CF "
+                        "invalidation")
         LOGGER.info("staticsite: sync & CF invalidation of %s (domain %s) "
                     "complete",
                     distribution_id,
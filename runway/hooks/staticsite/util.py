@@ -1,15 +1,35 @@
 """Utility functions for website build/upload."""
 
 import hashlib
+import json
 import logging
+import mmap
+import multiprocessing
 import os
+import time
+
+from multiprocessing.pool import ThreadPool
 
 import zgitignore
 
-from ...util import change_dir
+from ...util import RUNWAY_CACHE_DIR, change_dir
 
 LOGGER = logging.getLogger(__name__)
 
+# 'legacy' is the original single-stream md5 hash of all file contents
+# (matching the hashes stored by existing sites); 'per_file' combines
+# individual file digests, which can be calculated in parallel and cached
+# between runs
+HASH_FORMATS = ['legacy', 'per_file']
+DEFAULT_HASH_FORMAT = 'legacy'
+DEFAULT_DIGEST = 'md5'
+HASH_CACHE_FILENAME = 'staticsite-file-hashes.json'
+MMAP_THRESHOLD = 4 * 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+# Files modified this recently could be changed again within the
+# filesystem's timestamp resolution, so their digests aren't cached
+CACHE_MIN_AGE_SECONDS = 2
+
 
 def calculate_hash_of_files(files, root):
     """Return a hash of all of the given files at the given root.
@@ -30,19 +50,146 @@ def calculate_hash_of_files(files, root):
         fileobj = os.path.join(root, fname)
         file_hash.update((fname + "\0").encode())
         with open(fileobj, "rb") as filedes:
-            for chunk in iter(lambda: filedes.read(4096), ""):  # noqa pylint: disable=cell-var-from-loop
-                if not chunk:
-                    break
+            for chunk in iter(lambda: filedes.read(READ_CHUNK_SIZE), b""):  # noqa pylint: disable=cell-var-from-loop
                 file_hash.update(chunk)
             file_hash.update("\0".encode())
 
     return file_hash.hexdigest()
 
 
-def get_hash_of_files(root_path, directories=None):
-    """Generate md5 hash of files."""
+def calculate_file_digest(filepath, digest=DEFAULT_DIGEST):
+    """Return the hex digest of a single file's contents.
+
+    Large files are memory-mapped rather than read in chunks.
+    """
+    file_hash = hashlib.new(digest)
+    with open(filepath, 'rb') as filedes:
+        if os.fstat(filedes.fileno()).st_size >= MMAP_THRESHOLD:
+            mapped_file = mmap.mmap(filedes.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+            try:
+                file_hash.update(mapped_file)
+            finally:
+                mapped_file.close()
+        else:
+            for chunk in iter(lambda: filedes.read(READ_CHUNK_SIZE), b""):
+                file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def load_hash_cache(cache_file):
+    """Return previously cached file digests (or an empty dict)."""
+    if cache_file and os.path.isfile(cache_file):
+        try:
+            with open(cache_file, 'r') as stream:
+                return json.load(stream)
+        except ValueError:
+            LOGGER.debug('Ignoring unreadable hash cache file %s',
+                         cache_file)
+    return {}
+
+
+def save_hash_cache(cache_file, cache):
+    """Write file digest cache to disk."""
+    cache_dir = os.path.dirname(cache_file)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    temp_file = cache_file + '.tmp'
+    with open(temp_file, 'w') as stream:
+        json.dump(cache, stream)
+    if os.path.isfile(cache_file):
+        os.remove(cache_file)  # os.rename won't overwrite on Windows
+    os.rename(temp_file, cache_file)
+
+
+def calculate_hash_of_files_per_file(files, root, digest=DEFAULT_DIGEST,  # noqa pylint: disable=too-many-arguments,too-many-locals
+                                     workers=None, cache_file=None):
+    """Return a hash of the individual digests of the given files.
+
+    File digests are calculated in a thread pool and (when ``cache_file`` is
+    provided) cached keyed by file size & modification time.
+
+    Args:
+        files (list[str]): file names to include in the hash calculation,
+            relative to ``root``.
+        root (str): base directory to analyze files in.
+        digest (str): hashlib algorithm name used for all digests.
+        workers (Optional[int]): number of hashing threads.
+        cache_file (Optional[str]): path of the digest cache file.
+    Returns:
+        str: A hash of the hashes of the given files.
+
+    """
+    if workers is None:
+        workers = min(32, multiprocessing.cpu_count() + 4)
+    cache = load_hash_cache(cache_file)
+    new_cache = {}
+    file_digests = {}
+    files_to_hash = []
+    cutoff = time.time() - CACHE_MIN_AGE_SECONDS
+    for fname in files:
+        fstat = os.stat(os.path.join(root, fname))
+        cache_key = "%s:%s" % (digest, fname)
+        cache_entry = [fstat.st_size, fstat.st_mtime]
+        cached = cache.get(cache_key)
+        if cached and cached[:2] == cache_entry:
+            file_digests[fname] = cached[2]
+            new_cache[cache_key] = cached
+        else:
+            files_to_hash.append((fname, cache_key, cache_entry))
+
+    LOGGER.debug('staticsite: hashing %d file(s) (%d cached)',
+                 len(files_to_hash),
+                 len(file_digests))
+    if files_to_hash:
+        pool = ThreadPool(workers)
+        try:
+            results = pool.map(
+                lambda x: calculate_file_digest(os.path.join(root, x[0]),
+                                                digest),
+                files_to_hash
+            )
+        finally:
+            pool.close()
+            pool.join()
+        for (fname, cache_key, cache_entry), result in zip(files_to_hash,
+                                                           results):
+            file_digests[fname] = result
+            if cache_entry[1] < cutoff:
+                new_cache[cache_key] = cache_entry + [result]
+
+    if cache_file and new_cache != cache:
+        save_hash_cache(cache_file, new_cache)
+
+    file_hash = hashlib.new(digest)
+    for fname in sorted(files):
+        file_hash.update((fname + "\0" + file_digests[fname] + "\0").encode())
+    return file_hash.hexdigest()
+
+
+def get_hash_of_files(root_path, directories=None, hash_format=None,  # noqa pylint: disable=too-many-arguments
+                      digest=None, workers=None, cache=True):
+    """Generate hash of files.
+
+    Args:
+        root_path (str): base directory of the files.
+        directories (Optional[list[dict]]): directories (with optional
+            gitignore-format exclusions) to hash, relative to ``root_path``.
+        hash_format (Optional[str]): one of ``HASH_FORMATS`` (defaults to
+            ``legacy``, which produces the same hashes as previous Runway
+            releases).
+        digest (Optional[str]): hashlib algorithm for ``per_file`` hashes.
+        workers (Optional[int]): number of ``per_file`` hashing threads.
+        cache (bool): cache ``per_file`` digests in ``.runway_cache``.
+
+    """
     if not directories:
         directories = [{'path': './'}]
+    if hash_format is None:
+        hash_format = DEFAULT_HASH_FORMAT
+    if hash_format not in HASH_FORMATS:
+        raise ValueError("Invalid source hashing format \"%s\" (must be one "
+                         "of %s)" % (hash_format, ', '.join(HASH_FORMATS)))
 
     files_to_hash = []
     for i in directories:
@@ -55,6 +202,7 @@ def get_hash_of_files(root_path, directories=None):
                     dirs[:] = []
                     files[:] = []
                 else:
+                    dirs[:] = [d for d in dirs if d != RUNWAY_CACHE_DIR]
                     for filename in files:
                         filepath = os.path.join(root, filename)
                         if not ignorer.is_ignored(filepath):
@@ -62,7 +210,17 @@ def get_hash_of_files(root_path, directories=None):
                                 filepath[2:] if filepath.startswith('./') else filepath  # noqa
                             )
 
-    return calculate_hash_of_files(files_to_hash, root_path)
+    if hash_format == 'legacy':
+        return calculate_hash_of_files(files_to_hash, root_path)
+    return calculate_hash_of_files_per_file(
+        files_to_hash,
+        root_path,
+        digest=digest or DEFAULT_DIGEST,
+        workers=workers,
+        cache_file=os.path.join(root_path,
+                                RUNWAY_CACHE_DIR,
+                                HASH_CACHE_FILENAME) if cache else None
+    )
 
 
 def get_ignorer(path, additional_exclusions=None):
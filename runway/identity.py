@@ -0,0 +1,78 @@
+"""Run-scoped cache of AWS identities, keyed by credentials."""
+
+import hashlib
+import logging
+import threading
+from typing import Dict, List  # noqa pylint: disable=unused-import
+
+import boto3
+
+from .api_metrics import register_session
+from .fingerprint import get_boto_args
+
+LOGGER = logging.getLogger('runway')
+
+# Environment variables determining which credentials boto3 will resolve
+CREDENTIAL_ENV_VARS = ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY',
+                       'AWS_SESSION_TOKEN', 'AWS_PROFILE',
+                       'AWS_DEFAULT_PROFILE', 'AWS_CONFIG_FILE',
+                       'AWS_SHARED_CREDENTIALS_FILE']
+IDENTITY_CACHE = {}  # type: Dict[str, Dict[str, str]]
+ACCOUNT_ALIAS_CACHE = {}  # type: Dict[str, List[str]]
+CACHE_LOCK = threading.Lock()
+
+
+def get_credential_fingerprint(env_vars):
+    """Return hash identifying the credentials of env_vars."""
+    fingerprint = hashlib.sha256()
+    for i in CREDENTIAL_ENV_VARS:
+        fingerprint.update(("%s=%s\0" % (i, env_vars.get(i, ''))).encode())
+    return fingerprint.hexdigest()
+
+
+def cache_identity(env_vars, identity):
+    """Record the identity of the credentials of env_vars."""
+    with CACHE_LOCK:
+        IDENTITY_CACHE[get_credential_fingerprint(env_vars)] = identity
+
+
+def get_caller_identity(env_vars):
+    """Return (cached) sts get_caller_identity response for env_vars."""
+    fingerprint = get_credential_fingerprint(env_vars)
+    with CACHE_LOCK:
+        if fingerprint in IDENTITY_CACHE:
+            return IDENTITY_CACHE[fingerprint]
+    # Sessions (unlike the default boto3 session) are safe to create per
+    # thread, e.g. during preflight checks
+    identity = register_session(boto3.session.Session()).client(
+        'sts', **get_boto_args(env_vars)
+    ).get_caller_identity()
+    identity = dict((i, identity[i]) for i in ['Account', 'Arn', 'UserId']
+                    if i in identity)
+    cache_identity(env_vars, identity)
+    return identity
+
+
+def get_account_id(env_vars):
+    """Return account id of the credentials of env_vars."""
+    return get_caller_identity(env_vars)['Account']
+
+
+def get_account_aliases(env_vars):
+    """Return (cached) aliases of the account of env_vars."""
+    account_id = get_account_id(env_vars)
+    with CACHE_LOCK:
+        if account_id in ACCOUNT_ALIAS_CACHE:
+            return ACCOUNT_ALIAS_CACHE[account_id]
+    # Super overkill here using pagination when an account can only
+    # have a single alias, but at least this implementation should be
+    # future-proof
+    aliases = []
+    paginator = register_session(boto3.session.Session()).client(
+        'iam', **get_boto_args(env_vars)
+    ).get_paginator('list_account_aliases')
+    for page in paginator.paginate():
+        aliases.extend(page.get('AccountAliases', []))
+    with CACHE_LOCK:
+        ACCOUNT_ALIAS_CACHE[account_id] = aliases
+    return aliases
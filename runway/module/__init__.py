@@ -1,17 +1,29 @@
 """Runway module module."""
 # (couldn't resist ^)
+from typing import Dict  # noqa pylint: disable=unused-import
 
+import hashlib
 import logging
 import os
 import platform
+import shutil
 import subprocess
 import sys
+import tarfile
+import tempfile
 
-from ..util import which
+from .. import tracing
+from ..util import file_lock, get_user_cache_dir, which
 
 LOGGER = logging.getLogger('runway')
 NPM_BIN = 'npm.cmd' if platform.system().lower() == 'windows' else 'npm'
 NPX_BIN = 'npx.cmd' if platform.system().lower() == 'windows' else 'npx'
+NODE_BIN = 'node.exe' if platform.system().lower() == 'windows' else 'node'
+NODE_MODULES_STAMP_FILENAME = '.runway-install-stamp'
+NPM_LOCKFILES = ['npm-shrinkwrap.json', 'package-lock.json']
+# Per-process results of npm/node probes (keyed by PATH)
+NPM_CI_SUPPORT = {}  # type: Dict[str, bool]
+NODE_VERSIONS = {}  # type: Dict[str, str]
 
 
 def format_npm_command_for_logging(command):
@@ -54,43 +66,210 @@ def generate_node_command(command, command_opts, path):
 
 def run_module_command(cmd_list, env_vars):
     """Shell out to provisioner command."""
+    with tracing.span(os.path.basename(cmd_list[0]), 'subprocess',
+                      command=cmd_list):
+        try:
+            subprocess.check_call(cmd_list,
+                                  env=tracing.get_child_env_vars(env_vars))
+        except subprocess.CalledProcessError as shelloutexc:
+            sys.exit(shelloutexc.returncode)
+
+
+def get_npm_lockfile(path):
+    """Return path of the module's npm lockfile (or None if not present)."""
+    for i in NPM_LOCKFILES:  # shrinkwrap takes precedence, as with npm
+        if os.path.isfile(os.path.join(path, i)):
+            return os.path.join(path, i)
+    return None
+
+
+def npm_ci_supported():
+    """Return true if the installed npm supports ``npm ci`` (npm v5.7+)."""
+    env_path = os.environ.get('PATH', '')
+    if env_path not in NPM_CI_SUPPORT:
+        with open(os.devnull, 'w') as fnull:
+            NPM_CI_SUPPORT[env_path] = subprocess.call(
+                [NPM_BIN, 'ci', '-h'],
+                stdout=fnull,
+                stderr=subprocess.STDOUT
+            ) == 0
+    return NPM_CI_SUPPORT[env_path]
+
+
+def get_node_versions():
+    """Return node & npm versions (e.g. 'node v10.15.3 npm 6.4.1')."""
+    env_path = os.environ.get('PATH', '')
+    if env_path not in NODE_VERSIONS:
+        versions = []
+        for i in [NODE_BIN, NPM_BIN]:
+            try:
+                versions.append("%s %s" % (
+                    os.path.splitext(i)[0],
+                    subprocess.check_output(
+                        [i, '--version']
+                    ).decode().strip()
+                ))
+            except (OSError, subprocess.CalledProcessError):
+                versions.append("%s unknown" % os.path.splitext(i)[0])
+        NODE_VERSIONS[env_path] = ' '.join(versions)
+    return NODE_VERSIONS[env_path]
+
+
+def get_node_modules_fingerprint(path):
+    """Return hash of the lockfile, package.json, node/npm versions & OS.
+
+    The platform (OS & architecture) is included because native modules
+    built on one can't be used on another. Returns None when the module has
+    no lockfile (i.e. installs aren't reproducible, so there's nothing to
+    compare against).
+    """
+    lockfile = get_npm_lockfile(path)
+    if not lockfile:
+        return None
+    fingerprint = hashlib.sha256()
+    for i in [lockfile, os.path.join(path, 'package.json')]:
+        if os.path.isfile(i):
+            fingerprint.update(os.path.basename(i).encode())
+            with open(i, 'rb') as stream:
+                fingerprint.update(stream.read())
+    fingerprint.update(get_node_versions().encode())
+    fingerprint.update(("%s %s" % (sys.platform,
+                                   platform.machine())).encode())
+    return fingerprint.hexdigest()
+
+
+def node_modules_are_current(path, fingerprint):
+    """Return true if node_modules was installed from the same lockfile."""
+    stamp_file = os.path.join(path, 'node_modules',
+                              NODE_MODULES_STAMP_FILENAME)
+    if fingerprint and os.path.isfile(stamp_file):
+        with open(stamp_file, 'r') as stream:
+            return stream.read().strip() == fingerprint
+    return False
+
+
+def stamp_node_modules(path, fingerprint):
+    """Record the fingerprint node_modules was installed from."""
+    if fingerprint and os.path.isdir(os.path.join(path, 'node_modules')):
+        with open(os.path.join(path,
+                               'node_modules',
+                               NODE_MODULES_STAMP_FILENAME), 'w') as stream:
+            stream.write(fingerprint)
+
+
+def get_node_modules_cache_dir(option):
+    """Return shared node_modules cache directory (or None if disabled)."""
+    if not option:
+        return None
+    if option is True:
+        return os.path.join(get_user_cache_dir(), 'node_modules')
+    return os.path.abspath(os.path.expanduser(option))
+
+
+def restore_node_modules(path, cache_dir, fingerprint):
+    """Extract cached node_modules for the fingerprint; return success."""
+    archive = os.path.join(cache_dir, fingerprint + '.tar.gz')
+    if not os.path.isfile(archive):
+        return False
+    LOGGER.info("Restoring node_modules of %s from cache...",
+                os.path.basename(path))
+    if os.path.isdir(os.path.join(path, 'node_modules')):
+        shutil.rmtree(os.path.join(path, 'node_modules'))
     try:
-        subprocess.check_call(cmd_list, env=env_vars)
-    except subprocess.CalledProcessError as shelloutexc:
-        sys.exit(shelloutexc.returncode)
+        with tarfile.open(archive, 'r:gz') as tar:
+            for member in tar.getmembers():
+                if not (member.name == 'node_modules' or
+                        member.name.startswith('node_modules/')) or (
+                            '..' in member.name.split('/')):
+                    raise tarfile.TarError("unexpected member %s"
+                                           % member.name)
+            tar.extractall(path)
+    except (IOError, OSError, tarfile.TarError) as exc:
+        LOGGER.warning("Unable to restore cached node_modules (%s); "
+                       "falling back to npm", exc)
+        if os.path.isdir(os.path.join(path, 'node_modules')):
+            shutil.rmtree(os.path.join(path, 'node_modules'))
+        return False
+    return True
+
+
+def save_node_modules(path, cache_dir, fingerprint):
+    """Store node_modules in the cache under the fingerprint."""
+    archive = os.path.join(cache_dir, fingerprint + '.tar.gz')
+    if os.path.isfile(archive):
+        return
+    # Write to a temporary file first so concurrent readers never see a
+    # partial archive
+    tmp_fd, tmp_archive = tempfile.mkstemp(dir=cache_dir,
+                                           suffix='.tar.gz.tmp')
+    os.close(tmp_fd)
+    try:
+        with tarfile.open(tmp_archive, 'w:gz') as tar:
+            tar.add(os.path.join(path, 'node_modules'), arcname='node_modules')
+        os.rename(tmp_archive, archive)
+    finally:
+        if os.path.isfile(tmp_archive):
+            os.remove(tmp_archive)
 
 
 def use_npm_ci(path):
     """Return true if npm ci should be used in lieu of npm install."""
     # https://docs.npmjs.com/cli/ci#description
-    with open(os.devnull, 'w') as fnull:
-        if ((os.path.isfile(os.path.join(path,
-                                         'package-lock.json')) or
-             os.path.isfile(os.path.join(path,
-                                         'npm-shrinkwrap.json'))) and
-                subprocess.call(
-                    [NPM_BIN, 'ci', '-h'],
-                    stdout=fnull,
-                    stderr=subprocess.STDOUT
-                ) == 0):
-            return True
-    return False
+    return bool(get_npm_lockfile(path)) and npm_ci_supported()
 
 
-def run_npm_install(path, options, context):
+def _run_npm_install(path, context):
     """Run npm install/ci."""
     # Use npm ci if available (npm v5.7+)
-    if options.get('skip_npm_ci'):
-        LOGGER.info("Skipping npm ci or npm install on %s...",
-                    os.path.basename(path))
-    elif context.env_vars.get('CI') and use_npm_ci(path):  # noqa
+    if context.env_vars.get('CI') and use_npm_ci(path):  # noqa
         LOGGER.info("Running npm ci on %s...",
                     os.path.basename(path))
-        subprocess.check_call([NPM_BIN, 'ci'])
+        with tracing.span('npm ci', 'subprocess'):
+            subprocess.check_call([NPM_BIN, 'ci'])
     else:
         LOGGER.info("Running npm install on %s...",
                     os.path.basename(path))
-        subprocess.check_call([NPM_BIN, 'install'])
+        with tracing.span('npm install', 'subprocess'):
+            subprocess.check_call([NPM_BIN, 'install'])
+
+
+def run_npm_install(path, options, context):
+    """Run npm install/ci, unless node_modules is already up to date.
+
+    node_modules is stamped with a fingerprint of the lockfile & node/npm
+    versions after each install, so repeated runs (e.g. the same module in
+    multiple regions) only install once. With the ``node_modules_cache``
+    module option, installs are also shared between modules via a cache
+    of archives keyed by the fingerprint.
+    """
+    if options.get('skip_npm_ci'):
+        LOGGER.info("Skipping npm ci or npm install on %s...",
+                    os.path.basename(path))
+        return
+    fingerprint = get_node_modules_fingerprint(path)
+    if node_modules_are_current(path, fingerprint):
+        LOGGER.info("Skipping npm ci or npm install on %s; node_modules is "
+                    "up to date with %s",
+                    os.path.basename(path),
+                    os.path.basename(get_npm_lockfile(path)))
+        return
+    cache_dir = get_node_modules_cache_dir(
+        options.get('options', {}).get('node_modules_cache')
+    )
+    if not (fingerprint and cache_dir):
+        _run_npm_install(path, context)
+        # npm install may have updated the lockfile
+        stamp_node_modules(path, get_node_modules_fingerprint(path))
+        return
+
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    with file_lock(os.path.join(cache_dir, fingerprint + '.lock')):
+        if not restore_node_modules(path, cache_dir, fingerprint):
+            _run_npm_install(path, context)
+            if get_node_modules_fingerprint(path) == fingerprint:
+                save_node_modules(path, cache_dir, fingerprint)
+    stamp_node_modules(path, get_node_modules_fingerprint(path))
 
 
 class RunwayModule(object):
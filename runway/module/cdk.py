@@ -1,20 +1,48 @@
 """CDK module."""
 
+from __future__ import print_function
+
+import hashlib
+import json
 import logging
 import os
+import re
+import shutil
 import subprocess
 import sys
+import tempfile
+import time
+from multiprocessing.pool import ThreadPool
+from typing import Dict  # noqa pylint: disable=unused-import
 
 import boto3
+from botocore.exceptions import ClientError
 import six
 
 from . import (
     RunwayModule, format_npm_command_for_logging, generate_node_command,
     run_module_command, run_npm_install
 )
-from ..util import change_dir, run_commands, which
+from .. import tracing
+from ..fingerprint import DEFAULT_EXCLUSIONS, get_boto_args
+from ..hooks.staticsite.util import get_hash_of_files
+from ..identity import get_account_id
+from ..util import (
+    RUNWAY_CACHE_DIR, change_dir, get_user_cache_dir, run_commands, which
+)
 
 LOGGER = logging.getLogger('runway')
+DEFAULT_DIFF_CONCURRENCY = 4
+# Environment variables the CDK app (or CLI) uses to determine its
+# deployment environment during synthesis
+SYNTH_ENV_VARS = ['AWS_DEFAULT_REGION', 'AWS_REGION', 'AWS_PROFILE',
+                  'CDK_DEFAULT_ACCOUNT', 'CDK_DEFAULT_REGION']
+BOOTSTRAP_STACK_NAME = 'CDKToolkit'
+BOOTSTRAP_COMPLETE_STATUSES = ['CREATE_COMPLETE', 'UPDATE_COMPLETE',
+                               'UPDATE_ROLLBACK_COMPLETE']
+BOOTSTRAP_CACHE_FILENAME = 'cdk-bootstrap.json'
+# account/region environments known to be bootstrapped during this run
+BOOTSTRAPPED_ENVIRONMENTS = {}  # type: Dict[str, int]
 
 
 def cdk_module_matches_env(env_name, env_config, env_vars):
@@ -26,17 +54,7 @@ def cdk_module_matches_env(env_name, env_config, env_vars):
         if isinstance(current_env_config, six.string_types):
             (account_id, region) = current_env_config.split('/')
             if region == env_vars['AWS_DEFAULT_REGION']:
-                boto_args = {}
-                for i in ['aws_access_key_id', 'aws_secret_access_key',
-                          'aws_session_token']:
-                    if env_vars.get(i.upper()):
-                        boto_args[i] = env_vars[i.upper()]
-                sts_client = boto3.client(
-                    'sts',
-                    region_name=env_vars['AWS_DEFAULT_REGION'],
-                    **boto_args
-                )
-                if sts_client.get_caller_identity()['Account'] == account_id:
+                if get_account_id(env_vars) == account_id:
                     return True
         if isinstance(current_env_config, dict):
             return True
@@ -53,13 +71,204 @@ def get_cdk_stacks(module_path, env_vars, context_opts):
             command_opts=['list'] + context_opts,
             path=module_path),
         env=env_vars
-    ).strip().split('\n')
+    ).decode().strip().split('\n')
+
+
+def get_bootstrap_version(env_vars):
+    """Return version of the region's CDK toolkit stack.
+
+    Returns None if the stack isn't deployed (or can't be described), and
+    0 for stacks predating the BootstrapVersion output.
+    """
+    cfn_client = boto3.client('cloudformation', **get_boto_args(env_vars))
+    try:
+        stack = cfn_client.describe_stacks(
+            StackName=BOOTSTRAP_STACK_NAME
+        )['Stacks'][0]
+    except ClientError as exc:
+        LOGGER.debug("Unable to describe %s stack: %s",
+                     BOOTSTRAP_STACK_NAME, exc)
+        return None
+    if stack['StackStatus'] not in BOOTSTRAP_COMPLETE_STATUSES:
+        return None
+    for i in stack.get('Outputs', []):
+        if i['OutputKey'] == 'BootstrapVersion':
+            return int(i['OutputValue'])
+    return 0
+
+
+def load_bootstrap_cache():
+    """Return on-disk cache of bootstrapped environments."""
+    cache_file = os.path.join(get_user_cache_dir(), BOOTSTRAP_CACHE_FILENAME)
+    if os.path.isfile(cache_file):
+        try:
+            with open(cache_file, 'r') as stream:
+                return json.load(stream)
+        except ValueError:
+            LOGGER.debug('Ignoring invalid CDK bootstrap cache %s',
+                         cache_file)
+    return {}
+
+
+def save_bootstrap_cache(environment, version):
+    """Record a bootstrapped environment in the on-disk cache."""
+    cache = load_bootstrap_cache()
+    cache[environment] = {'version': version, 'checked': time.time()}
+    if not os.path.isdir(get_user_cache_dir()):
+        os.makedirs(get_user_cache_dir())
+    tmp_fd, tmp_file = tempfile.mkstemp(dir=get_user_cache_dir())
+    with os.fdopen(tmp_fd, 'w') as stream:
+        json.dump(cache, stream)
+    os.rename(tmp_file, os.path.join(get_user_cache_dir(),
+                                     BOOTSTRAP_CACHE_FILENAME))
+
+
+def get_bootstrap_environment(env_vars):
+    """Return account/region name of the environment being deployed to."""
+    return "%s/%s" % (get_account_id(env_vars),
+                      env_vars['AWS_DEFAULT_REGION'])
+
+
+def get_required_bootstrap_version(assembly_dir):
+    """Return the toolkit stack version a synthesized CDK app requires.
+
+    This is the highest ``requiresBootstrapStackVersion`` of the artifacts
+    in the cloud assembly's manifest, or None if unknown (e.g. the app
+    wasn't synthesized by Runway, or its CDK version doesn't declare it).
+    """
+    if not assembly_dir:
+        return None
+    try:
+        with open(os.path.join(assembly_dir, 'manifest.json'), 'r') as stream:
+            artifacts = json.load(stream).get('artifacts') or {}
+    except (IOError, OSError, ValueError) as exc:
+        LOGGER.debug("Unable to read CDK cloud assembly manifest: %s", exc)
+        return None
+    versions = [i['properties']['requiresBootstrapStackVersion']
+                for i in artifacts.values()
+                if 'requiresBootstrapStackVersion' in (i.get('properties') or
+                                                       {})]
+    return max(versions) if versions else None
+
+
+def cdk_bootstrap_is_current(environment, env_vars, min_version=0,
+                             cache_ttl=0):
+    """Return true if the environment's CDK toolkit stack is up to date.
+
+    Results are cached for the rest of the run, and optionally on disk
+    for cache_ttl seconds.
+    """
+    if BOOTSTRAPPED_ENVIRONMENTS.get(environment, -1) >= min_version:
+        return True
+    if cache_ttl:
+        cached = load_bootstrap_cache().get(environment, {})
+        if cached.get('checked', 0) + cache_ttl > time.time() and (
+                cached.get('version', -1) >= min_version):
+            BOOTSTRAPPED_ENVIRONMENTS[environment] = cached['version']
+            return True
+    version = get_bootstrap_version(env_vars)
+    if version is None or version < min_version:
+        return False
+    BOOTSTRAPPED_ENVIRONMENTS[environment] = version
+    if cache_ttl:
+        save_bootstrap_cache(environment, version)
+    return True
+
+
+def get_cdk_assembly_hash(module_path, context_opts, env_vars):
+    """Return hash of the CDK app source, context, account & synth env vars.
+
+    The account is included because synthesis (e.g. context lookups of
+    environment-agnostic stacks) depends on the credentials in use.
+    """
+    assembly_hash = hashlib.sha256()
+    assembly_hash.update(json.dumps(
+        {'files': get_hash_of_files(
+            root_path=module_path,
+            directories=[{'path': './', 'exclusions': DEFAULT_EXCLUSIONS}],
+            hash_format='per_file'
+        ),
+         'context': context_opts,
+         'account_id': get_account_id(env_vars),
+         'env_vars': dict((i, env_vars.get(i)) for i in SYNTH_ENV_VARS)},
+        sort_keys=True
+    ).encode())
+    return assembly_hash.hexdigest()[:16]
+
+
+def synth_cdk_assembly(module_path, context_opts, env_vars, env_name):
+    """Synthesize the CDK app once, returning the cloud assembly directory.
+
+    Assemblies are cached in .runway_cache/cdk by environment, region &
+    hash, so unchanged apps aren't synthesized again (e.g. by a deploy
+    following a diff).
+    """
+    cache_dir = os.path.join(module_path, RUNWAY_CACHE_DIR, 'cdk')
+    prefix = "%s-%s-" % (env_name, env_vars.get('AWS_DEFAULT_REGION'))
+    assembly_dir = os.path.join(
+        cache_dir,
+        prefix + get_cdk_assembly_hash(module_path, context_opts, env_vars)
+    )
+    if os.path.isfile(os.path.join(assembly_dir, 'manifest.json')):
+        LOGGER.info("Reusing synthesized CDK app of %s",
+                    os.path.basename(module_path))
+        return assembly_dir
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir)
+    synth_command = generate_node_command(
+        'cdk',
+        ['synth', '-o', tmp_dir] + context_opts,
+        module_path
+    )
+    LOGGER.info("Running cdk synth on %s (\"%s\")",
+                os.path.basename(module_path),
+                format_npm_command_for_logging(synth_command))
+    with tracing.span('cdk synth', 'subprocess'), \
+            open(os.devnull, 'w') as fnull:
+        try:
+            subprocess.check_call(synth_command,
+                                  env=tracing.get_child_env_vars(env_vars),
+                                  stdout=fnull)
+        except subprocess.CalledProcessError as exc:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            sys.exit(exc.returncode)
+    # Only the latest assembly of each environment/region is retained
+    for i in os.listdir(cache_dir):
+        if re.match(r'^%s[0-9a-f]{16}$' % re.escape(prefix), i):
+            shutil.rmtree(os.path.join(cache_dir, i), ignore_errors=True)
+    os.rename(tmp_dir, assembly_dir)
+    return assembly_dir
+
+
+def run_cdk_diffs(stacks, cdk_opts, module_path, env_vars, concurrency):
+    """Run cdk diff on each stack concurrently, printing output in order."""
+    def diff_stack(stack):
+        """Return output of cdk diff of a stack."""
+        diff_process = subprocess.Popen(
+            generate_node_command('cdk', cdk_opts + [stack], module_path),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=env_vars
+        )
+        return diff_process.communicate()[0]
+
+    pool = ThreadPool(max(1, min(concurrency, len(stacks))))
+    try:
+        # imap returns results in order as they complete, so output can be
+        # displayed while later stacks are still being diffed
+        for output in pool.imap(diff_stack, stacks):
+            if isinstance(output, bytes):
+                output = output.decode()
+            print(output.rstrip('\n'))
+    finally:
+        pool.terminate()
 
 
 class CloudDevelopmentKit(RunwayModule):
     """CDK Runway Module."""
 
-    def run_cdk(self, command='deploy'):  # pylint: disable=too-many-branches
+    def run_cdk(self, command='deploy'):  # noqa pylint: disable=too-many-branches,too-many-locals,too-many-statements
         """Run CDK."""
         response = {'skipped_configs': False}
         cdk_opts = [command]
@@ -95,22 +304,49 @@ class CloudDevelopmentKit(RunwayModule):
                                   dict):
                         for (key, val) in self.options['environments'][self.context.env_name].items():  # noqa pylint: disable=line-too-long
                             cdk_context_opts.extend(['-c', "%s=%s" % (key, val)])
-                        cdk_opts.extend(cdk_context_opts)
+                    reuse_synth = self.options.get('options', {}).get(
+                        'cdk_reuse_synth', False
+                    ) and command in ['diff', 'deploy']
+                    if reuse_synth:
+                        assembly_dir = synth_cdk_assembly(
+                            self.path,
+                            cdk_context_opts,
+                            self.context.env_vars,
+                            self.context.env_name
+                        )
+                        cdk_app_opts = ['--app', assembly_dir]
+                    else:
+                        assembly_dir = None
+                        cdk_app_opts = cdk_context_opts
+                    cdk_opts.extend(cdk_app_opts)
                     if command == 'diff':
                         LOGGER.info("Running cdk %s on each stack in %s",
                                     command,
                                     os.path.basename(self.path))
-                        for i in get_cdk_stacks(self.path,
+                        stacks = get_cdk_stacks(self.path,
                                                 self.context.env_vars,
-                                                cdk_context_opts):
-                            subprocess.call(
-                                generate_node_command(
-                                    'cdk',
-                                    cdk_opts + [i],  # 'diff <stack>'
-                                    self.path
-                                ),
-                                env=self.context.env_vars
+                                                cdk_app_opts)
+                        if reuse_synth:
+                            run_cdk_diffs(
+                                stacks,
+                                cdk_opts,
+                                self.path,
+                                self.context.env_vars,
+                                self.options.get('options', {}).get(
+                                    'cdk_diff_concurrency',
+                                    DEFAULT_DIFF_CONCURRENCY
+                                )
                             )
+                        else:
+                            for i in stacks:
+                                subprocess.call(
+                                    generate_node_command(
+                                        'cdk',
+                                        cdk_opts + [i],  # 'diff <stack>'
+                                        self.path
+                                    ),
+                                    env=self.context.env_vars
+                                )
                     else:
                         if command == 'deploy':
                             if 'CI' in self.context.env_vars:
@@ -121,9 +357,8 @@ class CloudDevelopmentKit(RunwayModule):
                                 ['bootstrap'] + cdk_context_opts,
                                 self.path
                             )
-                            LOGGER.info('Running cdk bootstrap...')
-                            run_module_command(cmd_list=bootstrap_command,
-                                               env_vars=self.context.env_vars)
+                            self.run_cdk_bootstrap(bootstrap_command,
+                                                   assembly_dir)
                         elif command == 'destroy' and 'CI' in self.context.env_vars:  # noqa
                             cdk_opts.append('-f')  # Don't prompt
                         cdk_command = generate_node_command(
@@ -154,6 +389,36 @@ class CloudDevelopmentKit(RunwayModule):
             response['skipped_configs'] = True
         return response
 
+    def run_cdk_bootstrap(self, bootstrap_command, assembly_dir=None):
+        """Run cdk bootstrap, unless the environment is already bootstrapped.
+
+        Bootstrapping is only skipped when the toolkit stack version the app
+        requires is known, i.e. declared by its synthesized cloud assembly
+        (assembly_dir) or set via ``cdk_bootstrap_min_version``.
+        """
+        required_versions = [
+            i for i in [get_required_bootstrap_version(assembly_dir),
+                        self.options.get('options', {}).get(
+                            'cdk_bootstrap_min_version'
+                        )]
+            if i is not None
+        ]
+        environment = get_bootstrap_environment(self.context.env_vars)
+        if required_versions and cdk_bootstrap_is_current(
+                environment,
+                self.context.env_vars,
+                max(required_versions),
+                self.options.get('options', {}).get(
+                    'cdk_bootstrap_cache_ttl', 0
+                )):
+            LOGGER.info("Skipping cdk bootstrap; %s is already "
+                        "bootstrapped (version %d or later)", environment,
+                        max(required_versions))
+            return
+        LOGGER.info('Running cdk bootstrap...')
+        run_module_command(cmd_list=bootstrap_command,
+                           env_vars=self.context.env_vars)
+
     def plan(self):
         """Run cdk diff."""
         self.run_cdk(command='diff')
@@ -4,14 +4,22 @@ import logging
 import os
 import platform
 import re
+import subprocess
 import sys
+import threading
 
+from six.moves import queue
 import yaml
 
 from . import RunwayModule, run_module_command
+from .. import tracing
 from ..util import change_dir, get_embedded_lib_path
 
 LOGGER = logging.getLogger('runway')
+# Lookups of outputs of stacks (possibly) defined in other config files
+STACKER_XREF_REGEX = re.compile(
+    r'\$\{(xref|rxref)\s+((?:\$\{[^}]*\}|[^:}\s])+)::'
+)
 
 
 def ensure_stacker_compat_config(config_filename):
@@ -32,6 +40,54 @@ def ensure_stacker_compat_config(config_filename):
             sys.exit(1)
 
 
+def get_stacker_config_stack_names(config_filename):
+    """Return names of the stacks defined in a Stacker config file."""
+    with open(config_filename, 'r') as stream:
+        config = yaml.safe_load(stream) or {}
+    stacks = config.get('stacks') or []
+    if isinstance(stacks, dict):
+        stacks = [dict(value or {}, name=key) for key, value in stacks.items()]
+    names = set()
+    for stack in stacks:
+        names.update(i for i in [stack.get('name'), stack.get('stack_name')]
+                     if i)
+    return names
+
+
+def get_stacker_config_dependencies(config_names, explicit_dependencies=None):
+    """Return the config files each Stacker config file depends on.
+
+    Dependencies are those listed explicitly (a mapping of config file names
+    to lists of config file names), plus the config files defining stacks
+    referenced by xref/rxref lookups. As namespaces aren't known until Stacker
+    runs, a xref matches the stacks whose name ends its fully qualified
+    stack name.
+    """
+    explicit_dependencies = explicit_dependencies or {}
+    for name, dependencies in explicit_dependencies.items():
+        unknown = [i for i in [name] + list(dependencies)
+                   if i not in config_names]
+        if unknown:
+            LOGGER.error('stacker_config_dependencies lists unknown config '
+                         'files: %s', ', '.join(unknown))
+            sys.exit(1)
+    stack_names = dict((name, get_stacker_config_stack_names(name))
+                       for name in config_names)
+    dependencies = {}
+    for name in config_names:
+        dependencies[name] = set(explicit_dependencies.get(name, []))
+        with open(name, 'r') as stream:
+            lookups = STACKER_XREF_REGEX.findall(stream.read())
+        for lookup, stack in lookups:
+            for other_name, other_stacks in stack_names.items():
+                if other_name != name and any(
+                        stack == i or (lookup == 'xref' and
+                                       stack.endswith('-' + i))
+                        for i in other_stacks):
+                    dependencies[name].add(other_name)
+    return dependencies
+
+
 def gen_stacker_env_files(environment, region):
     """Generate possible Stacker environment filenames."""
     return [
@@ -88,6 +144,8 @@ class CloudFormation(RunwayModule):
                 stacker_cmd.append('--recreate-failed')
             else:
                 stacker_cmd.append('--interactive')
+                if self.options.get('options', {}).get('stacker_batch_review'):
+                    stacker_cmd.append('--batch-review')
 
         if 'DEBUG' in self.context.env_vars:
             stacker_cmd.append('--verbose')  # Increase logging if requested
@@ -121,8 +179,9 @@ class CloudFormation(RunwayModule):
             )
         else:
             with change_dir(self.path):
-                # Iterate through any stacker yaml configs to deploy them in order
-                # or destroy them in reverse order
+                # Deploy the stacker yaml configs in order or destroy them in
+                # reverse order
+                configs = []
                 for _root, _dirs, files in os.walk(self.path):
                     sorted_files = sorted(files)
                     if command == 'destroy':
@@ -137,27 +196,161 @@ class CloudFormation(RunwayModule):
                             ensure_stacker_compat_config(
                                 os.path.join(self.path, name)
                             )
-                            LOGGER.info("Running stacker %s on %s in region %s",
-                                        command,
-                                        name,
-                                        self.context.env_region)
-                            stacker_cmd_str = make_stacker_cmd_string(
-                                stacker_cmd + [name],
-                                get_embedded_lib_path()
-                            )
-                            stacker_cmd_list = [sys.executable, '-c']
-                            LOGGER.debug(
-                                "Stacker command being executed: %s \"%s\"",
-                                ' '.join(stacker_cmd_list),
-                                stacker_cmd_str
-                            )
-                            run_module_command(
-                                cmd_list=stacker_cmd_list + [stacker_cmd_str],
-                                env_vars=self.context.env_vars
-                            )
+                            configs.append(name)
                     break  # only need top level files
+                concurrency = self.options.get('options', {}).get(
+                    'stacker_parallel_configs', 1
+                )
+                if concurrency > 1 and len(configs) > 1 and (
+                        '--interactive' in stacker_cmd):
+                    LOGGER.info("Running stacker %s on each config file in "
+                                "turn, as interactive builds prompt for "
+                                "approval",
+                                command)
+                elif concurrency > 1 and len(configs) > 1:
+                    self.run_stacker_configs_concurrently(command,
+                                                          stacker_cmd,
+                                                          configs,
+                                                          concurrency)
+                    return response
+                for name in configs:
+                    LOGGER.info("Running stacker %s on %s in region %s",
+                                command,
+                                name,
+                                self.context.env_region)
+                    run_module_command(
+                        cmd_list=self.get_stacker_cmd_list(command,
+                                                           stacker_cmd,
+                                                           name),
+                        env_vars=self.context.env_vars
+                    )
         return response
 
+    def get_stacker_cmd_list(self, command, stacker_cmd, config_name):
+        """Return command list running Stacker on a config file."""
+        stacker_cmd_str = make_stacker_cmd_string(
+            stacker_cmd + self.get_journal_args(command, config_name) +
+            [config_name],
+            get_embedded_lib_path()
+        )
+        stacker_cmd_list = [sys.executable, '-c']
+        LOGGER.debug(
+            "Stacker command being executed: %s \"%s\"",
+            ' '.join(stacker_cmd_list),
+            stacker_cmd_str
+        )
+        return stacker_cmd_list + [stacker_cmd_str]
+
+    def run_stacker_configs_concurrently(self, command, stacker_cmd,  # noqa pylint: disable=too-many-locals,too-many-branches,too-many-statements
+                                         configs, concurrency):
+        """Run Stacker on independent config files concurrently.
+
+        Each config file is run once the config files it depends on have
+        completed (or, when destroying, once the config files depending on it
+        have completed). Stacker's output of each config file is buffered &
+        printed when it completes. No further config files are started once
+        one fails.
+        """
+        dependencies = get_stacker_config_dependencies(
+            configs,
+            self.options.get('options', {}).get('stacker_config_dependencies')
+        )
+        if command == 'destroy':
+            blockers = dict((name, set(i for i in configs
+                                       if name in dependencies[i]))
+                            for name in configs)
+        else:
+            blockers = dependencies
+        for name in configs:
+            if blockers[name]:
+                LOGGER.debug("Stacker %s on %s waits for %s",
+                             command, name, ', '.join(sorted(blockers[name])))
+        parent_span = tracing.get_current_span_id()
+        results = queue.Queue()
+
+        def run_config(name, cmd_list):
+            """Run Stacker on a config file, queueing its output."""
+            returncode = 1
+            output = b''
+            try:
+                with tracing.span(os.path.basename(cmd_list[0]),
+                                  'subprocess',
+                                  parent_id=parent_span,
+                                  command=cmd_list):
+                    process = subprocess.Popen(
+                        cmd_list,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        env=tracing.get_child_env_vars(self.context.env_vars)
+                    )
+                    output = process.communicate()[0]
+                    returncode = process.returncode
+            finally:
+                results.put((name, returncode, output))
+
+        def start(name):
+            """Start running Stacker on a config file."""
+            LOGGER.info("Running stacker %s on %s in region %s",
+                        command,
+                        name,
+                        self.context.env_region)
+            pending.remove(name)
+            running.add(name)
+            thread = threading.Thread(
+                target=run_config,
+                args=(name, self.get_stacker_cmd_list(command, stacker_cmd,
+                                                      name))
+            )
+            thread.daemon = True
+            thread.start()
+
+        pending = list(configs)
+        running = set()
+        completed = set()
+        returncode = 0
+        while running or (pending and not returncode):
+            if not returncode:
+                for name in [i for i in pending if blockers[i] <= completed]:
+                    if len(running) >= concurrency:
+                        break
+                    start(name)
+                if pending and not running:
+                    LOGGER.warning("Circular dependencies between stacker "
+                                   "config files %s; running %s first",
+                                   ', '.join(pending), pending[0])
+                    start(pending[0])
+            name, process_returncode, output = results.get()
+            running.remove(name)
+            if process_returncode:
+                LOGGER.error("Stacker %s on %s failed:", command, name)
+                returncode = returncode or process_returncode
+            else:
+                LOGGER.info("Stacker %s on %s completed:", command, name)
+                completed.add(name)
+            if isinstance(output, bytes):
+                output = output.decode('utf-8', 'replace')
+            print(output.rstrip('\n'))
+            sys.stdout.flush()
+        if returncode:
+            if pending:
+                LOGGER.error("Skipped stacker %s on %s",
+                             command, ', '.join(pending))
+            sys.exit(returncode)
+
+    def get_journal_args(self, command, config_name):
+        """Return stacker args resuming a config's last failed build."""
+        if command != 'build' or not self.options.get('options', {}).get(
+                'stacker_resume', True):
+            return []
+        return ['--resume',
+                '--journal=%s' % os.path.join(
+                    '.runway_cache',
+                    'stacker-journal',
+                    "%s-%s-%s.json" % (os.path.splitext(config_name)[0],
+                                       self.context.env_name,
+                                       self.context.env_region)
+                )]
+
     def plan(self):
         """Run stacker diff."""
         self.run_stacker(command='diff')
@@ -1,19 +1,36 @@
 """Serverless module."""
 from __future__ import print_function
 
+import hashlib
+import json
 import logging
 import os
 import re
+import shutil
 import subprocess
 import sys
+import tempfile
 
 from . import (
     RunwayModule, format_npm_command_for_logging, generate_node_command,
     run_module_command, run_npm_install
 )
-from ..util import change_dir, which
+from ..fingerprint import DEFAULT_EXCLUSIONS
+from ..hooks.staticsite.util import get_hash_of_files
+from ..util import RUNWAY_CACHE_DIR, change_dir, which
 
 LOGGER = logging.getLogger('runway')
+SLS_SERVICE_FILES = ['serverless.yml', 'serverless.yaml', 'serverless.json']
+# Variable sources/settings that are resolved into the package per region
+# (or looked up in the account, e.g. SSM parameters & stack outputs, whose
+# values could also change between deployments)
+SLS_REGION_DEPENDENT_REGEX = re.compile(
+    r'\$\{\s*(opt:region|opt:r\b|self:provider\.region|aws:|'
+    r'(ssm|cf|s3)[:.(])|'
+    r'^\s*deploymentBucket\s*:',
+    re.MULTILINE
+)
+SLS_ENV_VAR_REGEX = re.compile(r'\$\{env:([A-Za-z0-9_]+)')
 
 
 def gen_sls_config_files(stage, region):
@@ -43,6 +60,65 @@ def get_sls_config_file(path, stage, region):
     return "config-%s.json" % stage  # fallback to generic json name
 
 
+def get_sls_package_inputs(path, sls_env_file):
+    """Return contents of the service & stage config files.
+
+    Returns None if the service is defined in a format that can't be
+    inspected (e.g. serverless.js).
+    """
+    for name in SLS_SERVICE_FILES:
+        if os.path.isfile(os.path.join(path, name)):
+            service_file = name
+            break
+    else:
+        return None
+    contents = []
+    for i in [service_file, sls_env_file]:
+        if os.path.isfile(os.path.join(path, i)):
+            with open(os.path.join(path, i), 'r') as stream:
+                contents.append(stream.read())
+    return '\n'.join(contents)
+
+
+def sls_package_is_region_independent(path, stage, region):
+    """Return true if a package built for one region can deploy to others.
+
+    This is determined conservatively: the stage config file must not be
+    region-specific and the service/config files must not reference the
+    region, a (regional) deployment bucket, or values looked up in AWS
+    (``${ssm:...}``, ``${cf:...}``, ``${s3:...}`` & ``${aws:...}``).
+    """
+    sls_env_file = get_sls_config_file(path, stage, region)
+    if region in os.path.basename(sls_env_file):
+        return False
+    inputs = get_sls_package_inputs(path, sls_env_file)
+    if inputs is None:
+        return False
+    return not SLS_REGION_DEPENDENT_REGEX.search(inputs)
+
+
+def get_sls_package_hash(path, stage, region, env_vars):
+    """Return hash of the module source & env vars used to package it."""
+    inputs = get_sls_package_inputs(
+        path,
+        get_sls_config_file(path, stage, region)
+    ) or ''
+    package_hash = hashlib.sha256()
+    package_hash.update(json.dumps(
+        {'files': get_hash_of_files(
+            root_path=path,
+            directories=[{'path': './', 'exclusions': DEFAULT_EXCLUSIONS}],
+            hash_format='per_file'
+        ),
+         'env_vars': dict((i, env_vars.get(i)) for i in sorted(
+             set(SLS_ENV_VAR_REGEX.findall(inputs))
+         )),
+         'stage': stage},
+        sort_keys=True
+    ).encode())
+    return package_hash.hexdigest()[:16]
+
+
 def run_sls_remove(sls_cmd, env_vars):
     """Run sls remove command."""
     sls_process = subprocess.Popen(sls_cmd,
@@ -84,12 +160,17 @@ class Serverless(RunwayModule):
         sls_cmd = generate_node_command(command='sls',
                                         command_opts=sls_opts,
                                         path=self.path)
+        reuse_package = command == 'deploy' and self.options.get(
+            'options', {}
+        ).get('serverless_reuse_package', False)
 
         if (not self.options.get('environments') and os.path.isfile(os.path.join(self.path, sls_env_file))) or (  # noqa pylint: disable=line-too-long
                 self.options.get('environments', {}).get(self.context.env_name)):  # noqa
             if os.path.isfile(os.path.join(self.path, 'package.json')):
                 with change_dir(self.path):
                     run_npm_install(self.path, self.options, self.context)
+                    if reuse_package:
+                        sls_cmd = self.get_package_deploy_command(sls_opts)
                     LOGGER.info("Running sls %s on %s (\"%s\")",
                                 command,
                                 os.path.basename(self.path),
@@ -119,6 +200,68 @@ class Serverless(RunwayModule):
                                                self.context.env_region)))
         return response
 
+    def get_package_deploy_command(self, sls_opts):
+        """Return sls deploy command using a (cached) package of the service.
+
+        The service is packaged once per stage & source hash into
+        .runway_cache/serverless, and the package deployed to each region.
+        Falls back to a regular deploy when the package could differ
+        between regions.
+        """
+        if not sls_package_is_region_independent(
+                self.path, self.context.env_name, self.context.env_region):
+            LOGGER.info("Not reusing serverless package of %s; its config "
+                        "is region-dependent (or not inspectable)",
+                        os.path.basename(self.path))
+            return generate_node_command(command='sls',
+                                         command_opts=sls_opts,
+                                         path=self.path)
+        cache_dir = os.path.join(self.path, RUNWAY_CACHE_DIR, 'serverless')
+        package_hash = get_sls_package_hash(self.path,
+                                            self.context.env_name,
+                                            self.context.env_region,
+                                            self.context.env_vars)
+        package_dir = os.path.join(cache_dir, "%s-%s" % (
+            self.context.env_name, package_hash
+        ))
+        if os.path.isfile(os.path.join(package_dir,
+                                       'serverless-state.json')):
+            LOGGER.info("Reusing serverless package of %s (%s)",
+                        os.path.basename(self.path),
+                        package_hash)
+        else:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            tmp_dir = tempfile.mkdtemp(dir=cache_dir)
+            package_cmd = generate_node_command(
+                command='sls',
+                command_opts=['package'] + [
+                    i for i in sls_opts[1:] if i != '--conceal'
+                ] + ['--package', tmp_dir],
+                path=self.path
+            )
+            LOGGER.info("Running sls package on %s (\"%s\")",
+                        os.path.basename(self.path),
+                        format_npm_command_for_logging(package_cmd))
+            try:
+                run_module_command(cmd_list=package_cmd,
+                                   env_vars=self.context.env_vars)
+            except SystemExit:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+            # Only the latest package of each stage is retained
+            for i in os.listdir(cache_dir):
+                if re.match(r'^%s-[0-9a-f]{16}$' % re.escape(
+                        self.context.env_name), i):
+                    shutil.rmtree(os.path.join(cache_dir, i),
+                                  ignore_errors=True)
+            os.rename(tmp_dir, package_dir)
+        return generate_node_command(
+            command='sls',
+            command_opts=sls_opts + ['--package', package_dir],
+            path=self.path
+        )
+
     def plan(self):
         """Skip sls planning."""
         LOGGER.info('Planning not currently supported for Serverless')
@@ -118,7 +118,8 @@ class StaticSite(RunwayModule):
                       'args': {
                           'bucket_output_lookup': '%s::BucketName' % name,
                           'distributionid_output_lookup': '%s::CFDistributionId' % name,  # noqa
-                          'distributiondomain_output_lookup': '%s::CFDistributionDomainName' % name}}  # noqa pylint: disable=line-too-long
+                          'distributiondomain_output_lookup': '%s::CFDistributionDomainName' % name,  # noqa pylint: disable=line-too-long
+                          'cf_invalidation': self.options.get('options', {}).get('cf_invalidation', {})}}  # noqa pylint: disable=line-too-long
                  ],
                  'pre_destroy': [
                      {'path': 'runway.hooks.cleanup_s3.purge_bucket',
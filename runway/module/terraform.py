@@ -1,20 +1,44 @@
 """Terraform module."""
 
+import hashlib
+import json
 import logging
 import os
 import platform
 import re
 import subprocess
 import sys
+import time
 
 from future.utils import viewitems
 import hcl
 from send2trash import send2trash
 
 from . import RunwayModule, run_module_command
-from ..util import change_dir, which
+from .. import tracing
+from ..fingerprint import DEFAULT_EXCLUSIONS
+from ..hooks.staticsite.util import get_hash_of_files
+from ..identity import get_account_id
+from ..util import (
+    RUNWAY_CACHE_DIR, change_dir, file_lock, get_user_cache_dir, which_cached
+)
 
 LOGGER = logging.getLogger('runway')
+PLUGIN_CACHE_LOCK_FILENAME = '.runway.lock'
+PLUGIN_FILENAME_PREFIX = 'terraform-provider-'
+# Data directory subdirectories providers are installed in (Terraform 0.13+
+# uses providers/<source>/<version>/<os_arch>, earlier versions plugins/)
+PLUGIN_INSTALL_DIRS = ['plugins', 'providers']
+INIT_STATE_FILENAME = 'runway-init-state.json'
+SAVED_PLAN_MAX_AGE = 3600
+# Module block headers & their source/version arguments
+MODULE_SOURCE_REGEX = re.compile(
+    r'^\s*(module\s*"|module\s+\w|(source|version)\s*=)'
+)
+# Totals for all inits in this runway process
+PLUGIN_CACHE_STATS = {'hits': 0, 'misses': 0}
+# (tfenv root, .terraform-version contents) installed by this runway process
+TFENV_INSTALLED_VERSIONS = set()
 
 
 def get_backend_init_list(backend_vals):
@@ -63,7 +87,7 @@ def get_workspace_tfvars_file(path, environment, region):
     return "%s.tfvars" % environment  # fallback to generic name
 
 
-def remove_stale_tf_config(path, backend_options):
+def remove_stale_tf_config(path, backend_options, data_dir=None):
     """Ensure TF is ready for init.
 
     If deploying a TF module to multiple regions (or any scenario requiring
@@ -75,7 +99,7 @@ def remove_stale_tf_config(path, backend_options):
     This method compares the defined & initialized backend configs and
     trashes the terraform directory if they're out of sync.
     """
-    terrform_dir = os.path.join(path, '.terraform')
+    terrform_dir = data_dir or os.path.join(path, '.terraform')
     tfstate_filepath = os.path.join(terrform_dir, 'terraform.tfstate')
     if os.path.isfile(tfstate_filepath):
         LOGGER.debug('Comparing previous & desired Terraform backend '
@@ -101,8 +125,8 @@ def remove_stale_tf_config(path, backend_options):
                 send2trash(terrform_dir)
 
 
-def prep_workspace_switch(module_path, backend_options, env_name, env_region,
-                          env_vars):
+def prep_workspace_switch(module_path, backend_options, env_name, env_region,  # noqa pylint: disable=too-many-arguments
+                          env_vars, data_dir=None):
     """Clean terraform directory and run init if necessary.
 
     Creating a new workspace after a previous workspace has been created with
@@ -113,7 +137,7 @@ def prep_workspace_switch(module_path, backend_options, env_name, env_region,
 
     This function will check for a custom key and re-init.
     """
-    terrform_dir = os.path.join(module_path, '.terraform')
+    terrform_dir = data_dir or os.path.join(module_path, '.terraform')
     backend_filepath = os.path.join(module_path, backend_options.get('filename'))
     if os.path.isdir(terrform_dir) and (
             backend_options.get('config') or os.path.isfile(backend_filepath)):
@@ -135,18 +159,103 @@ def prep_workspace_switch(module_path, backend_options, env_name, env_region,
                 backend_options=backend_options,
                 env_name=env_name,
                 env_region=env_region,
-                env_vars=env_vars
+                env_vars=env_vars,
+                data_dir=data_dir
             )
 
 
-def run_terraform_init(module_path, backend_options, env_name, env_region,
-                       env_vars):
-    """Run Terraform init."""
+def get_plugin_cache_dir(option, env_root):
+    """Return shared Terraform plugin cache directory (or None if disabled).
+
+    Args:
+        option (Union[str, bool]): ``user`` for the per-user runway cache
+            directory, ``env_root`` for the environment's .runway_cache
+            directory, a path (relative to the env root), or false to
+            disable the cache.
+        env_root (str): Runway environment root directory.
+
+    """
+    if not option:
+        return None
+    if option == 'user':
+        return os.path.join(get_user_cache_dir(), 'terraform-plugins')
+    if option == 'env_root':
+        return os.path.join(env_root, RUNWAY_CACHE_DIR, 'terraform-plugins')
+    return os.path.join(env_root, os.path.expanduser(option))
+
+
+def list_plugin_files(path):
+    """Return set of provider plugin paths (relative to path) in a directory.
+
+    Only provider executables are included (not e.g. lock files, or the
+    license files of provider packages). Symlinked directories are followed,
+    as Terraform 0.13+ links providers from the plugin cache.
+    """
+    plugin_files = set()
+    for root, _dirs, files in os.walk(path, followlinks=True):
+        for name in files:
+            if name.startswith(PLUGIN_FILENAME_PREFIX):
+                plugin_files.add(os.path.relpath(os.path.join(root, name),
+                                                 path))
+    return plugin_files
+
+
+def list_installed_plugins(data_dir):
+    """Return file names of the providers installed in a data directory."""
+    return set(os.path.basename(i)
+               for subdir in PLUGIN_INSTALL_DIRS
+               for i in list_plugin_files(os.path.join(data_dir, subdir)))
+
+
+def run_terraform_init(module_path, backend_options, env_name, env_region,  # noqa pylint: disable=too-many-arguments
+                       env_vars, data_dir=None):
+    """Run Terraform init.
+
+    If a shared plugin cache (TF_PLUGIN_CACHE_DIR) is in use, init holds a
+    lock on it (Terraform doesn't support concurrent cache writes) and its
+    cache hits/misses are logged.
+    """
+    if data_dir is None:
+        data_dir = os.path.join(module_path, '.terraform')
+    plugin_cache_dir = env_vars.get('TF_PLUGIN_CACHE_DIR')
+    if plugin_cache_dir:
+        if not os.path.isdir(plugin_cache_dir):
+            os.makedirs(plugin_cache_dir)
+        with file_lock(os.path.join(plugin_cache_dir,
+                                    PLUGIN_CACHE_LOCK_FILENAME)):
+            cached_plugins = list_plugin_files(plugin_cache_dir)
+            _run_terraform_init(module_path, backend_options, env_name,
+                                env_region, env_vars, data_dir)
+            misses = len(list_plugin_files(plugin_cache_dir) - cached_plugins)
+        hits = len(list_installed_plugins(data_dir) & set(
+            os.path.basename(i) for i in cached_plugins
+        ))
+        PLUGIN_CACHE_STATS['hits'] += hits
+        PLUGIN_CACHE_STATS['misses'] += misses
+        LOGGER.info("Terraform plugin cache: %d hit(s), %d miss(es) "
+                    "(%d hit(s), %d miss(es) this run)",
+                    hits,
+                    misses,
+                    PLUGIN_CACHE_STATS['hits'],
+                    PLUGIN_CACHE_STATS['misses'])
+    else:
+        _run_terraform_init(module_path, backend_options, env_name,
+                            env_region, env_vars, data_dir)
+    # init also fetches modules, so this records both being current
+    save_init_state(data_dir, {
+        'backend': get_backend_fingerprint(module_path, backend_options),
+        'modules': get_module_sources_fingerprint(module_path)
+    })
+
+
+def _run_terraform_init(module_path, backend_options, env_name, env_region,  # noqa pylint: disable=too-many-arguments
+                        env_vars, data_dir=None):
+    """Run Terraform init command."""
     init_cmd = ['terraform', 'init']
     if backend_options.get('config'):
         LOGGER.info('Using provided backend values "%s"',
                     str(backend_options.get('config')))
-        remove_stale_tf_config(module_path, backend_options)
+        remove_stale_tf_config(module_path, backend_options, data_dir)
         run_module_command(
             cmd_list=init_cmd + get_backend_init_list(backend_options.get('config')),  # noqa
             env_vars=env_vars
@@ -154,7 +263,7 @@ def run_terraform_init(module_path, backend_options, env_name, env_region,
     elif os.path.isfile(os.path.join(module_path, backend_options.get('filename'))):  # noqa
         LOGGER.info('Using backend config file %s',
                     backend_options.get('filename'))
-        remove_stale_tf_config(module_path, backend_options)
+        remove_stale_tf_config(module_path, backend_options, data_dir)
         run_module_command(
             cmd_list=init_cmd + ['-backend-config=%s' % backend_options.get('filename')],  # noqa
             env_vars=env_vars
@@ -171,9 +280,249 @@ def run_terraform_init(module_path, backend_options, env_name, env_region,
                            env_vars=env_vars)
 
 
+def get_backend_fingerprint(module_path, backend_options):
+    """Return short hash identifying the module's backend configuration."""
+    backend_hash = hashlib.sha256()
+    if backend_options.get('config'):
+        backend_hash.update(json.dumps(backend_options['config'],
+                                       sort_keys=True).encode())
+    elif os.path.isfile(os.path.join(module_path,
+                                     backend_options.get('filename'))):
+        with open(os.path.join(module_path,
+                               backend_options.get('filename')),
+                  'rb') as stream:
+            backend_hash.update(stream.read())
+    return backend_hash.hexdigest()[:12]
+
+
+def get_module_sources_fingerprint(module_path):
+    """Return hash of the module blocks' names, sources & versions.
+
+    When these are unchanged since the last init/get, the modules in the
+    data directory are current and ``terraform get`` can be skipped. Module
+    names are included as Terraform installs modules per name (so renamed
+    or copied blocks need a ``terraform get`` even with the same source).
+    """
+    source_hash = hashlib.sha256()
+    for root, dirs, files in os.walk(module_path):
+        dirs[:] = sorted(i for i in dirs
+                         if not i.startswith('.') and i != 'node_modules')
+        for name in sorted(files):
+            if name.endswith('.tf'):
+                with open(os.path.join(root, name), 'r') as stream:
+                    for line in stream:
+                        if MODULE_SOURCE_REGEX.match(line):
+                            source_hash.update((
+                                os.path.relpath(os.path.join(root, name),
+                                                module_path) +
+                                "\0" + line.strip() + "\0"
+                            ).encode())
+    return source_hash.hexdigest()
+
+
+def load_init_state(data_dir):
+    """Return fingerprints recorded at the data directory's last init/get."""
+    state_file = os.path.join(data_dir, INIT_STATE_FILENAME)
+    if os.path.isfile(state_file):
+        try:
+            with open(state_file, 'r') as stream:
+                return json.load(stream)
+        except ValueError:
+            pass
+    return {}
+
+
+def save_init_state(data_dir, state):
+    """Record fingerprints after a successful init/get."""
+    if os.path.isdir(data_dir):
+        with open(os.path.join(data_dir, INIT_STATE_FILENAME), 'w') as stream:
+            json.dump(state, stream)
+
+
+def get_current_workspace(data_dir, env_vars):
+    """Return current Terraform workspace (like ``terraform workspace show``).
+
+    Reading the workspace from the data directory directly avoids starting
+    terraform just to print it.
+    """
+    if env_vars.get('TF_WORKSPACE'):
+        return env_vars['TF_WORKSPACE']
+    environment_file = os.path.join(data_dir, 'environment')
+    if os.path.isfile(environment_file):
+        with open(environment_file, 'r') as stream:
+            return stream.read().strip() or 'default'
+    return 'default'
+
+
+def get_tf_data_dir(module_path, env_name, env_region, backend_options):
+    """Return Terraform data directory for an environment & region.
+
+    Each environment/region/backend config combination gets its own data
+    directory (via TF_DATA_DIR), so switching between them reuses the
+    previously initialized directory instead of starting from scratch.
+    Directories for superseded backend configs are trashed.
+    """
+    data_dirs_root = os.path.join(module_path, RUNWAY_CACHE_DIR, 'terraform')
+    prefix = "%s-%s-" % (env_name, env_region)
+    data_dir_name = prefix + get_backend_fingerprint(module_path,
+                                                     backend_options)
+    if os.path.isdir(data_dirs_root):
+        for name in os.listdir(data_dirs_root):
+            if name != data_dir_name and re.match(
+                    "^%s[0-9a-f]{12}$" % re.escape(prefix), name):
+                LOGGER.info("Trashing Terraform data directory %s for "
+                            "previous backend config",
+                            name)
+                send2trash(os.path.join(data_dirs_root, name))
+    return os.path.join(data_dirs_root, data_dir_name)
+
+
+def get_saved_plan_options(option, module_path, context):
+    """Return saved plan file settings (or None if saved plans are disabled).
+
+    Args:
+        option (Union[bool, dict]): ``terraform_saved_plans`` module option;
+            true, or a dict with optional ``directory`` (relative to the env
+            root) and ``max_age`` (seconds) keys.
+        module_path (str): module directory.
+        context (runway.context.Context): runway context.
+
+    """
+    if not option:
+        return None
+    if not isinstance(option, dict):
+        option = {}
+    if option.get('directory'):
+        directory = os.path.join(context.env_root, option['directory'])
+    else:
+        directory = os.path.join(module_path, RUNWAY_CACHE_DIR,
+                                 'terraform-plans')
+    # Named by the module's path in the env root, so modules with the same
+    # name in a shared directory don't overwrite each other's plans
+    module_name = os.path.relpath(module_path, context.env_root)
+    if module_name == os.curdir or module_name.startswith(os.pardir):
+        module_name = os.path.basename(os.path.abspath(module_path))
+    plan_file = os.path.join(directory, "%s-%s-%s.tfplan" % (
+        module_name.replace(os.sep, '_'),
+        context.env_name,
+        context.env_region
+    ))
+    return {'directory': directory,
+            'plan_file': plan_file,
+            'metadata_file': plan_file + '.json',
+            'max_age': option.get('max_age', SAVED_PLAN_MAX_AGE)}
+
+
+def get_plan_fingerprint(module_path, tf_var_args, backend_fingerprint,
+                         saved_plan, env_vars):
+    """Return hash of the inputs a saved plan was created from.
+
+    Besides the module's files & variables, this covers the ``TF_VAR_*``
+    environment variables and the account of the credentials in env_vars.
+    """
+    exclusions = list(DEFAULT_EXCLUSIONS)
+    plan_dir = os.path.relpath(saved_plan['directory'], module_path)
+    if not plan_dir.startswith('..'):
+        exclusions.append(plan_dir.replace(os.sep, '/') + '/')
+    fingerprint = hashlib.sha256()
+    fingerprint.update(json.dumps(
+        {'files': get_hash_of_files(module_path,
+                                    [{'path': './',
+                                      'exclusions': exclusions}],
+                                    hash_format='per_file'),
+         'args': tf_var_args,
+         'env_vars': dict((key, val) for key, val in viewitems(env_vars)
+                          if key.startswith('TF_VAR_')),
+         'account_id': get_account_id(env_vars),
+         'backend': backend_fingerprint},
+        sort_keys=True
+    ).encode())
+    return fingerprint.hexdigest()
+
+
+def remove_saved_plan(saved_plan):
+    """Delete saved plan & its metadata."""
+    for i in [saved_plan['plan_file'], saved_plan['metadata_file']]:
+        if os.path.isfile(i):
+            os.remove(i)
+
+
+def run_saved_plan_command(command, tf_cmd, saved_plan, env_vars):
+    """Run terraform plan to a saved plan file, or apply a saved plan.
+
+    Plans record whether they contain changes (via ``-detailed-exitcode``)
+    and a fingerprint of the module & its variables. Applies use the saved
+    plan if it matches the current fingerprint and is younger than
+    ``max_age`` seconds, skipping the apply entirely if the plan had no
+    changes; otherwise a regular apply is run.
+    """
+    if command == 'plan':
+        remove_saved_plan(saved_plan)
+        if not os.path.isdir(saved_plan['directory']):
+            os.makedirs(saved_plan['directory'])
+        plan_cmd = tf_cmd + ['-detailed-exitcode',
+                             '-out=%s' % saved_plan['plan_file']]
+        LOGGER.info("Running Terraform plan (\"%s\")", " ".join(plan_cmd))
+        with tracing.span('terraform plan', 'subprocess'):
+            exit_code = subprocess.call(
+                plan_cmd, env=tracing.get_child_env_vars(env_vars)
+            )
+        if exit_code not in [0, 2]:
+            sys.exit(exit_code)
+        with open(saved_plan['metadata_file'], 'w') as stream:
+            json.dump({'fingerprint': saved_plan['fingerprint'],
+                       'created': time.time(),
+                       'changes': exit_code == 2}, stream)
+        LOGGER.info("Saved Terraform plan (%s) to %s",
+                    'changes pending' if exit_code == 2 else 'no changes',
+                    saved_plan['plan_file'])
+        return
+
+    metadata = {}
+    if os.path.isfile(saved_plan['metadata_file']) and (
+            os.path.isfile(saved_plan['plan_file'])):
+        with open(saved_plan['metadata_file'], 'r') as stream:
+            metadata = json.load(stream)
+    try:
+        if metadata.get('fingerprint') == saved_plan['fingerprint'] and (
+                time.time() - metadata['created'] <= saved_plan['max_age']):
+            if not metadata['changes']:
+                LOGGER.info('Skipping Terraform apply; the saved plan '
+                            'reported no changes')
+                return
+            apply_cmd = ['terraform', 'apply', saved_plan['plan_file']]
+            LOGGER.info("Applying saved Terraform plan (\"%s\")",
+                        " ".join(apply_cmd))
+            run_module_command(cmd_list=apply_cmd, env_vars=env_vars)
+            return
+        if metadata:
+            LOGGER.info("Saved Terraform plan %s is out of date; running a "
+                        "full apply instead",
+                        saved_plan['plan_file'])
+        LOGGER.info("Running Terraform apply (\"%s\")", " ".join(tf_cmd))
+        run_module_command(cmd_list=tf_cmd, env_vars=env_vars)
+    finally:
+        # Plans are consumed by the apply (or stale after it)
+        remove_saved_plan(saved_plan)
+
+
+def get_tfenv_root(tfenv_path, env_vars):
+    """Return tfenv's installation directory."""
+    if env_vars.get('TFENV_ROOT'):
+        return env_vars['TFENV_ROOT']
+    # tfenv is installed as <root>/bin/tfenv (usually symlinked into PATH)
+    return os.path.dirname(os.path.dirname(os.path.realpath(tfenv_path)))
+
+
 def run_tfenv_install(path, env_vars):
-    """Ensure appropriate Terraform version is installed."""
-    if which('tfenv') is None:
+    """Ensure appropriate Terraform version is installed.
+
+    Exact versions already installed by tfenv are detected directly, and
+    other version specs (e.g. ``latest:^0.11``) are only installed once per
+    runway process, so tfenv is only invoked when necessary.
+    """
+    tfenv_path = which_cached('tfenv')
+    if tfenv_path is None:
         if platform.system().lower() == 'windows':
             LOGGER.warning('A required Terraform version for this module is '
                            'specified in a .terraform-version file for use '
@@ -185,20 +534,31 @@ def run_tfenv_install(path, env_vars):
                      'in this module\'s .terraform-version file). Please '
                      'install tfenv.')
         sys.exit(1)
-    with change_dir(path):
-        subprocess.check_call(['tfenv', 'install'], env=env_vars)
+    with open(os.path.join(path, '.terraform-version'), 'r') as stream:
+        version = stream.read().strip()
+    tfenv_root = get_tfenv_root(tfenv_path, env_vars)
+    if (tfenv_root, version) in TFENV_INSTALLED_VERSIONS:
         return True
+    if re.match(r'^[0-9]+\.[0-9]+\.[0-9]+', version) and os.path.isfile(
+            os.path.join(tfenv_root, 'versions', version, 'terraform')):
+        LOGGER.debug('Terraform %s is already installed; skipping tfenv '
+                     'install', version)
+    else:
+        with change_dir(path), tracing.span('tfenv install', 'subprocess'):
+            subprocess.check_call(['tfenv', 'install'], env=env_vars)
+    TFENV_INSTALLED_VERSIONS.add((tfenv_root, version))
+    return True
 
 
 class Terraform(RunwayModule):
     """Terraform Runway Module."""
 
-    def run_terraform(self, command='plan'):  # noqa pylint: disable=too-many-branches,too-many-statements
+    def run_terraform(self, command='plan'):  # noqa pylint: disable=too-many-branches,too-many-statements,too-many-locals
         """Run Terraform."""
         response = {'skipped_configs': False}
         tf_cmd = ['terraform', command]
 
-        if not which('terraform'):
+        if not which_cached('terraform'):
             LOGGER.error('"terraform" not found in path or is not executable; '
                          'please ensure it is installed correctly.')
             sys.exit(1)
@@ -226,41 +586,67 @@ class Terraform(RunwayModule):
         workspace_tfvar_present = os.path.isfile(
             os.path.join(self.path, workspace_tfvars_file)
         )
+        tf_var_args = []
         if workspace_tfvar_present:
-            tf_cmd.append("-var-file=%s" % workspace_tfvars_file)
+            tf_var_args.append("-var-file=%s" % workspace_tfvars_file)
         if isinstance(self.options.get('environments',
                                        {}).get(self.context.env_name),
                       dict):
             for (key, val) in self.options['environments'][self.context.env_name].items():  # noqa
-                tf_cmd.extend(['-var', "%s=%s" % (key, val)])
+                tf_var_args.extend(['-var', "%s=%s" % (key, val)])
+        tf_cmd.extend(tf_var_args)
 
         if self.options.get('environments', {}).get(self.context.env_name) or (
                 workspace_tfvar_present):
             LOGGER.info("Preparing to run terraform %s on %s...",
                         command,
                         os.path.basename(self.path))
+            env_vars = self.context.env_vars.copy()
+            if 'TF_DATA_DIR' in env_vars:
+                data_dir = os.path.join(self.path, env_vars['TF_DATA_DIR'])
+                isolated_data_dir = False
+            elif self.options.get('options', {}).get(
+                    'terraform_isolated_data_dirs', True):
+                data_dir = get_tf_data_dir(self.path,
+                                           self.context.env_name,
+                                           self.context.env_region,
+                                           backend_options)
+                env_vars['TF_DATA_DIR'] = data_dir
+                isolated_data_dir = True
+            else:
+                data_dir = os.path.join(self.path, '.terraform')
+                isolated_data_dir = False
+            if 'TF_PLUGIN_CACHE_DIR' not in env_vars:
+                plugin_cache_dir = get_plugin_cache_dir(
+                    self.options.get('options', {}).get(
+                        'terraform_plugin_cache_dir', 'user'
+                    ),
+                    self.context.env_root
+                )
+                if plugin_cache_dir:
+                    env_vars['TF_PLUGIN_CACHE_DIR'] = plugin_cache_dir
             if os.path.isfile(os.path.join(self.path,
                                            '.terraform-version')):
-                run_tfenv_install(self.path, self.context.env_vars)
+                run_tfenv_install(self.path, env_vars)
+            module_sources_fingerprint = get_module_sources_fingerprint(
+                self.path
+            )
             with change_dir(self.path):
-                if not os.path.isdir(os.path.join(self.path,
-                                                  '.terraform')):
-                    LOGGER.info('.terraform directory missing; running '
-                                '"terraform init"...')
+                if not os.path.isdir(data_dir):
+                    LOGGER.info('Terraform data directory %s missing; '
+                                'running "terraform init"...',
+                                os.path.relpath(data_dir, self.path))
                     run_terraform_init(
                         module_path=self.path,
                         backend_options=backend_options,
                         env_name=self.context.env_name,
                         env_region=self.context.env_region,
-                        env_vars=self.context.env_vars
+                        env_vars=env_vars,
+                        data_dir=data_dir
                     )
                 LOGGER.debug('Checking current Terraform workspace...')
-                current_tf_workspace = subprocess.check_output(
-                    ['terraform',
-                     'workspace',
-                     'show'],
-                    env=self.context.env_vars
-                ).strip().decode()
+                current_tf_workspace = get_current_workspace(data_dir,
+                                                             env_vars)
                 if current_tf_workspace != self.context.env_name:
                     LOGGER.info("Terraform workspace currently set to %s; "
                                 "switching to %s...",
@@ -268,23 +654,27 @@ class Terraform(RunwayModule):
                                 self.context.env_name)
                     LOGGER.debug('Checking available Terraform '
                                  'workspaces...')
-                    prep_workspace_switch(
-                        module_path=self.path,
-                        backend_options=backend_options,
-                        env_name=self.context.env_name,
-                        env_region=self.context.env_region,
-                        env_vars=self.context.env_vars
-                    )
+                    if not isolated_data_dir:
+                        # Isolated data dirs are only ever initialized with
+                        # their current backend config (including its key)
+                        prep_workspace_switch(
+                            module_path=self.path,
+                            backend_options=backend_options,
+                            env_name=self.context.env_name,
+                            env_region=self.context.env_region,
+                            env_vars=env_vars,
+                            data_dir=data_dir
+                        )
                     available_tf_envs = subprocess.check_output(
                         ['terraform', 'workspace', 'list'],
-                        env=self.context.env_vars
+                        env=env_vars
                     ).decode()
                     if re.compile("^[*\\s]\\s%s$" % self.context.env_name,
                                   re.M).search(available_tf_envs):
                         run_module_command(
                             cmd_list=['terraform', 'workspace', 'select',
                                       self.context.env_name],
-                            env_vars=self.context.env_vars
+                            env_vars=env_vars
                         )
                     else:
                         LOGGER.info("Terraform workspace %s not found; "
@@ -293,33 +683,72 @@ class Terraform(RunwayModule):
                         run_module_command(
                             cmd_list=['terraform', 'workspace', 'new',
                                       self.context.env_name],
-                            env_vars=self.context.env_vars
+                            env_vars=env_vars
                         )
-                    LOGGER.info('Running "terraform init" after workspace '
-                                'creation/switch...')
-                    run_terraform_init(
-                        module_path=self.path,
-                        backend_options=backend_options,
-                        env_name=self.context.env_name,
-                        env_region=self.context.env_region,
-                        env_vars=self.context.env_vars
-                    )
-                if 'SKIP_TF_GET' not in self.context.env_vars:
+                    if isolated_data_dir and load_init_state(data_dir) == {
+                            'backend': get_backend_fingerprint(
+                                self.path,
+                                backend_options
+                            ),
+                            'modules': module_sources_fingerprint}:
+                        LOGGER.info('Skipping "terraform init" after '
+                                    'workspace creation/switch; data '
+                                    'directory is already initialized')
+                    else:
+                        LOGGER.info('Running "terraform init" after '
+                                    'workspace creation/switch...')
+                        run_terraform_init(
+                            module_path=self.path,
+                            backend_options=backend_options,
+                            env_name=self.context.env_name,
+                            env_region=self.context.env_region,
+                            env_vars=env_vars,
+                            data_dir=data_dir
+                        )
+                init_state = load_init_state(data_dir)
+                if 'SKIP_TF_GET' in env_vars:
+                    LOGGER.info('Skipping "terraform get" due to '
+                                '"SKIP_TF_GET" environment variable...')
+                elif init_state.get('modules') == module_sources_fingerprint and (
+                        not self.options.get('options', {}).get(
+                            'terraform_always_get')):
+                    LOGGER.info('Skipping "terraform get"; module sources are '
+                                'unchanged since the last init/get')
+                else:
                     LOGGER.info('Executing "terraform get" to update remote '
                                 'modules')
                     run_module_command(
                         cmd_list=['terraform', 'get', '-update=true'],
-                        env_vars=self.context.env_vars
+                        env_vars=env_vars
+                    )
+                    init_state['modules'] = module_sources_fingerprint
+                    save_init_state(data_dir, init_state)
+                saved_plan = get_saved_plan_options(
+                    self.options.get('options', {}).get(
+                        'terraform_saved_plans'
+                    ),
+                    self.path,
+                    self.context
+                )
+                if saved_plan and command in ['plan', 'apply']:
+                    saved_plan['fingerprint'] = get_plan_fingerprint(
+                        self.path,
+                        tf_var_args,
+                        get_backend_fingerprint(self.path, backend_options),
+                        saved_plan,
+                        env_vars
                     )
+                    run_saved_plan_command(command, tf_cmd, saved_plan,
+                                           env_vars)
                 else:
-                    LOGGER.info('Skipping "terraform get" due to '
-                                '"SKIP_TF_GET" environment variable...')
-                LOGGER.info("Running Terraform %s on %s (\"%s\")",
-                            command,
-                            os.path.basename(self.path),
-                            " ".join(tf_cmd))
-                run_module_command(cmd_list=tf_cmd,
-                                   env_vars=self.context.env_vars)
+                    if saved_plan:  # destroying invalidates any saved plan
+                        remove_saved_plan(saved_plan)
+                    LOGGER.info("Running Terraform %s on %s (\"%s\")",
+                                command,
+                                os.path.basename(self.path),
+                                " ".join(tf_cmd))
+                    run_module_command(cmd_list=tf_cmd,
+                                       env_vars=env_vars)
         else:
             response['skipped_configs'] = True
             LOGGER.info("Skipping Terraform %s of %s",
@@ -0,0 +1,155 @@
+"""Hierarchical timing spans, written to a Chrome trace (or JSON lines) file.
+
+Tracing is enabled by setting ``RUNWAY_TRACE_FILE``. Spans are appended to
+the file as they finish, by Runway and its child processes (e.g. stacker),
+so a single trace covers the whole run. A span's parent is the innermost
+open span of its thread, or (for a child process' top-level spans) the span
+of the process' parent recorded in ``RUNWAY_TRACE_PARENT``.
+
+Only the standard library is used, so this can be imported anywhere.
+"""
+from contextlib import contextmanager
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+TRACE_FILE_ENV_VAR = 'RUNWAY_TRACE_FILE'
+TRACE_PARENT_ENV_VAR = 'RUNWAY_TRACE_PARENT'
+# Open spans of each thread
+SPAN_STACK = threading.local()
+WRITE_LOCK = threading.Lock()
+# Processes (pids) whose name has been written to the trace
+NAMED_PROCESSES = set()
+
+
+def get_trace_file():
+    """Return absolute path of the trace file (or None if not tracing)."""
+    path = os.environ.get(TRACE_FILE_ENV_VAR)
+    if not path:
+        return None
+    if not os.path.isabs(path):
+        # Modules change directory; keep writing to the same file
+        path = os.path.abspath(path)
+        os.environ[TRACE_FILE_ENV_VAR] = path
+    return path
+
+
+def is_enabled():
+    """Return true if tracing is enabled."""
+    return bool(os.environ.get(TRACE_FILE_ENV_VAR))
+
+
+def get_current_span_id():
+    """Return id of the innermost open span (or of the parent process')."""
+    stack = getattr(SPAN_STACK, 'spans', None)
+    if stack:
+        return stack[-1]
+    return os.environ.get(TRACE_PARENT_ENV_VAR)
+
+
+def get_child_env_vars(env_vars):
+    """Return env_vars for a child process, propagating the current span."""
+    trace_file = get_trace_file()
+    if not trace_file:
+        return env_vars
+    env_vars = dict(env_vars)
+    env_vars[TRACE_FILE_ENV_VAR] = trace_file
+    span_id = get_current_span_id()
+    if span_id:
+        env_vars[TRACE_PARENT_ENV_VAR] = span_id
+    return env_vars
+
+
+def write_event(event):
+    """Append an event to the trace file.
+
+    Chrome trace files are written in the JSON array format without the
+    (optional) closing bracket, so every process can append to them;
+    files named ``*.jsonl`` get one JSON object per line instead.
+    """
+    trace_file = get_trace_file()
+    if not trace_file:
+        return
+    json_lines = trace_file.endswith('.jsonl')
+    events = [event]
+    with WRITE_LOCK:
+        if os.getpid() not in NAMED_PROCESSES:
+            NAMED_PROCESSES.add(os.getpid())
+            events.insert(0, {'name': 'process_name',
+                              'ph': 'M',
+                              'pid': os.getpid(),
+                              'args': {'name': ' '.join(
+                                  [os.path.basename(sys.argv[0] or
+                                                    sys.executable)] +
+                                  sys.argv[1:3]
+                              )}})
+        data = ''.join(json.dumps(i, default=str) + ('\n' if json_lines
+                                                     else ',\n')
+                       for i in events)
+        try:
+            # Only one process gets to start the array
+            fd = os.open(trace_file,
+                         os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_EXCL)
+            if not json_lines:
+                data = '[\n' + data
+        except OSError:
+            fd = os.open(trace_file, os.O_WRONLY | os.O_APPEND)
+        try:
+            # Appends of a single write don't interleave with other processes'
+            os.write(fd, data.encode())
+        finally:
+            os.close(fd)
+
+
+def add_span(name, start, end, category='runway', args=None, parent_id=None,  # noqa pylint: disable=too-many-arguments
+             span_id=None):
+    """Record a finished span (start & end are time.time() values)."""
+    args = dict(args or {})
+    args['id'] = span_id or uuid.uuid4().hex[:16]
+    parent_id = parent_id or get_current_span_id()
+    if parent_id:
+        args['parent'] = parent_id
+    write_event({'name': name,
+                 'cat': category,
+                 'ph': 'X',
+                 'ts': int(start * 1000000),
+                 'dur': int((end - start) * 1000000),
+                 'pid': os.getpid(),
+                 'tid': threading.current_thread().ident,
+                 'args': args})
+
+
+@contextmanager
+def _span(name, category, parent_id, args):
+    stack = getattr(SPAN_STACK, 'spans', None)
+    if stack is None:
+        stack = SPAN_STACK.spans = []
+    parent_id = parent_id or get_current_span_id()
+    span_id = uuid.uuid4().hex[:16]
+    stack.append(span_id)
+    start = time.time()
+    try:
+        yield
+    finally:
+        stack.pop()
+        add_span(name, start, time.time(), category, args, parent_id,
+                 span_id)
+
+
+@contextmanager
+def _no_span():
+    yield
+
+
+def span(name, category='runway', parent_id=None, **args):
+    """Return context manager recording the time of its block, if enabled.
+
+    The span's parent is the current span (see get_current_span_id) unless
+    parent_id is given, e.g. for spans of worker threads.
+    """
+    if not is_enabled():
+        return _no_span()
+    return _span(name, category, parent_id, args)
@@ -16,6 +16,9 @@ EMBEDDED_LIB_PATH = os.path.join(
     os.path.dirname(os.path.abspath(__file__)),
     'embedded'
 )
+# Directory (relative to a module) for runway's locally cached state
+RUNWAY_CACHE_DIR = '.runway_cache'
+WHICH_CACHE = {}  # type: Dict[tuple, Optional[str]]
 
 
 @contextmanager
@@ -87,6 +90,60 @@ def get_embedded_lib_path():
     )
 
 
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on a file (created if needed).
+
+    Blocks until the lock is available, e.g. from another runway process
+    sharing a cache directory.
+    """
+    with open(path, 'a') as lockfile:
+        if platform.system().lower() == 'windows':
+            import msvcrt  # pylint: disable=import-error
+            lockfile.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lockfile.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except (IOError, OSError):  # LK_LOCK gives up after 10s
+                    pass
+        else:
+            import fcntl  # pylint: disable=import-error
+            fcntl.flock(lockfile.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if platform.system().lower() == 'windows':
+                lockfile.seek(0)
+                msvcrt.locking(lockfile.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lockfile.fileno(), fcntl.LOCK_UN)
+
+
+def get_user_cache_dir():
+    """Return the per-user runway cache directory."""
+    if platform.system().lower() == 'windows' and os.environ.get(
+            'LOCALAPPDATA'):
+        return os.path.join(os.environ['LOCALAPPDATA'], 'runway', 'cache')
+    return os.path.join(os.environ.get('XDG_CACHE_HOME',
+                                       os.path.expanduser('~/.cache')),
+                        'runway')
+
+
+def strtobool(val):
+    """Convert a string representation of truth to 1 or 0.
+
+    Equivalent to distutils.util.strtobool, without the slow import of
+    distutils (which setuptools may patch).
+    """
+    val = val.lower()
+    if val in ('y', 'yes', 't', 'true', 'on', '1'):
+        return 1
+    if val in ('n', 'no', 'f', 'false', 'off', '0'):
+        return 0
+    raise ValueError("invalid truth value %r" % (val,))
+
+
 @contextmanager
 def ignore_exit_code_0():
     """Capture exit calls and ignore those with exit code 0."""
@@ -157,6 +214,14 @@ def use_embedded_pkgs(embedded_lib_path=None):
         sys.path = old_sys_path
 
 
+def which_cached(program):
+    """Return which(program), memoized for the current PATH."""
+    key = (program, os.environ.get('PATH'))
+    if key not in WHICH_CACHE:
+        WHICH_CACHE[key] = which(program)
+    return WHICH_CACHE[key]
+
+
 def which(program, add_win_suffixes=True):
     """Mimic 'which' command behavior.
 
@@ -69,10 +69,11 @@ setup(
     ],
     python_requires='>=2.6',
     keywords='cli',
-    packages=find_packages(exclude=['docs', 'tests*']),
+    packages=find_packages(exclude=['benchmarks*', 'docs', 'tests*']),
     install_requires=INSTALL_REQUIRES,
     extras_require={
-        'test': ['flake8', 'pep8-naming', 'flake8-docstrings', 'pylint'],
+        'test': ['flake8', 'pep8-naming', 'flake8-docstrings', 'pylint',
+                 'mock'],
     },
     entry_points={
         'console_scripts': [
@@ -0,0 +1,97 @@
+"""Tests for api_metrics module."""
+import json
+import os
+import tempfile
+import unittest
+
+import boto3
+from botocore.stub import Stubber
+
+from runway import api_metrics
+
+
+class ApiMetricsTester(unittest.TestCase):
+    """Test collection of API call metrics."""
+
+    def setUp(self):
+        """Create a client with metrics collection."""
+        self.env = dict(os.environ)
+        os.environ.update({'AWS_ACCESS_KEY_ID': 'AKIATEST',
+                           'AWS_SECRET_ACCESS_KEY': 'test',
+                           api_metrics.API_METRICS_ENV_VAR: 'true'})
+        self.metrics = api_metrics.ApiMetrics()
+        session = boto3.session.Session(region_name='us-east-1')
+        self.metrics.register(session.events)
+        self.client = session.client('cloudformation')
+
+    def tearDown(self):
+        """Restore environment."""
+        os.environ.clear()
+        os.environ.update(self.env)
+
+    def test_calls(self):
+        """Test calls are aggregated per operation & stack."""
+        with Stubber(self.client) as stubber:
+            for _ in range(2):
+                stubber.add_response('describe_stacks', {'Stacks': []},
+                                     {'StackName': 'stack-a'})
+            stubber.add_client_error('describe_stacks', 'ValidationError',
+                                     'Stack with id stack-b does not exist',
+                                     expected_params={'StackName': 'stack-b'})
+            stubber.add_response('get_template', {'TemplateBody': '{}'})
+            self.client.describe_stacks(StackName='stack-a')
+            self.client.describe_stacks(StackName='stack-a')
+            with self.assertRaises(self.client.exceptions.ClientError):
+                self.client.describe_stacks(StackName='stack-b')
+            self.client.get_template(
+                StackName='arn:aws:cloudformation:us-east-1:123456789012:'
+                          'stack/stack-a/79b4b8a0-6ab1-11e9-a1c8-0a1528792fce'
+            )
+        totals = self.metrics.get_operation_totals()
+        self.assertEqual(totals[('cloudformation', 'DescribeStacks')].calls, 3)
+        self.assertEqual(totals[('cloudformation', 'DescribeStacks')].errors,
+                         1)
+        self.assertEqual(self.metrics.get_stack_calls(),
+                         {'stack-a': 3, 'stack-b': 1})
+
+        metrics_file = tempfile.mktemp(suffix='.jsonl')
+        os.environ[api_metrics.API_METRICS_FILE_ENV_VAR] = metrics_file
+        try:
+            self.metrics.report('stacker build')
+            with open(metrics_file) as stream:
+                exported = json.loads(stream.read())
+        finally:
+            os.remove(metrics_file)
+        self.assertEqual(exported['action'], 'stacker build')
+        self.assertEqual(
+            exported['operations']['cloudformation.GetTemplate']['calls'], 1
+        )
+        self.assertEqual(
+            sum(exported['operations']['cloudformation.DescribeStacks'][
+                'latency_histogram_ms'
+            ].values()),
+            3
+        )
+        self.assertEqual(
+            exported['stacks']['stack-b']['cloudformation.DescribeStacks'][
+                'errors'
+            ],
+            1
+        )
+
+    def test_throttling(self):
+        """Test throttled attempts are counted."""
+        operation = self.client.meta.service_model.operation_model(
+            'DescribeStacks'
+        )
+        self.metrics._needs_retry(  # pylint: disable=protected-access
+            response=(None, {'Error': {'Code': 'Throttling'}}),
+            operation=operation,
+            request_dict={'context': {}}
+        )
+        self.assertEqual(
+            self.metrics.get_operation_totals()[
+                ('cloudformation', 'DescribeStacks')
+            ].throttles,
+            1
+        )
@@ -0,0 +1,194 @@
+"""Tests for the build_staticsite hook."""
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from runway.hooks.staticsite.build_staticsite import (
+    S3MultipartUploadStream, S3ObjectReader, download_and_extract_to_mkdtemp,
+    zip_and_upload
+)
+
+
+class StubS3Client(object):
+    """S3 client storing objects (and multipart uploads) in memory."""
+
+    def __init__(self, fail_part=None):
+        """Initialize client.
+
+        Args:
+            fail_part (Optional[int]): part number whose upload fails.
+
+        """
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+        self.ranges = []
+        self.fail_part = fail_part
+
+    def create_multipart_upload(self, Bucket, Key):  # noqa pylint: disable=invalid-name
+        """Start upload."""
+        upload_id = "upload-%d" % len(self.uploads)
+        self.uploads[upload_id] = {'key': (Bucket, Key), 'parts': {}}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):  # noqa pylint: disable=invalid-name,too-many-arguments,unused-argument
+        """Store part."""
+        if PartNumber == self.fail_part:
+            raise IOError('connection reset')
+        self.uploads[UploadId]['parts'][PartNumber] = Body
+        return {'ETag': '"etag-%d"' % PartNumber}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId,  # noqa pylint: disable=invalid-name
+                                  MultipartUpload):  # noqa pylint: disable=invalid-name
+        """Assemble object from its parts."""
+        parts = self.uploads.pop(UploadId)['parts']
+        self.objects[(Bucket, Key)] = b''.join(
+            parts[i['PartNumber']] for i in MultipartUpload['Parts']
+        )
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):  # noqa pylint: disable=invalid-name,unused-argument
+        """Discard upload."""
+        self.aborted.append(UploadId)
+        self.uploads.pop(UploadId)
+
+    def head_object(self, Bucket, Key):  # noqa pylint: disable=invalid-name
+        """Return object size."""
+        return {'ContentLength': len(self.objects[(Bucket, Key)])}
+
+    def get_object(self, Bucket, Key, Range=None):  # noqa pylint: disable=invalid-name
+        """Return (a range of) an object."""
+        data = self.objects[(Bucket, Key)]
+        if Range:
+            self.ranges.append(Range)
+            start, end = Range[len('bytes='):].split('-')
+            data = data[int(start):int(end) + 1]
+        return {'Body': io.BytesIO(data)}
+
+
+class StubSession(object):  # pylint: disable=too-few-public-methods
+    """boto3 session returning a stub client."""
+
+    def __init__(self, client):
+        """Initialize session."""
+        self.s3_client = client
+
+    def client(self, service):
+        """Return S3 client."""
+        assert service == 's3'
+        return self.s3_client
+
+
+class MultipartUploadStreamTester(unittest.TestCase):
+    """Test S3MultipartUploadStream."""
+
+    def upload(self, chunks, part_size=5):
+        """Upload chunks, returning the client & upload."""
+        client = StubS3Client()
+        with S3MultipartUploadStream(client, 'bucket', 'key',
+                                     part_size=part_size,
+                                     max_concurrency=2) as stream:
+            for i in chunks:
+                stream.write(i)
+        return client, stream
+
+    def test_part_boundaries(self):
+        """Test parts are uploaded in order as they fill."""
+        client, stream = self.upload([b'abc', b'defghij', b'kl'])
+        self.assertEqual(client.objects[('bucket', 'key')], b'abcdefghijkl')
+        self.assertEqual(stream.tell(), 12)
+        self.assertEqual([i['PartNumber'] for i in stream._parts],  # noqa pylint: disable=protected-access
+                         [1, 2, 3])
+
+        client, stream = self.upload([b'abcde', b'fghij'])
+        self.assertEqual(client.objects[('bucket', 'key')], b'abcdefghij')
+        self.assertEqual(len(stream._parts), 2)  # noqa pylint: disable=protected-access
+
+        client, stream = self.upload([])
+        self.assertEqual(client.objects[('bucket', 'key')], b'')
+
+    def test_abort(self):
+        """Test errors abort the upload."""
+        client = StubS3Client()
+        with self.assertRaises(ValueError):
+            with S3MultipartUploadStream(client, 'bucket', 'key',
+                                         part_size=5) as stream:
+                stream.write(b'abcdefgh')
+                raise ValueError('archiving failed')
+        self.assertEqual(client.aborted, ['upload-0'])
+        self.assertEqual(client.objects, {})
+
+        client = StubS3Client(fail_part=2)
+        with self.assertRaises(IOError):
+            with S3MultipartUploadStream(client, 'bucket', 'key',
+                                         part_size=5) as stream:
+                stream.write(b'abcdefghijkl')
+        self.assertEqual(client.aborted, ['upload-0'])
+        self.assertEqual(client.objects, {})
+
+
+class S3ObjectReaderTester(unittest.TestCase):
+    """Test S3ObjectReader."""
+
+    def test_read(self):
+        """Test reads & seeks fetch blocks via ranged GETs."""
+        client = StubS3Client()
+        client.objects[('bucket', 'key')] = b'0123456789abcdef'
+        reader = S3ObjectReader(client, 'bucket', 'key', block_size=6)
+        self.assertEqual(reader.read(4), b'0123')
+        self.assertEqual(reader.read(4), b'4567')
+        self.assertEqual(client.ranges, ['bytes=0-5', 'bytes=6-11'])
+        reader.seek(-3, io.SEEK_END)
+        self.assertEqual(reader.read(), b'def')
+        self.assertEqual(reader.read(), b'')
+        reader.seek(7)
+        self.assertEqual(reader.read(2), b'78')
+        self.assertEqual(client.ranges,
+                         ['bytes=0-5', 'bytes=6-11', 'bytes=13-15',
+                          'bytes=7-12'])
+
+
+class ArchiveRoundTripTester(unittest.TestCase):
+    """Test site archives are uploaded & extracted intact."""
+
+    def setUp(self):
+        """Create site directory."""
+        self.site_dir = tempfile.mkdtemp()
+        self.files = {'index.html': b'<html></html>',
+                      os.path.join('js', 'app.js'): b'foo();' * 1000,
+                      os.path.join('img', 'empty.png'): b''}
+        for name, contents in self.files.items():
+            if not os.path.isdir(os.path.dirname(
+                    os.path.join(self.site_dir, name))):
+                os.makedirs(os.path.dirname(os.path.join(self.site_dir,
+                                                         name)))
+            with open(os.path.join(self.site_dir, name), 'wb') as stream:
+                stream.write(contents)
+        self.output_dir = None
+
+    def tearDown(self):
+        """Remove site & output directories."""
+        shutil.rmtree(self.site_dir)
+        if self.output_dir:
+            shutil.rmtree(self.output_dir)
+
+    def test_round_trip(self):
+        """Test zip & tar.gz archives."""
+        # Symlinked files are archived with their targets' contents
+        os.symlink('index.html', os.path.join(self.site_dir, 'home.html'))
+        self.files['home.html'] = self.files['index.html']
+        for archive_format in ['zip', 'tar.gz']:
+            client = StubS3Client()
+            key = 'site-abc123.' + archive_format
+            zip_and_upload(self.site_dir, 'bucket', key,
+                           StubSession(client), archive_format)
+            self.output_dir = download_and_extract_to_mkdtemp(
+                'bucket', key, StubSession(client)
+            )
+            for name, contents in self.files.items():
+                with open(os.path.join(self.output_dir, name),
+                          'rb') as stream:
+                    self.assertEqual(stream.read(), contents)
+            shutil.rmtree(self.output_dir)
+            self.output_dir = None
@@ -0,0 +1,306 @@
+"""Tests for CDK module."""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+
+from botocore.exceptions import ClientError
+
+try:
+    from unittest import mock
+except ImportError:  # py2
+    import mock
+
+from runway.identity import IDENTITY_CACHE, cache_identity
+from runway.module.cdk import (
+    BOOTSTRAPPED_ENVIRONMENTS, CloudDevelopmentKit, cdk_bootstrap_is_current,
+    get_bootstrap_version, get_required_bootstrap_version, synth_cdk_assembly
+)
+
+ENV_VARS = {'AWS_ACCESS_KEY_ID': 'AKIADEV', 'AWS_DEFAULT_REGION': 'us-east-1'}
+PROD_ENV_VARS = dict(ENV_VARS, AWS_ACCESS_KEY_ID='AKIAPROD')
+
+
+def fake_synth(command, **_kwargs):
+    """Write cloud assembly to the cdk synth output directory."""
+    output_dir = command[command.index('-o') + 1]
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as stream:
+        json.dump({'version': '1.0.0'}, stream)
+
+
+class StubCloudFormationClient(object):  # noqa pylint: disable=too-few-public-methods
+    """CloudFormation client describing a CDKToolkit stack."""
+
+    def __init__(self, stack=None):
+        """Initialize client."""
+        self.stack = stack
+
+    def describe_stacks(self, StackName):  # noqa pylint: disable=invalid-name
+        """Return stack (or raise a ValidationError if not deployed)."""
+        if not self.stack:
+            raise ClientError({'Error': {
+                'Code': 'ValidationError',
+                'Message': "Stack with id %s does not exist" % StackName
+            }}, 'DescribeStacks')
+        return {'Stacks': [self.stack]}
+
+
+class BootstrapTester(unittest.TestCase):
+    """Test checks of whether environments are bootstrapped."""
+
+    def setUp(self):
+        """Use a temporary cache directory."""
+        self.cache_dir = tempfile.mkdtemp()
+        patch = mock.patch('runway.module.cdk.get_user_cache_dir',
+                           return_value=self.cache_dir)
+        patch.start()
+        self.addCleanup(patch.stop)
+        BOOTSTRAPPED_ENVIRONMENTS.clear()
+
+    def tearDown(self):
+        """Remove cache directory."""
+        BOOTSTRAPPED_ENVIRONMENTS.clear()
+        shutil.rmtree(self.cache_dir)
+
+    def test_bootstrap_version(self):
+        """Test the version is read from the toolkit stack's outputs."""
+        for stack, version in [
+                (None, None),
+                ({'StackStatus': 'CREATE_IN_PROGRESS'}, None),
+                ({'StackStatus': 'CREATE_COMPLETE'}, 0),
+                ({'StackStatus': 'UPDATE_COMPLETE',
+                  'Outputs': [{'OutputKey': 'BootstrapVersion',
+                               'OutputValue': '4'}]}, 4)
+        ]:
+            with mock.patch('runway.module.cdk.boto3.client',
+                            return_value=StubCloudFormationClient(stack)):
+                self.assertEqual(get_bootstrap_version(ENV_VARS), version)
+
+    @mock.patch('runway.module.cdk.get_bootstrap_version')
+    def test_run_cache(self, get_version):
+        """Test environments are only checked once per run."""
+        get_version.return_value = None
+        self.assertFalse(cdk_bootstrap_is_current('111/us-east-1', ENV_VARS))
+        get_version.return_value = 2
+        self.assertTrue(cdk_bootstrap_is_current('111/us-east-1', ENV_VARS))
+        self.assertTrue(cdk_bootstrap_is_current('111/us-east-1', ENV_VARS))
+        self.assertEqual(get_version.call_count, 2)
+        # Newer versions are checked again
+        self.assertFalse(cdk_bootstrap_is_current('111/us-east-1', ENV_VARS,
+                                                  min_version=3))
+        self.assertEqual(get_version.call_count, 3)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    @mock.patch('runway.module.cdk.get_bootstrap_version', return_value=2)
+    def test_disk_cache(self, get_version):
+        """Test checks are cached on disk for cache_ttl seconds."""
+        self.assertTrue(cdk_bootstrap_is_current('111/us-east-1', ENV_VARS,
+                                                 cache_ttl=60))
+        BOOTSTRAPPED_ENVIRONMENTS.clear()
+        self.assertTrue(cdk_bootstrap_is_current('111/us-east-1', ENV_VARS,
+                                                 cache_ttl=60))
+        self.assertEqual(get_version.call_count, 1)
+
+        BOOTSTRAPPED_ENVIRONMENTS.clear()
+        with mock.patch('runway.module.cdk.time.time',
+                        return_value=time.time() + 61):
+            self.assertTrue(cdk_bootstrap_is_current('111/us-east-1',
+                                                     ENV_VARS, cache_ttl=60))
+        self.assertEqual(get_version.call_count, 2)
+
+    def write_assembly(self, versions):
+        """Write cloud assembly requiring toolkit stack versions."""
+        assembly_dir = os.path.join(self.cache_dir, 'assembly')
+        os.mkdir(assembly_dir)
+        with open(os.path.join(assembly_dir, 'manifest.json'),
+                  'w') as stream:
+            json.dump({'version': '5.0.0', 'artifacts': dict(
+                ("Stack%d" % i, {
+                    'type': 'aws:cloudformation:stack',
+                    'properties': {'templateFile': 'Stack%d.json' % i,
+                                   'requiresBootstrapStackVersion': i}
+                }) for i in versions
+            )}, stream)
+        return assembly_dir
+
+    def test_required_version(self):
+        """Test the required version is read from the cloud assembly."""
+        self.assertIsNone(get_required_bootstrap_version(None))
+        self.assertIsNone(get_required_bootstrap_version(self.cache_dir))
+        self.assertEqual(
+            get_required_bootstrap_version(self.write_assembly([2, 6])), 6
+        )
+        shutil.rmtree(os.path.join(self.cache_dir, 'assembly'))
+        self.assertIsNone(
+            get_required_bootstrap_version(self.write_assembly([]))
+        )
+
+    def test_run_cdk_bootstrap(self):
+        """Test cdk bootstrap only runs for environments needing it."""
+        cache_identity(ENV_VARS, {'Account': '111111111111'})
+        self.addCleanup(IDENTITY_CACHE.clear)
+        module = CloudDevelopmentKit(
+            mock.MagicMock(env_name='dev', env_vars=ENV_VARS), self.cache_dir
+        )
+        assembly_dir = self.write_assembly([6])
+        with mock.patch('runway.module.cdk.run_module_command') as run, \
+                mock.patch('runway.module.cdk.get_bootstrap_version',
+                           return_value=4) as get_version:
+            # Toolkit stacks older than the app requires are upgraded
+            module.run_cdk_bootstrap(['cdk', 'bootstrap'], assembly_dir)
+            run.assert_called_once_with(cmd_list=['cdk', 'bootstrap'],
+                                        env_vars=ENV_VARS)
+            get_version.return_value = 6
+            module.run_cdk_bootstrap(['cdk', 'bootstrap'], assembly_dir)
+            module.run_cdk_bootstrap(['cdk', 'bootstrap'], assembly_dir)
+            self.assertEqual(run.call_count, 1)
+            self.assertEqual(get_version.call_count, 2)
+
+            # Without a known required version, bootstrap is always run
+            module.run_cdk_bootstrap(['cdk', 'bootstrap'])
+            self.assertEqual(run.call_count, 2)
+            module.options = {'options': {'cdk_bootstrap_min_version': 6}}
+            module.run_cdk_bootstrap(['cdk', 'bootstrap'])
+            self.assertEqual(run.call_count, 2)
+        self.assertEqual(BOOTSTRAPPED_ENVIRONMENTS,
+                         {'111111111111/us-east-1': 6})
+
+
+class SynthTester(unittest.TestCase):
+    """Test reuse of synthesized CDK apps."""
+
+    def setUp(self):
+        """Create module directory."""
+        self.module_dir = tempfile.mkdtemp()
+        self.write_app('new App();\n')
+        cache_identity(ENV_VARS, {'Account': '111111111111'})
+        cache_identity(PROD_ENV_VARS, {'Account': '222222222222'})
+        for patch in [mock.patch('runway.module.which', return_value=None),
+                      mock.patch('runway.module.cdk.subprocess.check_call',
+                                 side_effect=fake_synth)]:
+            self.check_call = patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        """Remove module directory."""
+        IDENTITY_CACHE.clear()
+        shutil.rmtree(self.module_dir)
+
+    def write_app(self, source):
+        """Write CDK app source."""
+        with open(os.path.join(self.module_dir, 'app.js'), 'w') as stream:
+            stream.write(source)
+
+    def synth(self, env_vars=None, context_opts=None):
+        """Synthesize the app, returning the assembly directory."""
+        return synth_cdk_assembly(self.module_dir, context_opts or [],
+                                  env_vars or ENV_VARS, 'dev')
+
+    def cached_assemblies(self):
+        """Return names of the cached assemblies."""
+        return os.listdir(os.path.join(self.module_dir, '.runway_cache',
+                                       'cdk'))
+
+    def test_reuse(self):
+        """Test unchanged apps are only synthesized once."""
+        assembly_dir = self.synth()
+        self.assertTrue(os.path.isfile(os.path.join(assembly_dir,
+                                                    'manifest.json')))
+        self.assertEqual(self.synth(), assembly_dir)
+        self.assertEqual(self.check_call.call_count, 1)
+        self.assertEqual(self.cached_assemblies(),
+                         [os.path.basename(assembly_dir)])
+
+    def test_invalidation(self):
+        """Test source, context & account changes synthesize the app."""
+        assembly_dirs = [self.synth()]
+        self.write_app('new App({stackName: "app"});\n')
+        assembly_dirs.append(self.synth())
+        assembly_dirs.append(self.synth(context_opts=['-c', 'size=large']))
+        assembly_dirs.append(self.synth(env_vars=PROD_ENV_VARS))
+        self.assertEqual(len(set(assembly_dirs)), 4)
+        self.assertEqual(self.check_call.call_count, 4)
+        # Only the latest assembly is retained
+        self.assertEqual(self.cached_assemblies(),
+                         [os.path.basename(assembly_dirs[-1])])
+
+    def test_synth_error(self):
+        """Test failed synths exit without caching an assembly."""
+        self.check_call.side_effect = subprocess.CalledProcessError(2, 'cdk')
+        with self.assertRaises(SystemExit) as exc:
+            self.synth()
+        self.assertEqual(exc.exception.code, 2)
+        self.assertEqual(self.cached_assemblies(), [])
+
+
+class RunCdkTester(unittest.TestCase):
+    """Test cdk commands run by the module."""
+
+    def setUp(self):
+        """Create module directory."""
+        self.module_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.module_dir, 'package.json'),
+                  'w') as stream:
+            stream.write('{}')
+        for patch in [
+                mock.patch('runway.module.which', return_value=None),
+                mock.patch('runway.module.cdk.which', return_value='npm'),
+                mock.patch('runway.module.cdk.run_npm_install'),
+                mock.patch('runway.module.cdk.synth_cdk_assembly',
+                           return_value='/tmp/assembly'),
+                mock.patch.object(CloudDevelopmentKit, 'run_cdk_bootstrap')
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+        patch = mock.patch('runway.module.cdk.run_module_command')
+        self.run_module_command = patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        """Remove module directory."""
+        shutil.rmtree(self.module_dir)
+
+    def get_cdk_args(self, command, options):
+        """Return arguments of the cdk command run by the module."""
+        context = mock.MagicMock(env_name='dev', env_vars={'DEBUG': '1'})
+        module = CloudDevelopmentKit(context, self.module_dir, dict(
+            options, environments={'dev': {'size': 'large'}}
+        ))
+        getattr(module, command)()
+        cmd_list = self.run_module_command.call_args[1]['cmd_list']
+        self.assertEqual(cmd_list[0], os.path.join(self.module_dir,
+                                                   'node_modules', '.bin',
+                                                   'cdk'))
+        return cmd_list[1:]
+
+    def test_context_args(self):
+        """Test context values are passed to the CLI without reuse_synth."""
+        self.assertEqual(self.get_cdk_args('deploy', {}),
+                         ['deploy', '-v', '-c', 'size=large'])
+        bootstrap_command = CloudDevelopmentKit.run_cdk_bootstrap.call_args[0][0]  # noqa pylint: disable=no-member
+        self.assertEqual(bootstrap_command[1:],
+                         ['bootstrap', '-c', 'size=large'])
+        self.assertIsNone(
+            CloudDevelopmentKit.run_cdk_bootstrap.call_args[0][1]  # noqa pylint: disable=no-member
+        )
+
+    def test_reuse_synth_args(self):
+        """Test the assembly replaces context values with reuse_synth."""
+        self.assertEqual(
+            self.get_cdk_args('deploy',
+                              {'options': {'cdk_reuse_synth': True}}),
+            ['deploy', '-v', '--app', '/tmp/assembly']
+        )
+        # The assembly declares the toolkit stack version required
+        self.assertEqual(
+            CloudDevelopmentKit.run_cdk_bootstrap.call_args[0][1],  # noqa pylint: disable=no-member
+            '/tmp/assembly'
+        )
+        self.assertEqual(
+            self.get_cdk_args('destroy',
+                              {'options': {'cdk_reuse_synth': True}}),
+            ['destroy', '-v', '-c', 'size=large']
+        )
@@ -0,0 +1,123 @@
+"""Tests for the benchmarks' CloudFormation simulator."""
+import json
+import os
+import time
+import unittest
+
+import boto3
+from botocore.exceptions import ClientError
+
+from benchmarks.cfn_simulator import CloudSimulator
+
+TEMPLATE = json.dumps({
+    'Resources': {
+        'Handle': {'Type': 'AWS::CloudFormation::WaitConditionHandle'}
+    },
+    'Outputs': {'Id': {'Value': {'Ref': 'Handle'}}}
+})
+
+
+class CloudSimulatorTester(unittest.TestCase):
+    """Test simulated CloudFormation API."""
+
+    def setUp(self):
+        """Route new boto3 sessions to a simulator."""
+        self.env = dict(os.environ)
+        os.environ.update({'AWS_ACCESS_KEY_ID': 'AKIASIMULATOR',
+                           'AWS_SECRET_ACCESS_KEY': 'simulator'})
+        self.simulator = CloudSimulator(stack_latency=0.05)
+        self.simulator.install()
+        self.client = boto3.session.Session(
+            region_name='us-east-1'
+        ).client('cloudformation')
+
+    def tearDown(self):
+        """Restore boto3 sessions & environment."""
+        self.simulator.uninstall()
+        os.environ.clear()
+        os.environ.update(self.env)
+
+    def get_status(self):
+        """Return status of the test stack."""
+        return self.client.describe_stacks(
+            StackName='test'
+        )['Stacks'][0]['StackStatus']
+
+    def test_stack_lifecycle(self):
+        """Test stack create/update/delete."""
+        self.client.create_stack(StackName='test', TemplateBody=TEMPLATE)
+        self.assertEqual(self.get_status(), 'CREATE_IN_PROGRESS')
+        time.sleep(0.1)
+        self.assertEqual(self.get_status(), 'CREATE_COMPLETE')
+        self.assertEqual(
+            self.client.describe_stacks(
+                StackName='test'
+            )['Stacks'][0]['Outputs'][0]['OutputKey'],
+            'Id'
+        )
+        stack_id = self.client.describe_stacks(
+            StackName='test'
+        )['Stacks'][0]['StackId']
+        self.assertEqual(
+            self.client.get_template(StackName=stack_id)['TemplateBody'],
+            json.loads(TEMPLATE)
+        )
+        with self.assertRaises(ClientError) as context:
+            self.client.update_stack(StackName='test', TemplateBody=TEMPLATE)
+        self.assertIn('No updates are to be performed.',
+                      str(context.exception))
+
+        self.client.delete_stack(StackName='test')
+        time.sleep(0.1)
+        with self.assertRaises(ClientError) as context:
+            self.get_status()
+        self.assertIn('does not exist', str(context.exception))
+        self.assertEqual(self.simulator.calls['cloudformation.CreateStack'],
+                         1)
+
+    def test_change_set(self):
+        """Test change set create/describe/execute."""
+        self.simulator.change_set_latency = 0.05
+        self.client.create_stack(StackName='test', TemplateBody=TEMPLATE)
+        time.sleep(0.1)
+        template = json.loads(TEMPLATE)
+        template['Resources']['Handle2'] = template['Resources']['Handle']
+        change_set_id = self.client.create_change_set(
+            StackName='test', ChangeSetName='test-change',
+            TemplateBody=json.dumps(template)
+        )['Id']
+        self.assertEqual(
+            self.client.describe_change_set(
+                ChangeSetName=change_set_id
+            )['Status'],
+            'CREATE_IN_PROGRESS'
+        )
+        time.sleep(0.1)
+        change_set = self.client.describe_change_set(
+            ChangeSetName=change_set_id
+        )
+        self.assertEqual(change_set['Status'], 'CREATE_COMPLETE')
+        self.assertEqual(
+            [i['ResourceChange']['LogicalResourceId']
+             for i in change_set['Changes']],
+            ['Handle2']
+        )
+        self.client.execute_change_set(ChangeSetName=change_set_id)
+        self.assertEqual(self.get_status(), 'UPDATE_IN_PROGRESS')
+
+    def test_throttling(self):
+        """Test calls beyond the rate limit are throttled."""
+        self.simulator.uninstall()
+        self.simulator = CloudSimulator(api_rate=0.01, api_burst=1,
+                                        max_attempts=2, backoff_scale=0)
+        self.simulator.install()
+        client = boto3.session.Session(
+            region_name='us-east-1'
+        ).client('cloudformation')
+        client.delete_stack(StackName='test')
+        with self.assertRaises(ClientError) as context:
+            client.delete_stack(StackName='test')
+        self.assertIn('Throttling', str(context.exception))
+        self.assertEqual(
+            self.simulator.throttled['cloudformation.DeleteStack'], 2
+        )
@@ -0,0 +1,155 @@
+"""Tests for the cleanup_s3 hook."""
+import threading
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:  # py2
+    import mock
+
+from runway.hooks.cleanup_s3 import BucketPurger
+
+KEYS = ['index.html', 'css/site.css', 'js/app.js', 'js/vendor/lib.js',
+        'img/a/1.png', 'img/a/2.png', 'img/b/1.png', 'img/b/2.png',
+        'img/b/3.png', 'img/b/c/4.png']
+
+
+class StubPaginator(object):  # pylint: disable=too-few-public-methods
+    """list_object_versions paginator of a StubS3Client."""
+
+    def __init__(self, client):
+        """Initialize paginator."""
+        self.client = client
+
+    def paginate(self, Bucket, Prefix, Delimiter=None):  # noqa pylint: disable=invalid-name,unused-argument
+        """Yield pages of the versions (and subprefixes) under a prefix."""
+        self.client.listed.append((Prefix, Delimiter))
+        with self.client.lock:
+            keys = sorted(i for i in self.client.versions
+                          if i.startswith(Prefix))
+        versions = []
+        prefixes = []
+        for key in keys:
+            rest = key[len(Prefix):]
+            if Delimiter and Delimiter in rest:
+                prefix = Prefix + rest.split(Delimiter)[0] + Delimiter
+                if prefix not in prefixes:
+                    prefixes.append(prefix)
+            else:
+                versions.append({'Key': key,
+                                 'VersionId': self.client.versions[key]})
+        size = self.client.page_size
+        for i in range(0, max(len(versions), 1), size):
+            page = {'Versions': versions[i:i + size]}
+            if i == 0:
+                page['CommonPrefixes'] = [{'Prefix': j} for j in prefixes]
+            yield page
+
+
+class StubS3Client(object):
+    """S3 client holding a version of each key in memory."""
+
+    def __init__(self, keys, page_size=2, errors=None):
+        """Initialize client.
+
+        Args:
+            keys (list[str]): keys in the bucket.
+            page_size (int): versions per listing page.
+            errors (dict): error code returned for a key by the first
+                delete_objects request including it.
+
+        """
+        self.versions = dict((i, 'v1') for i in keys)
+        self.page_size = page_size
+        self.errors = dict(errors or {})
+        self.listed = []
+        self.delete_requests = []
+        self.lifecycle = None
+        self.lock = threading.Lock()
+
+    def get_paginator(self, operation):
+        """Return paginator."""
+        assert operation == 'list_object_versions'
+        return StubPaginator(self)
+
+    def delete_objects(self, Bucket, Delete):  # noqa pylint: disable=invalid-name,unused-argument
+        """Delete versions, returning the errors of keys failing once."""
+        errors = []
+        with self.lock:
+            self.delete_requests.append([i['Key'] for i in Delete['Objects']])
+            for i in Delete['Objects']:
+                if i['Key'] in self.errors:
+                    errors.append(dict(i, Code=self.errors.pop(i['Key']),
+                                       Message='error'))
+                else:
+                    self.versions.pop(i['Key'], None)
+        return {'Errors': errors} if errors else {}
+
+    def list_object_versions(self, Bucket, MaxKeys):  # noqa pylint: disable=invalid-name,unused-argument
+        """Return first versions in the bucket."""
+        with self.lock:
+            return {'Versions': [{'Key': i, 'VersionId': 'v1'}
+                                 for i in sorted(self.versions)[:MaxKeys]]}
+
+    def put_bucket_lifecycle_configuration(self, Bucket,  # noqa pylint: disable=invalid-name,unused-argument
+                                           LifecycleConfiguration):  # noqa pylint: disable=invalid-name
+        """Record lifecycle configuration."""
+        self.lifecycle = LifecycleConfiguration
+
+
+class BucketPurgerTester(unittest.TestCase):
+    """Test BucketPurger."""
+
+    def setUp(self):
+        """Skip backoff delays."""
+        patcher = mock.patch('runway.hooks.cleanup_s3.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_purge_prefixes(self):
+        """Test versions are listed under prefixes & all deleted."""
+        client = StubS3Client(KEYS)
+        purger = BucketPurger(client, 'bucket', concurrency=4,
+                              prefix_depth=2)
+        self.assertTrue(purger.purge())
+        self.assertEqual(client.versions, {})
+        self.assertEqual(purger.deleted, len(KEYS))
+        self.assertEqual(
+            sorted(client.listed),
+            [('', '/'), ('css/', '/'), ('img/', '/'), ('img/a/', None),
+             ('img/b/', None), ('js/', '/'), ('js/vendor/', None)]
+        )
+        # Each page is deleted in its own batch
+        self.assertTrue(all(len(i) <= 2 for i in client.delete_requests))
+        self.assertIsNone(client.lifecycle)
+
+    def test_retry_errors(self):
+        """Test keys with retryable errors are retried on their own."""
+        client = StubS3Client(KEYS, errors={'img/b/2.png': 'SlowDown',
+                                            'index.html': 'InternalError'})
+        purger = BucketPurger(client, 'bucket', concurrency=2)
+        self.assertTrue(purger.purge())
+        self.assertEqual(client.versions, {})
+        self.assertEqual(purger.deleted, len(KEYS))
+        self.assertIn(['img/b/2.png'], client.delete_requests)
+        self.assertIn(['index.html'], client.delete_requests)
+
+    def test_errors(self):
+        """Test other errors stop the purge."""
+        client = StubS3Client(KEYS, errors={'js/app.js': 'AccessDenied'})
+        with self.assertRaises(RuntimeError):
+            BucketPurger(client, 'bucket', concurrency=2).purge()
+
+    def test_lifecycle_fallback(self):
+        """Test a lifecycle expiration is applied past the threshold."""
+        client = StubS3Client(KEYS)
+        purger = BucketPurger(client, 'bucket', concurrency=1,
+                              prefix_depth=0,
+                              lifecycle_fallback_threshold=4)
+        self.assertFalse(purger.purge())
+        self.assertTrue(client.versions)
+        self.assertGreaterEqual(purger.deleted, 4)
+        self.assertEqual(
+            [i['ID'] for i in client.lifecycle['Rules']],
+            ['runway-purge-bucket', 'runway-purge-bucket-delete-markers']
+        )
@@ -0,0 +1,67 @@
+"""Tests for the CloudFormation module."""
+import shutil
+import tempfile
+import unittest
+
+from runway.module.cloudformation import get_stacker_config_dependencies
+from runway.util import change_dir
+
+CONFIGS = {
+    'core.yaml': 'namespace: ${namespace}\n'
+                 'stacks:\n'
+                 '  vpc:\n'
+                 '    template_path: templates/vpc.yaml\n',
+    'team-a.yaml': 'namespace: ${namespace}\n'
+                   'stacks:\n'
+                   '  - name: app-a\n'
+                   '    variables:\n'
+                   '      VpcId: ${rxref vpc::VpcId}\n',
+    'team-b.yaml': 'namespace: ${namespace}\n'
+                   'stacks:\n'
+                   '  - name: app-b\n'
+                   '    variables:\n'
+                   '      VpcId: ${xref ${namespace}-vpc::VpcId}\n',
+    'zother.yaml': 'namespace: ${namespace}\n'
+                   'stacks:\n'
+                   '  bucket:\n'
+                   '    template_path: templates/bucket.yaml\n'
+}
+
+
+class StackerConfigDependenciesTester(unittest.TestCase):
+    """Test dependencies between stacker config files."""
+
+    def setUp(self):
+        """Create module directory."""
+        self.module_dir = tempfile.mkdtemp()
+        for name, config in CONFIGS.items():
+            with open('%s/%s' % (self.module_dir, name), 'w') as stream:
+                stream.write(config)
+
+    def tearDown(self):
+        """Remove module directory."""
+        shutil.rmtree(self.module_dir)
+
+    def test_inferred_dependencies(self):
+        """Test dependencies are inferred from xref/rxref lookups."""
+        with change_dir(self.module_dir):
+            self.assertEqual(
+                get_stacker_config_dependencies(sorted(CONFIGS)),
+                {'core.yaml': set(),
+                 'team-a.yaml': set(['core.yaml']),
+                 'team-b.yaml': set(['core.yaml']),
+                 'zother.yaml': set()}
+            )
+
+    def test_explicit_dependencies(self):
+        """Test explicit dependencies are added to inferred ones."""
+        with change_dir(self.module_dir):
+            dependencies = get_stacker_config_dependencies(
+                sorted(CONFIGS),
+                {'zother.yaml': ['team-a.yaml', 'team-b.yaml']}
+            )
+            self.assertEqual(dependencies['zother.yaml'],
+                             set(['team-a.yaml', 'team-b.yaml']))
+            with self.assertRaises(SystemExit):
+                get_stacker_config_dependencies(sorted(CONFIGS),
+                                                {'zother.yaml': ['nope.yaml']})
@@ -0,0 +1,149 @@
+"""Tests for daemon module."""
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:  # py2
+    import mock
+
+from runway import daemon
+
+SERVE_SCRIPT = ("import sys\n"
+                "from runway import daemon\n"
+                "daemon.PRELOAD_MODULES = []\n"
+                "daemon.PRELOAD_SERVICES = []\n"
+                "daemon.serve(sys.argv[1], 30)\n")
+CLIENT_SCRIPT = ("import sys\n"
+                 "from runway import daemon\n"
+                 "sys.stderr.write(repr(daemon.forward_request(sys.argv[1], "
+                 "['whichenv'])))\n")
+
+
+@unittest.skipUnless(daemon.is_supported(), 'requires Unix socket support')
+class DaemonTester(unittest.TestCase):
+    """Test forwarding requests to the daemon."""
+
+    def setUp(self):
+        """Create socket directory."""
+        self.socket_dir = tempfile.mkdtemp()
+        os.chmod(self.socket_dir, 0o700)
+        self.socket_path = os.path.join(self.socket_dir, 'daemon.sock')
+        self.stdio = [tempfile.TemporaryFile() for _i in range(3)]
+
+    def tearDown(self):
+        """Remove socket directory."""
+        for i in self.stdio:
+            i.close()
+        shutil.rmtree(self.socket_dir)
+
+    def test_forward_request(self):
+        """Test the request carries argv, environment, cwd & stdio fds."""
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(1)
+        results = []
+        with mock.patch.multiple(sys, stdin=self.stdio[0],
+                                 stdout=self.stdio[1], stderr=self.stdio[2]), \
+                mock.patch.dict(os.environ, {'DEPLOY_ENVIRONMENT': 'ci'}):
+            client = threading.Thread(
+                target=lambda: results.append(daemon.forward_request(
+                    self.socket_path, ['deploy']
+                ))
+            )
+            client.start()
+            conn, _addr = server.accept()
+            try:
+                self.assertTrue(daemon.is_trusted_peer(conn))
+                request, fds = daemon.receive_request(conn)
+                self.assertEqual(request['argv'], ['deploy'])
+                self.assertEqual(request['cwd'], os.getcwd())
+                self.assertEqual(request['env']['DEPLOY_ENVIRONMENT'], 'ci')
+                self.assertEqual(len(fds), 3)
+                os.write(fds[1], b'deployed\n')
+                for i in fds:
+                    os.close(i)
+                daemon.send_message(conn, {'pid': os.getpid()})
+                daemon.send_message(conn, {'exit_code': 3})
+                client.join(5)
+            finally:
+                conn.close()
+                server.close()
+        self.assertEqual(results, [3])
+        self.stdio[1].seek(0)
+        self.assertEqual(self.stdio[1].read(), b'deployed\n')
+
+    def test_serve(self):
+        """Test a command is run by the daemon with the client's stdio."""
+        # The client runs in the socket directory
+        with open(os.path.join(self.socket_dir, 'runway.yml'), 'w') as stream:
+            stream.write('deployments: []\n')
+        env = dict(os.environ, DEPLOY_ENVIRONMENT='ci',
+                   PYTHONPATH=os.path.dirname(os.path.dirname(
+                       os.path.abspath(daemon.__file__)
+                   )))
+        server = subprocess.Popen([sys.executable, '-c', SERVE_SCRIPT,
+                                   self.socket_path], env=env)
+        try:
+            for _i in range(100):
+                if os.path.exists(self.socket_path):
+                    break
+                time.sleep(0.1)
+            client = subprocess.Popen(
+                [sys.executable, '-c', CLIENT_SCRIPT, self.socket_path],
+                env=dict(env, DEPLOY_ENVIRONMENT='stage'),
+                cwd=self.socket_dir,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            stdout, stderr = client.communicate()
+        finally:
+            server.terminate()
+            server.wait()
+        self.assertEqual(stderr.decode().splitlines()[-1], '0')
+        self.assertEqual(stdout.decode().strip(), 'stage')
+
+    def test_insecure_socket_dir(self):
+        """Test sockets outside a directory private to the user are refused."""
+        self.assertIsNone(daemon.check_socket_dir(self.socket_dir))
+
+        os.chmod(self.socket_dir, 0o755)
+        self.assertIn('mode 755', daemon.check_socket_dir(self.socket_dir))
+        self.assertIsNone(daemon.forward_request(self.socket_path, []))
+        with self.assertRaises(SystemExit):
+            daemon.serve(self.socket_path)
+        self.assertFalse(os.path.exists(self.socket_path))
+        os.chmod(self.socket_dir, 0o700)
+
+        link = os.path.join(tempfile.gettempdir(),
+                            'runway-test-%d' % os.getpid())
+        os.symlink(self.socket_dir, link)
+        try:
+            self.assertIn('symlink', daemon.check_socket_dir(link))
+        finally:
+            os.remove(link)
+
+        with mock.patch('os.getuid', return_value=os.getuid() + 1):
+            self.assertIn('owned', daemon.check_socket_dir(self.socket_dir))
+            with self.assertRaises(SystemExit):
+                daemon.serve(self.socket_path)
+
+    @unittest.skipUnless(hasattr(socket, 'SO_PEERCRED'),
+                         'requires peer credentials')
+    def test_peer_uid(self):
+        """Test connections from other users' processes aren't trusted."""
+        conn, peer = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.assertEqual(daemon.get_peer_uid(conn), os.getuid())
+            self.assertTrue(daemon.is_trusted_peer(conn))
+            with mock.patch('os.getuid', return_value=os.getuid() + 1):
+                self.assertFalse(daemon.is_trusted_peer(conn))
+        finally:
+            conn.close()
+            peer.close()
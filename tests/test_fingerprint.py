@@ -0,0 +1,81 @@
+"""Tests for fingerprint module."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from runway.fingerprint import (
+    LocalFingerprintStore, calculate_module_fingerprint,
+    get_fingerprint_config, get_fingerprint_name
+)
+
+
+class FingerprintTester(unittest.TestCase):
+    """Test module fingerprinting."""
+
+    def setUp(self):
+        """Create module directory."""
+        self.module_root = tempfile.mkdtemp()
+        with open(os.path.join(self.module_root, 'main.tf'), 'w') as stream:
+            stream.write('# foo')
+        self.config = get_fingerprint_config({'skip_unchanged': True})
+
+    def tearDown(self):
+        """Remove module directory."""
+        shutil.rmtree(self.module_root)
+
+    def fingerprint(self, module_opts=None, env_vars=None,
+                    assume_role_arn=None):
+        """Return fingerprint of the test module."""
+        return calculate_module_fingerprint(self.module_root,
+                                            module_opts or {},
+                                            env_vars or {},
+                                            ['FOO'],
+                                            self.config,
+                                            assume_role_arn)
+
+    def test_fingerprint_changes(self):
+        """Test fingerprint changes with files, options & env vars only."""
+        fingerprint = self.fingerprint()
+        os.makedirs(os.path.join(self.module_root, '.terraform'))
+        with open(os.path.join(self.module_root, '.terraform', 'foo'),
+                  'w') as stream:
+            stream.write('bar')
+        self.assertEqual(self.fingerprint(env_vars={'BAR': '1'}),
+                         fingerprint)
+        self.assertNotEqual(self.fingerprint(env_vars={'FOO': '1'}),
+                            fingerprint)
+        self.assertNotEqual(self.fingerprint({'options': {'foo': 'bar'}}),
+                            fingerprint)
+        self.assertNotEqual(
+            self.fingerprint(
+                assume_role_arn='arn:aws:iam::123456789012:role/deploy'
+            ),
+            fingerprint
+        )
+        with open(os.path.join(self.module_root, 'main.tf'), 'w') as stream:
+            stream.write('# bar')
+        self.assertNotEqual(self.fingerprint(), fingerprint)
+
+    def test_local_store(self):
+        """Test LocalFingerprintStore."""
+        store = LocalFingerprintStore(self.module_root)
+        name = get_fingerprint_name('./foo.tf', 'dev', 'us-east-1',
+                                    '123456789012')
+        self.assertEqual(name, 'foo.tf/dev/us-east-1/123456789012')
+        self.assertIsNone(store.get(name))
+        store.put(name, 'abc')
+        self.assertEqual(store.get(name), 'abc')
+        # Deployments to other accounts don't share the fingerprint
+        self.assertIsNone(store.get(get_fingerprint_name(
+            './foo.tf', 'dev', 'us-east-1', '210987654321'
+        )))
+        store.delete(name)
+        self.assertIsNone(store.get(name))
+
+    def test_disabled_config(self):
+        """Test get_fingerprint_config."""
+        self.assertIsNone(get_fingerprint_config({}))
+        self.assertEqual(get_fingerprint_config(
+            {'skip_unchanged': {'store': 'ssm:/foo'}}
+        )['store'], 'ssm:/foo')
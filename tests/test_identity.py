@@ -0,0 +1,76 @@
+"""Tests for identity module."""
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:  # py2
+    import mock
+
+from runway.identity import (
+    ACCOUNT_ALIAS_CACHE, IDENTITY_CACHE, cache_identity, get_account_aliases,
+    get_account_id, get_caller_identity
+)
+
+DEV_ENV_VARS = {'AWS_ACCESS_KEY_ID': 'AKIADEV', 'AWS_REGION': 'us-east-1'}
+PROD_ENV_VARS = {'AWS_ACCESS_KEY_ID': 'AKIAPROD', 'AWS_REGION': 'us-east-1'}
+
+
+class IdentityTester(unittest.TestCase):
+    """Test the run-scoped identity cache."""
+
+    def setUp(self):
+        """Stub AWS clients."""
+        IDENTITY_CACHE.clear()
+        ACCOUNT_ALIAS_CACHE.clear()
+        self.client = mock.MagicMock()
+        self.client.get_caller_identity.side_effect = lambda: {
+            'Account': '111111111111',
+            'Arn': 'arn:aws:iam::111111111111:user/dev',
+            'UserId': 'AIDADEV',
+            'ResponseMetadata': {'RequestId': 'abc'}
+        }
+        self.client.get_paginator.return_value.paginate.return_value = [
+            {'AccountAliases': ['dev-account']}
+        ]
+        session = mock.MagicMock()
+        session.client.return_value = self.client
+        for patch in [mock.patch('runway.identity.boto3.session.Session',
+                                 return_value=session),
+                      mock.patch('runway.identity.register_session',
+                                 side_effect=lambda i: i)]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        """Clear caches."""
+        IDENTITY_CACHE.clear()
+        ACCOUNT_ALIAS_CACHE.clear()
+
+    def test_caller_identity(self):
+        """Test identities are cached per set of credentials."""
+        self.assertEqual(get_caller_identity(DEV_ENV_VARS),
+                         {'Account': '111111111111',
+                          'Arn': 'arn:aws:iam::111111111111:user/dev',
+                          'UserId': 'AIDADEV'})
+        self.assertEqual(get_account_id(dict(DEV_ENV_VARS,
+                                             AWS_REGION='us-west-2')),
+                         '111111111111')
+        self.assertEqual(self.client.get_caller_identity.call_count, 1)
+
+        get_account_id(PROD_ENV_VARS)
+        self.assertEqual(self.client.get_caller_identity.call_count, 2)
+
+    def test_cache_identity(self):
+        """Test known identities (e.g. of assumed roles) aren't looked up."""
+        cache_identity(PROD_ENV_VARS, {'Account': '222222222222'})
+        self.assertEqual(get_account_id(PROD_ENV_VARS), '222222222222')
+        self.client.get_caller_identity.assert_not_called()
+
+    def test_account_aliases(self):
+        """Test aliases are cached per account."""
+        cache_identity(PROD_ENV_VARS, {'Account': '111111111111'})
+        self.assertEqual(get_account_aliases(DEV_ENV_VARS), ['dev-account'])
+        self.assertEqual(get_account_aliases(PROD_ENV_VARS), ['dev-account'])
+        self.client.get_paginator.assert_called_once_with(
+            'list_account_aliases'
+        )
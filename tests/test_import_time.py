@@ -0,0 +1,48 @@
+"""Tests for CLI startup import time."""
+import os
+import subprocess
+import sys
+import unittest
+
+# Cumulative import time budget (ms) for running a lightweight command;
+# generous, to avoid flakiness on slow CI hosts
+WHICHENV_IMPORT_BUDGET_MS = 750
+# Packages only needed by deployment commands
+HEAVY_PACKAGES = ['boto3', 'botocore', 'git', 'distutils']
+
+
+def get_import_times(command_name):
+    """Return cumulative import times (us) of top-level imports."""
+    output = subprocess.check_output(
+        [sys.executable, '-X', 'importtime', '-c',
+         "import runway.cli; "
+         "from runway.commands.command_loader import find_command_class; "
+         "find_command_class(['%s'])" % command_name],
+        stderr=subprocess.STDOUT,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).decode()
+    import_times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _self, cumulative, name = line[len('import time:'):].split('|')
+        import_times[name.strip()] = (int(cumulative),
+                                      len(name) - len(name.lstrip()))
+    return import_times
+
+
+@unittest.skipIf(sys.version_info < (3, 7), '-X importtime requires 3.7+')
+class ImportTimeTester(unittest.TestCase):
+    """Test import time of the runway CLI."""
+
+    def test_whichenv_imports(self):
+        """Test whichenv doesn't import deployment dependencies."""
+        import_times = get_import_times('whichenv')
+        # importlib.import_module bypasses -X importtime reporting of the
+        # command module itself, but not of its imports
+        self.assertIn('runway.commands.runway_command', import_times)
+        for i in HEAVY_PACKAGES:
+            self.assertNotIn(i, import_times)
+        total = sum(cumulative for cumulative, depth in import_times.values()
+                    if depth == 1)
+        self.assertLess(total / 1000.0, WHICHENV_IMPORT_BUDGET_MS)
@@ -0,0 +1,105 @@
+"""Tests for module module."""
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:  # py2
+    import mock
+
+from runway.module import get_node_modules_fingerprint, run_npm_install
+
+
+class NpmInstallTester(unittest.TestCase):
+    """Test skipping npm installs via node_modules stamps & the cache."""
+
+    def setUp(self):
+        """Create module directories."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.context = mock.MagicMock(env_vars={})
+        for patch in [
+                mock.patch('runway.module.get_node_versions',
+                           return_value='node v10.15.3 npm 6.4.1'),
+                mock.patch('runway.module._run_npm_install',
+                           side_effect=self.fake_install),
+                mock.patch('runway.module.platform.machine',
+                           return_value='x86_64')
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.installs = []
+
+    def tearDown(self):
+        """Remove temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def fake_install(self, path, _context):
+        """Create node_modules, like npm."""
+        self.installs.append(os.path.basename(path))
+        if not os.path.isdir(os.path.join(path, 'node_modules', 'lib')):
+            os.makedirs(os.path.join(path, 'node_modules', 'lib'))
+        with open(os.path.join(path, 'node_modules', 'lib', 'index.js'),
+                  'w') as stream:
+            stream.write('module.exports = 1;\n')
+
+    def module(self, name, lockfile='{"lockfileVersion": 1}'):
+        """Create module directory with a lockfile."""
+        path = os.path.join(self.tmp_dir, name)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        with open(os.path.join(path, 'package.json'), 'w') as stream:
+            stream.write('{"name": "app"}')
+        with open(os.path.join(path, 'package-lock.json'), 'w') as stream:
+            stream.write(lockfile)
+        return path
+
+    def install(self, path, cache=False):
+        """Run npm install on a module."""
+        options = {'options': {'node_modules_cache': self.cache_dir}} \
+            if cache else {}
+        run_npm_install(path, options, self.context)
+
+    def test_stamp(self):
+        """Test installs are skipped until the lockfile or platform change."""
+        path = self.module('app')
+        self.install(path)
+        self.install(path)
+        self.assertEqual(self.installs, ['app'])
+
+        self.module('app', '{"lockfileVersion": 2}')
+        self.install(path)
+        self.install(path)
+        self.assertEqual(self.installs, ['app', 'app'])
+
+        with mock.patch('runway.module.platform.machine',
+                        return_value='aarch64'):
+            self.install(path)
+        self.assertEqual(self.installs, ['app', 'app', 'app'])
+
+    def test_no_lockfile(self):
+        """Test modules without a lockfile are always installed."""
+        path = self.module('app')
+        os.remove(os.path.join(path, 'package-lock.json'))
+        self.assertIsNone(get_node_modules_fingerprint(path))
+        self.install(path)
+        self.install(path)
+        self.assertEqual(self.installs, ['app', 'app'])
+
+    def test_cache(self):
+        """Test installs are shared between modules on the same platform."""
+        self.install(self.module('app1'), cache=True)
+        self.install(self.module('app1', '{"lockfileVersion": 2}'),
+                     cache=True)
+        self.install(self.module('app2'), cache=True)
+        self.assertEqual(self.installs, ['app1', 'app1'])
+        with open(os.path.join(self.tmp_dir, 'app2', 'node_modules', 'lib',
+                               'index.js')) as stream:
+            self.assertEqual(stream.read(), 'module.exports = 1;\n')
+
+        with mock.patch('runway.module.platform.machine',
+                        return_value='aarch64'):
+            self.install(self.module('app3'), cache=True)
+        self.assertEqual(self.installs, ['app1', 'app1', 'app3'])
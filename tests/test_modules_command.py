@@ -0,0 +1,78 @@
+"""Tests for modules_command module."""
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:  # py2
+    import mock
+
+from runway.commands.modules_command import ModulesCommand
+from runway.context import Context
+
+
+class PreflightTester(unittest.TestCase):
+    """Test up front validation of deployment accounts."""
+
+    def setUp(self):
+        """Record the environment each deployment is validated with."""
+        self.validated = {}
+        patch = mock.patch(
+            'runway.commands.modules_command.get_account_credential_errors',
+            side_effect=self.get_errors
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.errors = []
+
+    def get_errors(self, deployment, _env_name, env_vars):
+        """Record validation, returning errors."""
+        self.validated[deployment['name']] = env_vars
+        return self.errors
+
+    def preflight(self, deployments):
+        """Run preflight checks of deployments."""
+        context = Context(env_name='dev', env_region=None, env_root='.',
+                          env_vars={'AWS_PROFILE': 'default'})
+        ModulesCommand({}, env_root='.').preflight_account_validation(
+            deployments, context
+        )
+        # The run itself applies deployment env vars
+        self.assertEqual(context.env_vars, {'AWS_PROFILE': 'default'})
+
+    def test_env_vars(self):
+        """Test deployments are validated with the environment they run in."""
+        self.preflight([
+            {'name': 'network', 'regions': ['us-west-2'],
+             'account-id': '111111111111',
+             'env_vars': {'dev': {'AWS_PROFILE': 'network'}}},
+            {'name': 'assumed', 'regions': ['us-east-1'],
+             'account-id': '222222222222',
+             'env_vars': {'*': {'AWS_PROFILE': 'shared'}},
+             'assume-role': {'arn': 'arn:aws:iam::222222222222:role/deploy',
+                             'post_deploy_env_revert': True}},
+            {'name': 'app', 'regions': ['us-east-1'],
+             'account-alias': 'shared-services'}
+        ])
+        self.assertEqual(sorted(self.validated), ['app', 'network'])
+        self.assertEqual(self.validated['network']['AWS_PROFILE'], 'network')
+        self.assertEqual(self.validated['network']['AWS_DEFAULT_REGION'],
+                         'us-west-2')
+        self.assertEqual(self.validated['app']['AWS_PROFILE'], 'shared')
+
+    def test_assume_role(self):
+        """Test deployments following assumed roles are left to the run."""
+        self.preflight([
+            {'name': 'assumed', 'regions': ['us-east-1'],
+             'account-id': '222222222222',
+             'assume-role': 'arn:aws:iam::222222222222:role/deploy'},
+            {'name': 'app', 'regions': ['us-east-1'],
+             'account-id': '222222222222'}
+        ])
+        self.assertEqual(self.validated, {})
+
+    def test_errors(self):
+        """Test account mismatches exit before any deployment runs."""
+        self.errors = ['account id mismatch']
+        with self.assertRaises(SystemExit):
+            self.preflight([{'name': 'app', 'regions': ['us-east-1'],
+                             'account-id': '111111111111'}])
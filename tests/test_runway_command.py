@@ -0,0 +1,50 @@
+"""Tests for runway_command module."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from runway.commands.runway_command import find_git_dir, get_git_branch
+
+
+class GitBranchTester(unittest.TestCase):
+    """Test git branch detection."""
+
+    def setUp(self):
+        """Create repo directory."""
+        self.repo = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.repo, '.git', 'worktrees', 'wt'))
+        os.makedirs(os.path.join(self.repo, 'app', 'module'))
+
+    def tearDown(self):
+        """Remove repo directory."""
+        shutil.rmtree(self.repo)
+
+    def write(self, path, contents):
+        """Write file in the repo."""
+        with open(os.path.join(self.repo, path), 'w') as stream:
+            stream.write(contents)
+
+    def test_branch(self):
+        """Test branch is read from HEAD of a parent directory's repo."""
+        self.write(os.path.join('.git', 'HEAD'), 'ref: refs/heads/ENV-dev\n')
+        git_dir = find_git_dir(os.path.join(self.repo, 'app', 'module'))
+        self.assertEqual(git_dir, os.path.join(self.repo, '.git'))
+        self.assertEqual(get_git_branch(git_dir), 'ENV-dev')
+
+    def test_worktree(self):
+        """Test gitdir files are followed."""
+        self.write(os.path.join('.git', 'worktrees', 'wt', 'HEAD'),
+                   'ref: refs/heads/feature/foo\n')
+        self.write(os.path.join('app', '.git'),
+                   'gitdir: ../.git/worktrees/wt\n')
+        git_dir = find_git_dir(os.path.join(self.repo, 'app', 'module'))
+        self.assertEqual(git_dir,
+                         os.path.join(self.repo, '.git', 'worktrees', 'wt'))
+        self.assertEqual(get_git_branch(git_dir), 'feature/foo')
+
+    def test_detached_head(self):
+        """Test detached HEAD isn't treated as a branch."""
+        self.write(os.path.join('.git', 'HEAD'),
+                   '3e75d9e0c2d2b5dbd3f1e8c1f0a1b2c3d4e5f6a7\n')
+        self.assertIsNone(get_git_branch(os.path.join(self.repo, '.git')))
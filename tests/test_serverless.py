@@ -0,0 +1,64 @@
+"""Tests for the Serverless module."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from runway.module.serverless import sls_package_is_region_independent
+
+SERVERLESS_YML = ('service: myapp\n'
+                  'provider:\n'
+                  '  name: aws\n'
+                  '  environment:\n'
+                  '    TABLE: %s\n'
+                  'functions:\n'
+                  '  hello:\n'
+                  '    handler: handler.hello\n')
+
+
+class ReusePackageTester(unittest.TestCase):
+    """Test which services' packages can be reused across regions."""
+
+    def setUp(self):
+        """Create module directory."""
+        self.module_dir = tempfile.mkdtemp()
+        self.write('config-dev.yml', 'table: mytable\n')
+
+    def tearDown(self):
+        """Remove module directory."""
+        shutil.rmtree(self.module_dir)
+
+    def write(self, name, contents):
+        """Write file in the module directory."""
+        with open(os.path.join(self.module_dir, name), 'w') as stream:
+            stream.write(contents)
+
+    def is_region_independent(self, table):
+        """Return whether a service using a table name can be reused."""
+        self.write('serverless.yml', SERVERLESS_YML % table)
+        return sls_package_is_region_independent(self.module_dir, 'dev',
+                                                 'us-east-1')
+
+    def test_region_independent(self):
+        """Test services with static values & stage config are reused."""
+        self.assertTrue(self.is_region_independent('mytable'))
+        self.assertTrue(self.is_region_independent('${file(config-dev.yml):table}'))  # noqa
+        self.assertTrue(self.is_region_independent('${env:TABLE_NAME}'))
+
+    def test_region_dependent(self):
+        """Test services resolving values per region/account aren't reused."""
+        for table in ['${opt:region}-table',
+                      '${self:provider.region}-table',
+                      '${ssm:/myapp/table}',
+                      '${ssm(us-west-2):/myapp/table}',
+                      '${cf:myapp-db.TableName}',
+                      '${cf.us-west-2:myapp-db.TableName}',
+                      '${s3:mybucket/table-name}',
+                      '${aws:accountId}-table',
+                      '${self:custom.${ssm:/myapp/table-key}}']:
+            self.assertFalse(self.is_region_independent(table), table)
+
+    def test_region_config_file(self):
+        """Test services with stage-region config files aren't reused."""
+        self.write('config-dev-us-east-1.yml', 'table: mytable\n')
+        self.assertFalse(self.is_region_independent('mytable'))
@@ -0,0 +1,259 @@
+"""Tests for the AWS provider of stacker."""
+import json
+import threading
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:  # py2
+    import mock
+
+from runway.embedded.stacker import exceptions
+from runway.embedded.stacker.providers.aws.default import (
+    CHANGE_SET_WAIT_BASE, CHANGE_SET_WAIT_MAX, ChangeSetReview, RateLimiter,
+    get_change_set_wait_timeout, wait_till_change_set_complete
+)
+from runway.embedded.stacker.providers.base import Template
+from runway.embedded.stacker.ui import ui
+
+CHANGE = {'ResourceChange': {'Action': 'Modify',
+                             'LogicalResourceId': 'Bucket',
+                             'ResourceType': 'AWS::S3::Bucket',
+                             'Replacement': 'False'}}
+
+
+class FakeClock(object):
+    """Stand-in for the time module, advanced by sleeping."""
+
+    def __init__(self):
+        """Initialize clock."""
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        """Return current time."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Advance clock."""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class StubCloudFormationClient(object):  # noqa pylint: disable=too-few-public-methods
+    """CloudFormation client returning a sequence of change set statuses."""
+
+    def __init__(self, statuses):
+        """Initialize client."""
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def describe_change_set(self, ChangeSetName):  # noqa pylint: disable=invalid-name
+        """Return next status (repeating the last)."""
+        self.calls += 1
+        status = self.statuses.pop(0) if len(self.statuses) > 1 \
+            else self.statuses[0]
+        return {'ChangeSetId': ChangeSetName, 'Status': status}
+
+
+class ChangeSetWaitTester(unittest.TestCase):
+    """Test waiting for change sets to be created."""
+
+    def setUp(self):
+        """Patch clock."""
+        self.clock = FakeClock()
+        patch = mock.patch(
+            'runway.embedded.stacker.providers.aws.default.time', self.clock
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    @staticmethod
+    def template(resources):
+        """Return template with a number of resources."""
+        return Template(body=json.dumps({'Resources': dict(
+            ('Handle%d' % i,
+             {'Type': 'AWS::CloudFormation::WaitConditionHandle'})
+            for i in range(resources)
+        )}))
+
+    def test_timeout(self):
+        """Test the timeout scales with the template's resources."""
+        self.assertEqual(get_change_set_wait_timeout(Template()),
+                         CHANGE_SET_WAIT_BASE)
+        self.assertEqual(get_change_set_wait_timeout(Template(body='{')),
+                         CHANGE_SET_WAIT_BASE)
+        self.assertEqual(get_change_set_wait_timeout(self.template(0)),
+                         CHANGE_SET_WAIT_BASE)
+        self.assertEqual(get_change_set_wait_timeout(self.template(20)),
+                         CHANGE_SET_WAIT_BASE + 20)
+        self.assertEqual(get_change_set_wait_timeout(self.template(5000)),
+                         CHANGE_SET_WAIT_MAX)
+
+    def test_complete(self):
+        """Test polling with backoff until the change set is complete."""
+        client = StubCloudFormationClient(['CREATE_PENDING'] * 5 +
+                                          ['CREATE_COMPLETE'])
+        limiter = mock.MagicMock()
+        response = wait_till_change_set_complete(client, 'cs-1', timeout=60,
+                                                 sleep_time=1, max_sleep=4,
+                                                 rate_limiter=limiter)
+        self.assertEqual(response['Status'], 'CREATE_COMPLETE')
+        self.assertEqual(client.calls, 6)
+        self.assertEqual(limiter.acquire.call_count, 6)
+        # Sleeps between half & all of the doubling sleep time
+        for sleep, limit in zip(self.clock.sleeps, [1, 2, 4, 4, 4, 4]):
+            self.assertTrue(limit / 2.0 <= sleep <= limit, (sleep, limit))
+
+    def test_did_not_stabilize(self):
+        """Test waits fail once the timeout has passed."""
+        client = StubCloudFormationClient(['CREATE_IN_PROGRESS'])
+        start = self.clock.now
+        with self.assertRaises(exceptions.ChangesetDidNotStabilize):
+            wait_till_change_set_complete(client, 'cs-1', timeout=30,
+                                          max_sleep=5, rate_limiter=None)
+        # The last poll is made at the deadline
+        self.assertEqual(self.clock.now, start + 30)
+        self.assertTrue(all(i <= 5 for i in self.clock.sleeps))
+        # At least half of each (doubling) sleep time is slept between polls
+        self.assertLessEqual(client.calls, 15)
+
+    def test_rate_limiter(self):
+        """Test calls past the burst are paced at the rate."""
+        limiter = RateLimiter(2, burst=2)
+        for _i in range(5):
+            limiter.acquire()
+        self.assertEqual(self.clock.sleeps, [0.5, 0.5, 0.5])
+
+        # Tokens accumulate up to the burst while idle
+        self.clock.sleep(10)
+        del self.clock.sleeps[:]
+        for _i in range(3):
+            limiter.acquire()
+        self.assertEqual(self.clock.sleeps, [0.5])
+
+    def test_rate_limiter_threads(self):
+        """Test waiting calls are served in turn."""
+        limiter = RateLimiter(10)
+        self.clock.sleep = self.clock.sleeps.append  # threads wait at once
+        threads = [threading.Thread(target=limiter.acquire)
+                   for _i in range(15)]
+        for i in threads:
+            i.start()
+        for i in threads:
+            i.join(5)
+        self.assertEqual(sorted(round(i, 6) for i in self.clock.sleeps),
+                         [round(0.1 * i, 6) for i in range(1, 6)])
+
+
+class ChangeSetReviewTester(unittest.TestCase):
+    """Test batched approval of change sets."""
+
+    def setUp(self):
+        """Create review & patch prompts."""
+        self.review = ChangeSetReview(settle_time=0.05)
+        self.results = {}
+        self.threads = []
+        patch = mock.patch.object(ui, 'ask')
+        self.ask = patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        """Wait for approvals."""
+        for i in self.threads:
+            i.join(5)
+
+    def approve(self, fqn):
+        """Queue a stack's change set in a thread, recording the result."""
+        def run():
+            """Record whether the change set was approved."""
+            try:
+                self.review.approve(fqn, 'changes', [CHANGE], [CHANGE], [])
+                self.results[fqn] = True
+            except exceptions.CancelExecution:
+                self.results[fqn] = False
+            except Exception as exc:  # pylint: disable=broad-except
+                self.results[fqn] = exc
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.threads.append(thread)
+
+    def wait_for_queue(self, length):
+        """Wait until change sets are queued."""
+        for _i in range(500):
+            with self.review.condition:
+                if len(self.review.queued) >= length:
+                    return
+            time.sleep(0.01)
+        self.fail('change sets not queued')
+
+    def finish(self):
+        """Wait for approvals to finish."""
+        for i in self.threads:
+            i.join(5)
+            self.assertFalse(i.is_alive())
+
+    def test_batch(self):
+        """Test concurrent change sets are reviewed with a single prompt."""
+        for answer, approved in [('y', True), ('n', False)]:
+            self.ask.reset_mock()
+            self.ask.return_value = answer
+            stacks = ['stack%d' % i for i in range(5)]
+            for i in stacks:
+                self.review.begin(i)
+            for i in stacks:
+                self.approve(i)
+            self.finish()
+            self.assertEqual(self.ask.call_count, 1)
+            self.assertEqual(self.results,
+                             dict((i, approved) for i in stacks))
+
+    def test_select(self):
+        """Test change sets can be approved individually."""
+        self.ask.side_effect = ['v', 's', 'y', 'n']
+        self.review.begin('stack1')
+        self.review.begin('stack2')
+        self.approve('stack1')
+        self.wait_for_queue(1)
+        self.approve('stack2')
+        self.finish()
+        self.assertEqual(self.ask.call_count, 4)
+        self.assertEqual(self.results, {'stack1': True, 'stack2': False})
+
+    def test_review_error(self):
+        """Test errors while reviewing reject the whole batch."""
+        with mock.patch.object(ChangeSetReview, 'review',
+                               side_effect=RuntimeError('terminal closed')):
+            for i in ['stack1', 'stack2', 'stack3']:
+                self.review.begin(i)
+            for i in ['stack1', 'stack2', 'stack3']:
+                self.approve(i)
+            self.finish()
+        errors = [i for i in self.results.values()
+                  if isinstance(i, RuntimeError)]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual([i for i in self.results.values()
+                          if i is not errors[0]], [False, False])
+        self.assertFalse(self.review.reviewing)
+
+        # Later change sets are still reviewed
+        self.ask.return_value = 'y'
+        self.approve('stack4')
+        self.finish()
+        self.assertTrue(self.results['stack4'])
+
+    def test_stack_without_changes(self):
+        """Test waiting change sets are reviewed once other stacks end."""
+        self.ask.return_value = 'y'
+        self.review.begin('stack1')
+        self.review.begin('stack2')
+        self.approve('stack1')
+        self.wait_for_queue(1)
+        time.sleep(0.2)
+        # stack2's change set is still being created
+        self.ask.assert_not_called()
+        self.review.end('stack2')
+        self.finish()
+        self.assertEqual(self.ask.call_count, 1)
+        self.assertEqual(self.results, {'stack1': True})
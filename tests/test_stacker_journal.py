@@ -0,0 +1,70 @@
+"""Tests for the journal of stacker builds."""
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from runway.embedded.stacker.journal import Journal, get_fingerprint
+
+CREATED = datetime.datetime(2020, 1, 1)
+PROVIDER_STACK = {'StackName': 'ns-vpc', 'CreationTime': CREATED}
+
+
+class JournalTester(unittest.TestCase):
+    """Test recording & resuming builds."""
+
+    def setUp(self):
+        """Create journal directory."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'journal', 'stacks.json')
+
+    def tearDown(self):
+        """Remove journal directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_resume(self):
+        """Test completed stacks are resumable until they change."""
+        fingerprint = get_fingerprint(
+            [{'ParameterKey': 'Cidr', 'ParameterValue': '10.0.0.0/16'}],
+            [{'Key': 'env', 'Value': 'dev'}],
+            None
+        )
+        journal = Journal(self.path)
+        journal.submit('ns-vpc', 'abc123', fingerprint)
+        journal.submit('ns-app', 'def456', fingerprint)
+        journal.complete('ns-vpc', PROVIDER_STACK)
+
+        journal = Journal(self.path, resume=True)
+        self.assertTrue(journal.is_resumable('ns-vpc'))
+        self.assertFalse(journal.is_resumable('ns-app'))
+        self.assertTrue(journal.is_unchanged('ns-vpc', 'abc123', fingerprint,
+                                             PROVIDER_STACK))
+        self.assertFalse(journal.is_unchanged('ns-vpc', 'abc124',
+                                              fingerprint, PROVIDER_STACK))
+        self.assertFalse(journal.is_unchanged(
+            'ns-vpc', 'abc123',
+            get_fingerprint([{'ParameterKey': 'Cidr',
+                              'ParameterValue': '10.1.0.0/16'}],
+                            [{'Key': 'env', 'Value': 'dev'}],
+                            None),
+            PROVIDER_STACK
+        ))
+        updated_stack = dict(PROVIDER_STACK,
+                             LastUpdatedTime=datetime.datetime(2020, 1, 2))
+        self.assertFalse(journal.is_unchanged('ns-vpc', 'abc123',
+                                              fingerprint, updated_stack))
+
+        journal.remove()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_new_build(self):
+        """Test builds not resuming discard the previous journal."""
+        journal = Journal(self.path)
+        journal.submit('ns-vpc', 'abc123', 'fingerprint')
+        journal.complete('ns-vpc', PROVIDER_STACK)
+        self.assertTrue(os.path.isfile(self.path))
+
+        journal = Journal(self.path)
+        self.assertFalse(journal.is_resumable('ns-vpc'))
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,60 @@
+"""Tests for staticsite hook utility functions."""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from runway.hooks.staticsite.util import get_hash_of_files
+
+
+class GetHashOfFilesTester(unittest.TestCase):
+    """Test get_hash_of_files."""
+
+    def setUp(self):
+        """Create a site directory with files older than the cache cutoff."""
+        self.site_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.site_dir, 'js'))
+        old_time = time.time() - 3600
+        for name, contents in [('index.html', b'<html></html>'),
+                               (os.path.join('js', 'app.js'), b'foo();')]:
+            filepath = os.path.join(self.site_dir, name)
+            with open(filepath, 'wb') as stream:
+                stream.write(contents)
+            os.utime(filepath, (old_time, old_time))
+
+    def tearDown(self):
+        """Remove site directory."""
+        shutil.rmtree(self.site_dir)
+
+    def test_legacy_format(self):
+        """Test legacy (default) hashes are unchanged from previous releases."""
+        self.assertEqual(get_hash_of_files(self.site_dir),
+                         'b49b0e54ea8979868bd63676fbc624e5')
+        self.assertEqual(get_hash_of_files(self.site_dir,
+                                           hash_format='legacy'),
+                         'b49b0e54ea8979868bd63676fbc624e5')
+        self.assertFalse(os.path.exists(os.path.join(self.site_dir,
+                                                     '.runway_cache')))
+
+    def test_per_file_cache(self):
+        """Test per_file digests are cached and excluded from hashing."""
+        first_hash = get_hash_of_files(self.site_dir, hash_format='per_file')
+        self.assertTrue(os.path.isfile(os.path.join(
+            self.site_dir, '.runway_cache', 'staticsite-file-hashes.json'
+        )))
+        self.assertEqual(get_hash_of_files(self.site_dir,
+                                           hash_format='per_file'),
+                         first_hash)
+        self.assertEqual(get_hash_of_files(self.site_dir,
+                                           hash_format='per_file',
+                                           cache=False),
+                         first_hash)
+        self.assertNotEqual(get_hash_of_files(self.site_dir,
+                                              hash_format='legacy'),
+                            first_hash)
+
+    def test_invalid_format(self):
+        """Test unknown hash formats are rejected."""
+        with self.assertRaises(ValueError):
+            get_hash_of_files(self.site_dir, hash_format='foo')
@@ -0,0 +1,334 @@
+"""Tests for the Terraform module."""
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:  # py2
+    import mock
+
+from runway.identity import cache_identity
+from runway.module.terraform import (
+    PLUGIN_CACHE_STATS, get_module_sources_fingerprint, get_plan_fingerprint,
+    TFENV_INSTALLED_VERSIONS, get_plugin_cache_dir, get_saved_plan_options,
+    get_tf_data_dir, list_installed_plugins, run_saved_plan_command, run_terraform_init,
+    run_tfenv_install
+)
+from runway.util import WHICH_CACHE, get_user_cache_dir
+
+MAIN_TF = ('module "vpc" {\n'
+           '  source  = "terraform-aws-modules/vpc/aws"\n'
+           '  version = "1.60.0"\n'
+           '  cidr    = "10.0.0.0/16"\n'
+           '}\n')
+
+
+AWS_PROVIDER = 'terraform-provider-aws_v2.70.0_x4'
+NULL_PROVIDER = 'terraform-provider-null_v2.1.2_x4'
+
+
+def write_file(path, contents=''):
+    """Write file, creating its directory."""
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as stream:
+        stream.write(contents)
+
+
+class DataDirTester(unittest.TestCase):
+    """Test selection of Terraform data directories."""
+
+    def setUp(self):
+        """Create module directory."""
+        self.module_dir = tempfile.mkdtemp()
+        patcher = mock.patch('runway.module.terraform.send2trash',
+                             side_effect=shutil.rmtree)
+        self.send2trash = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Remove module directory."""
+        shutil.rmtree(self.module_dir)
+
+    def data_dir(self, env_name, env_region, backend_config):
+        """Return (and create) data directory."""
+        data_dir = get_tf_data_dir(self.module_dir, env_name, env_region,
+                                   {'config': backend_config})
+        if not os.path.isdir(data_dir):
+            os.makedirs(data_dir)
+        return data_dir
+
+    def test_data_dirs(self):
+        """Test each env/region/backend has a data dir, trashing old ones."""
+        dev_east = self.data_dir('dev', 'us-east-1', {'bucket': 'a'})
+        self.assertEqual(os.path.dirname(dev_east),
+                         os.path.join(self.module_dir, '.runway_cache',
+                                      'terraform'))
+        self.assertTrue(re.match(r'^dev-us-east-1-[0-9a-f]{12}$',
+                                 os.path.basename(dev_east)))
+        self.assertEqual(self.data_dir('dev', 'us-east-1', {'bucket': 'a'}),
+                         dev_east)
+        dev_west = self.data_dir('dev', 'us-west-2', {'bucket': 'a'})
+        prod_east = self.data_dir('prod', 'us-east-1', {'bucket': 'a'})
+        self.assertEqual(len(set([dev_east, dev_west, prod_east])), 3)
+        self.send2trash.assert_not_called()
+
+        new_dev_east = self.data_dir('dev', 'us-east-1', {'bucket': 'b'})
+        self.assertNotEqual(new_dev_east, dev_east)
+        self.send2trash.assert_called_once_with(dev_east)
+        for i in [dev_west, prod_east, new_dev_east]:
+            self.assertTrue(os.path.isdir(i))
+
+
+class PluginCacheTester(unittest.TestCase):
+    """Test the shared Terraform plugin cache."""
+
+    def setUp(self):
+        """Create module & cache directories."""
+        self.module_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.module_dir, 'cache')
+        self.data_dir = os.path.join(self.module_dir, '.terraform')
+
+    def tearDown(self):
+        """Remove module directory."""
+        shutil.rmtree(self.module_dir)
+
+    def test_cache_dir(self):
+        """Test the cache directory options."""
+        self.assertEqual(get_plugin_cache_dir('user', '/env'),
+                         os.path.join(get_user_cache_dir(),
+                                      'terraform-plugins'))
+        self.assertEqual(get_plugin_cache_dir('env_root', '/env'),
+                         os.path.join('/env', '.runway_cache',
+                                      'terraform-plugins'))
+        self.assertEqual(get_plugin_cache_dir('../plugins', '/env'),
+                         os.path.join('/env', '../plugins'))
+        self.assertIsNone(get_plugin_cache_dir(False, '/env'))
+
+    def test_installed_plugins(self):
+        """Test providers are found in Terraform 0.11-0.12 & 0.13+ layouts."""
+        write_file(os.path.join(self.data_dir, 'plugins', 'linux_amd64',
+                                AWS_PROVIDER))
+        write_file(os.path.join(self.data_dir, 'plugins', 'linux_amd64',
+                                'lock.json'))
+        provider_dir = os.path.join('registry.terraform.io', 'hashicorp',
+                                    'null', '2.1.2', 'linux_amd64')
+        write_file(os.path.join(self.cache_dir, provider_dir, NULL_PROVIDER))
+        write_file(os.path.join(self.cache_dir, provider_dir, 'LICENSE'))
+        os.makedirs(os.path.dirname(os.path.join(self.data_dir, 'providers',
+                                                 provider_dir)))
+        os.symlink(os.path.join(self.cache_dir, provider_dir),
+                   os.path.join(self.data_dir, 'providers', provider_dir))
+        self.assertEqual(list_installed_plugins(self.data_dir),
+                         set([AWS_PROVIDER, NULL_PROVIDER]))
+
+    def test_stats(self):
+        """Test cache hits & misses of an init are counted."""
+        provider_dir = os.path.join('registry.terraform.io', 'hashicorp')
+        write_file(os.path.join(self.cache_dir, provider_dir, 'aws',
+                                AWS_PROVIDER))
+
+        def init(*_args):
+            """Install the cached provider & a new one."""
+            write_file(os.path.join(self.cache_dir, provider_dir, 'null',
+                                    NULL_PROVIDER))
+            os.makedirs(os.path.join(self.data_dir, 'providers'))
+            os.symlink(os.path.join(self.cache_dir, 'registry.terraform.io'),
+                       os.path.join(self.data_dir, 'providers',
+                                    'registry.terraform.io'))
+
+        stats = dict(PLUGIN_CACHE_STATS)
+        with mock.patch('runway.module.terraform._run_terraform_init',
+                        side_effect=init):
+            run_terraform_init(self.module_dir,
+                               {'filename': 'backend.tfvars'},
+                               'dev',
+                               'us-east-1',
+                               {'TF_PLUGIN_CACHE_DIR': self.cache_dir},
+                               self.data_dir)
+        self.assertEqual(PLUGIN_CACHE_STATS['hits'], stats['hits'] + 1)
+        self.assertEqual(PLUGIN_CACHE_STATS['misses'], stats['misses'] + 1)
+
+
+class TfenvTester(unittest.TestCase):
+    """Test installation of Terraform versions via tfenv."""
+
+    def setUp(self):
+        """Create module & tfenv directories."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.module_dir = os.path.join(self.tmp_dir, 'module')
+        tfenv_root = os.path.join(self.tmp_dir, 'tfenv')
+        write_file(os.path.join(tfenv_root, 'bin', 'tfenv'))
+        os.chmod(os.path.join(tfenv_root, 'bin', 'tfenv'), 0o755)
+        write_file(os.path.join(tfenv_root, 'versions', '0.12.29',
+                                'terraform'))
+        self.env_vars = {'PATH': os.path.join(tfenv_root, 'bin')}
+        TFENV_INSTALLED_VERSIONS.clear()
+        WHICH_CACHE.clear()
+        patcher = mock.patch.dict(os.environ, self.env_vars)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('runway.module.terraform.subprocess.check_call')
+        self.check_call = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Remove temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def install(self, version):
+        """Run tfenv install for a .terraform-version file."""
+        write_file(os.path.join(self.module_dir, '.terraform-version'),
+                   version + '\n')
+        self.assertTrue(run_tfenv_install(self.module_dir, self.env_vars))
+
+    def test_installed_version(self):
+        """Test tfenv isn't run for installed versions."""
+        self.install('0.12.29')
+        self.check_call.assert_not_called()
+
+    def test_install_once(self):
+        """Test versions are only installed once per process."""
+        for version in ['0.12.30', 'latest:^0.12']:
+            self.install(version)
+            self.install(version)
+        self.assertEqual(self.check_call.call_count, 2)
+        self.check_call.assert_called_with(['tfenv', 'install'],
+                                           env=self.env_vars)
+
+
+class ModuleSourcesFingerprintTester(unittest.TestCase):
+    """Test detection of module changes requiring terraform get."""
+
+    def setUp(self):
+        """Create module directory."""
+        self.module_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove module directory."""
+        shutil.rmtree(self.module_dir)
+
+    def fingerprint(self, main_tf):
+        """Return fingerprint of the module with main.tf contents."""
+        with open(os.path.join(self.module_dir, 'main.tf'), 'w') as stream:
+            stream.write(main_tf)
+        return get_module_sources_fingerprint(self.module_dir)
+
+    def test_module_changes(self):
+        """Test module renames, copies & source changes are detected."""
+        fingerprint = self.fingerprint(MAIN_TF)
+        self.assertEqual(
+            self.fingerprint(MAIN_TF.replace('10.0.0.0/16', '10.1.0.0/16')),
+            fingerprint
+        )
+        self.assertNotEqual(
+            self.fingerprint(MAIN_TF.replace('"vpc"', '"network"')),
+            fingerprint
+        )
+        self.assertNotEqual(
+            self.fingerprint(MAIN_TF + MAIN_TF.replace('"vpc"', '"vpc2"')),
+            fingerprint
+        )
+        self.assertNotEqual(
+            self.fingerprint(MAIN_TF.replace('1.60.0', '1.61.0')),
+            fingerprint
+        )
+
+
+class SavedPlanTester(unittest.TestCase):
+    """Test reuse of saved plans."""
+
+    def setUp(self):
+        """Create module directory & credentials of two accounts."""
+        self.module_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.module_dir, 'main.tf'), 'w') as stream:
+            stream.write(MAIN_TF)
+        plan_dir = os.path.join(self.module_dir, '.runway_cache',
+                                'terraform-plans')
+        self.saved_plan = {'directory': plan_dir,
+                           'plan_file': os.path.join(plan_dir, 'dev.tfplan'),
+                           'metadata_file': os.path.join(plan_dir,
+                                                         'dev.tfplan.json'),
+                           'max_age': 3600}
+        self.env_vars = {'AWS_ACCESS_KEY_ID': 'AKIADEV',
+                         'TF_VAR_image': 'app:1'}
+        cache_identity(self.env_vars, {'Account': '123456789012'})
+        cache_identity(dict(self.env_vars, AWS_ACCESS_KEY_ID='AKIAPROD'),
+                       {'Account': '210987654321'})
+
+    def tearDown(self):
+        """Remove module directory."""
+        shutil.rmtree(self.module_dir)
+
+    def fingerprint(self, **env_vars):
+        """Return plan fingerprint with env var overrides."""
+        return get_plan_fingerprint(self.module_dir,
+                                    ['-var', 'region=us-east-1'],
+                                    'backend',
+                                    self.saved_plan,
+                                    dict(self.env_vars, **env_vars))
+
+    def test_plan_files(self):
+        """Test plans in a shared directory are named by module path."""
+        context = mock.MagicMock(env_root=self.module_dir, env_name='dev',
+                                 env_region='us-east-1')
+        plan_files = [get_saved_plan_options(
+            {'directory': 'tfplans'},
+            os.path.join(self.module_dir, i, 'app.tf'),
+            context
+        )['plan_file'] for i in ['teamA', 'teamB']]
+        self.assertEqual(plan_files, [
+            os.path.join(self.module_dir, 'tfplans',
+                         "%s_app.tf-dev-us-east-1.tfplan" % i)
+            for i in ['teamA', 'teamB']
+        ])
+        self.assertEqual(
+            get_saved_plan_options(True, self.module_dir,
+                                   context)['plan_file'],
+            os.path.join(self.module_dir, '.runway_cache', 'terraform-plans',
+                         "%s-dev-us-east-1.tfplan"
+                         % os.path.basename(self.module_dir))
+        )
+
+    def test_plan_fingerprint(self):
+        """Test TF_VAR_* env vars & the account invalidate saved plans."""
+        fingerprint = self.fingerprint()
+        self.assertEqual(self.fingerprint(), fingerprint)
+        self.assertEqual(self.fingerprint(CI='1'), fingerprint)
+        self.assertNotEqual(self.fingerprint(TF_VAR_image='app:2'),
+                            fingerprint)
+        self.assertNotEqual(self.fingerprint(TF_VAR_debug='true'),
+                            fingerprint)
+        self.assertNotEqual(self.fingerprint(AWS_ACCESS_KEY_ID='AKIAPROD'),
+                            fingerprint)
+
+    def apply(self, fingerprint):
+        """Run apply after a plan with changes, returning the command run."""
+        with mock.patch('runway.module.terraform.subprocess.call',
+                        return_value=2):
+            run_saved_plan_command('plan', ['terraform', 'plan'],
+                                   dict(self.saved_plan,
+                                        fingerprint=self.fingerprint()),
+                                   self.env_vars)
+        with open(self.saved_plan['plan_file'], 'w') as stream:
+            stream.write('plan')
+        with mock.patch('runway.module.terraform.run_module_command') as run:
+            run_saved_plan_command('apply', ['terraform', 'apply'],
+                                   dict(self.saved_plan,
+                                        fingerprint=fingerprint),
+                                   self.env_vars)
+        self.assertFalse(os.path.exists(self.saved_plan['plan_file']))
+        return run.call_args[1]['cmd_list']
+
+    def test_reuse(self):
+        """Test matching saved plans are applied."""
+        self.assertEqual(self.apply(self.fingerprint()),
+                         ['terraform', 'apply', self.saved_plan['plan_file']])
+
+    def test_invalidation(self):
+        """Test a full apply is run when the variables have changed."""
+        self.assertEqual(self.apply(self.fingerprint(TF_VAR_image='app:2')),
+                         ['terraform', 'apply'])
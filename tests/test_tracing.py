@@ -0,0 +1,68 @@
+"""Tests for tracing module."""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from runway import tracing
+
+
+def read_trace(path):
+    """Return spans of a trace file."""
+    with open(path) as stream:
+        data = stream.read()
+    if path.endswith('.jsonl'):
+        events = [json.loads(i) for i in data.splitlines()]
+    else:
+        events = json.loads(data.rstrip().rstrip(',') + ']')
+    return dict((i['name'], i) for i in events if i['ph'] == 'X')
+
+
+class TracingTester(unittest.TestCase):
+    """Test timing spans."""
+
+    def setUp(self):
+        """Create trace directory."""
+        self.env = dict(os.environ)
+        self.trace_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove trace directory & restore environment."""
+        os.environ.clear()
+        os.environ.update(self.env)
+        shutil.rmtree(self.trace_dir)
+
+    def test_disabled(self):
+        """Test nothing is written unless enabled."""
+        os.environ.pop(tracing.TRACE_FILE_ENV_VAR, None)
+        with tracing.span('module'):
+            pass
+        self.assertEqual(os.listdir(self.trace_dir), [])
+
+    def test_nested_spans(self):
+        """Test spans are nested in the current span & child processes."""
+        for filename in ['trace.json', 'trace.jsonl']:
+            trace_file = os.path.join(self.trace_dir, filename)
+            os.environ[tracing.TRACE_FILE_ENV_VAR] = trace_file
+            with tracing.span('deployment', 'deployment'):
+                with tracing.span('module', 'module', command='plan'):
+                    subprocess.check_call(
+                        [sys.executable, '-c',
+                         "from runway import tracing\n"
+                         "with tracing.span('child'):\n"
+                         "    pass"],
+                        env=tracing.get_child_env_vars(os.environ)
+                    )
+            spans = read_trace(trace_file)
+            self.assertEqual(spans['module']['args']['command'], 'plan')
+            self.assertEqual(spans['module']['args']['parent'],
+                             spans['deployment']['args']['id'])
+            self.assertEqual(spans['child']['args']['parent'],
+                             spans['module']['args']['id'])
+            self.assertNotEqual(spans['child']['pid'],
+                                spans['module']['pid'])
+            self.assertLessEqual(spans['deployment']['ts'],
+                                 spans['module']['ts'])
@@ -0,0 +1,123 @@
+"""Tests for the upload_staticsite hook."""
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from runway.hooks.staticsite.upload_staticsite import (
+    get_archives_to_prune, get_changed_keys, get_invalidation_paths
+)
+
+
+class StubPaginator(object):  # pylint: disable=too-few-public-methods
+    """list_objects_v2 paginator returning a page per object."""
+
+    def __init__(self, objects):
+        """Initialize paginator."""
+        self.objects = objects
+
+    def paginate(self, Bucket):  # pylint: disable=invalid-name,unused-argument
+        """Yield pages of objects."""
+        for i in self.objects:
+            yield {'Contents': [i]}
+
+
+class StubS3Client(object):  # pylint: disable=too-few-public-methods
+    """S3 client listing a fixed set of objects."""
+
+    def __init__(self, objects):
+        """Initialize client."""
+        self.objects = objects
+
+    def get_paginator(self, operation):
+        """Return paginator."""
+        assert operation == 'list_objects_v2'
+        return StubPaginator(self.objects)
+
+
+class ChangedKeysTester(unittest.TestCase):
+    """Test get_changed_keys."""
+
+    def setUp(self):
+        """Create site directory."""
+        self.site_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.site_dir, 'js'))
+        for name in ['index.html', 'js/app.js', 'js/big.js', 'new.css']:
+            with open(os.path.join(self.site_dir, name), 'w') as stream:
+                stream.write(name)
+
+    def tearDown(self):
+        """Remove site directory."""
+        shutil.rmtree(self.site_dir)
+
+    def test_changed_keys(self):
+        """Test added, updated & deleted keys are returned."""
+        def remote(key, contents, etag=None):
+            return {'Key': key,
+                    'Size': len(contents),
+                    'ETag': '"%s"' % (etag or hashlib.md5(
+                        contents.encode()
+                    ).hexdigest())}
+        client = StubS3Client([
+            remote('index.html', 'index.html'),
+            remote('js/app.js', 'js/app.xx'),
+            # multipart uploads have no comparable ETag
+            remote('js/big.js', 'js/big.js', 'abc-2'),
+            remote('old.css', 'old.css')
+        ])
+        self.assertEqual(get_changed_keys(client, 'bucket', self.site_dir),
+                         ['js/app.js', 'js/big.js', 'new.css', 'old.css'])
+
+
+class InvalidationPathsTester(unittest.TestCase):
+    """Test get_invalidation_paths."""
+
+    def test_paths(self):
+        """Test keys are quoted & index documents invalidate directories."""
+        self.assertEqual(
+            get_invalidation_paths(['index.html', 'docs/index.html',
+                                    'docs/my page.html']),
+            ['/', '/docs', '/docs/', '/docs/index.html',
+             '/docs/my%20page.html', '/index.html']
+        )
+
+    def test_wildcards(self):
+        """Test directories with the most paths are collapsed."""
+        keys = ['index.html'] + ['img/%d.png' % i for i in range(10)] + [
+            'js/%d.js' % i for i in range(3)
+        ] + ['js/vendor/%d.js' % i for i in range(4)]
+        self.assertEqual(get_invalidation_paths(keys, max_paths=10),
+                         ['/', '/img/*', '/index.html'] + [
+                             '/js/%d.js' % i for i in range(3)
+                         ] + ['/js/vendor/%d.js' % i for i in range(4)])
+        self.assertEqual(get_invalidation_paths(keys, max_paths=9),
+                         ['/', '/img/*', '/index.html', '/js/*'])
+
+    def test_max_paths(self):
+        """Test all paths are invalidated when they can't be collapsed."""
+        keys = ['%d.html' % i for i in range(5)]
+        self.assertEqual(len(get_invalidation_paths(keys, max_paths=5)), 5)
+        self.assertEqual(get_invalidation_paths(keys, max_paths=4), ['/*'])
+        # CloudFront allows at most 15 wildcard paths in progress
+        keys = ['%d/%d.html' % (i, j) for i in range(20) for j in range(2)]
+        self.assertEqual(get_invalidation_paths(keys, max_paths=20), ['/*'])
+
+
+class ArchivesToPruneTester(unittest.TestCase):
+    """Test get_archives_to_prune."""
+
+    def test_prune(self):
+        """Test all but the latest, current & previous archives are pruned."""
+        archives = [{'Key': 'ns-site-%02d.zip' % i, 'LastModified': i}
+                    for i in range(20)]
+        # The previous archive was uploaded before switching to tar.gz
+        self.assertEqual(
+            get_archives_to_prune(
+                archives,
+                {'current_archive_filename': 'ns-site-19.tar.gz',
+                 'old_archive_filename': 'ns-site-02.tar.gz'}
+            ),
+            ['ns-site-00.zip', 'ns-site-01.zip', 'ns-site-03.zip',
+             'ns-site-04.zip']
+        )
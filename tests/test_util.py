@@ -0,0 +1,42 @@
+"""Tests for util module."""
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:  # py2
+    import mock
+
+from runway.util import WHICH_CACHE, which_cached
+
+
+class WhichCachedTester(unittest.TestCase):
+    """Test which_cached."""
+
+    def setUp(self):
+        """Create directory with an executable."""
+        self.bin_dir = tempfile.mkdtemp()
+        self.program = os.path.join(self.bin_dir, 'runway-test-program')
+        with open(self.program, 'w') as stream:
+            stream.write('#!/bin/sh\n')
+        os.chmod(self.program, 0o755)
+        WHICH_CACHE.clear()
+
+    def tearDown(self):
+        """Remove directory."""
+        shutil.rmtree(self.bin_dir)
+
+    def test_cached_per_path(self):
+        """Test results are memoized per PATH."""
+        with mock.patch.dict(os.environ, {'PATH': self.bin_dir}):
+            self.assertEqual(which_cached('runway-test-program'),
+                             self.program)
+            os.remove(self.program)
+            self.assertEqual(which_cached('runway-test-program'),
+                             self.program)
+        with mock.patch.dict(os.environ, {'PATH': os.pathsep.join(
+                [self.bin_dir, os.path.join(self.bin_dir, 'other')]
+        )}):
+            self.assertIsNone(which_cached('runway-test-program'))